@@ -0,0 +1,267 @@
+import os
+import sys
+import time
+import random
+import platform
+import subprocess
+import logging
+from lxml import etree
+from simiir.benchmarks.synthetic_corpus import SyntheticCorpus
+from simiir.utils.memory_tracker import get_peak_rss
+
+log = logging.getLogger('benchmarks.suite')
+
+#
+# An end-to-end benchmark of the simulator over synthetic corpora (see synthetic_corpus).
+# Representative user configurations from example_sims/users are copied, with their QRELS, stopword and background files
+# pointed at the synthetic collection, and run over every topic. Two scaling curves are measured: against session length
+# (the logger's time_limit, on the smallest corpus) and against corpus size (at the middle time limit).
+# For each case, the simulations per second (including the creation of each configuration's components), steps per second
+# (within SimulatedUser.run_until_finished()) and peak RSS of the process are recorded.
+#
+
+USERS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'example_sims', 'users')
+
+DEFAULT_USERS = ['trec_user', 'smart_user', 'fixed_depth_user', 'ift_user', 'lm_smart_user_with_updating']
+
+SIMULATION_TEMPLATE = """<simulationConfiguration id="benchmark">
+    <output baseDirectory="{base_directory}" saveInteractionLog="false" saveRelevanceJudgments="false" trec_eval="false" backend="null" />
+    <topics>
+{topics}
+    </topics>
+    <users>
+        <user configurationFile="{user_filename}" />
+    </users>
+    <searchInterface class="WhooshSearchInterface">
+        <attribute name="whoosh_index_dir" type="string" value="{index_dir}" is_argument="true" />
+        <attribute name="implicit_or" type="boolean" value="1" is_argument="true" />
+        <attribute name="model" type="integer" value="1" is_argument="true" />
+    </searchInterface>
+</simulationConfiguration>
+"""
+
+TOPIC_TEMPLATE = """        <topic id="{0}" filename="{1}" qrelsFilename="{2}" />"""
+
+
+class BenchmarkSuite(object):
+    """
+    Runs the benchmark; results are returned by get_results() as a dictionary that can be saved as JSON, and compared against
+    the results of another version with compare_results().
+    """
+    def __init__(self, work_dir, users=None, corpus_sizes=[1000, 5000], time_limits=[150, 300, 600, 1200], topics=3, seed=0, users_directory=USERS_DIRECTORY):
+        self.__work_dir = os.path.abspath(work_dir)
+        self.__users = users or DEFAULT_USERS
+        self.__corpus_sizes = sorted(corpus_sizes)
+        self.__time_limits = sorted(time_limits)
+        self.__topics = topics
+        self.__seed = seed
+        self.__users_directory = users_directory
+
+        self.__corpora = []
+        self.__cases = []
+
+    def run(self):
+        """
+        Generates the corpora (reusing any generated by a previous run in the work directory), then runs each case.
+        Returns the results (see get_results()).
+        """
+        corpora = {}
+
+        for documents, time_limit in self.__get_case_parameters():
+            if documents not in corpora:
+                corpora[documents] = self.__get_corpus(documents)
+
+            for user in self.__users:
+                case = self.__run_case(corpora[documents], user, time_limit)
+                self.__cases.append(case)
+
+                log.info("{0} on {1} documents, time limit {2}: {3:.2f} sims/sec, {4:.0f} steps/sec".format(user, documents, time_limit, case['sims_per_second'], case['steps_per_second']))
+
+        return self.get_results()
+
+    def get_results(self):
+        """
+        Returns a dictionary of the results: metadata describing the run, the corpora generated, each case run (a user, corpus
+        size and time limit), and the two scaling curves - mapping each user to a list of [x, sims/sec, steps/sec] entries.
+        """
+        middle_time_limit = self.__time_limits[len(self.__time_limits) // 2]
+        curves = {'session_length': {}, 'corpus_size': {}}
+
+        for case in self.__cases:
+            rates = [case['sims_per_second'], case['steps_per_second']]
+
+            if case['documents'] == self.__corpus_sizes[0]:
+                curves['session_length'].setdefault(case['user'], []).append([case['time_limit']] + rates)
+
+            if case['time_limit'] == middle_time_limit:
+                curves['corpus_size'].setdefault(case['user'], []).append([case['documents']] + rates)
+
+        for curve in curves.values():
+            for points in curve.values():
+                points.sort()
+
+        return {'metadata': get_metadata(),
+                'parameters': {'users': self.__users,
+                               'corpus_sizes': self.__corpus_sizes,
+                               'time_limits': self.__time_limits,
+                               'topics': self.__topics,
+                               'seed': self.__seed},
+                'corpora': self.__corpora,
+                'cases': self.__cases,
+                'curves': curves,
+                'peak_rss_mb': get_peak_rss()}
+
+    def __get_case_parameters(self):
+        """
+        Returns a list of (corpus size, time limit) tuples to run: every time limit on the smallest corpus, and every corpus
+        size at the middle time limit.
+        """
+        middle_time_limit = self.__time_limits[len(self.__time_limits) // 2]
+        parameters = [(self.__corpus_sizes[0], time_limit) for time_limit in self.__time_limits]
+        parameters.extend([(documents, middle_time_limit) for documents in self.__corpus_sizes[1:]])
+
+        return parameters
+
+    def __get_corpus(self, documents):
+        """
+        Returns the SyntheticCorpus of the given size, generating it if necessary.
+        """
+        corpus = SyntheticCorpus(os.path.join(self.__work_dir, 'corpus-{0}'.format(documents)),
+                                 documents=documents, topics=self.__topics, seed=self.__seed)
+
+        start_time = time.time()
+        generated = corpus.generate()
+
+        self.__corpora.append({'documents': documents,
+                               'parameters': corpus.parameters,
+                               'generated': generated,
+                               'seconds': time.time() - start_time})
+
+        return corpus
+
+    def __run_case(self, corpus, user, time_limit):
+        """
+        Runs the given user over every topic of the corpus, with the given time limit. Returns a dictionary of the measurements.
+        """
+        from sim_user import SimulatedUser
+        from config_readers.simulation_config_reader import SimulationConfigReader
+
+        simulation_filename = self.__write_configuration(corpus, user, time_limit)
+        results = []
+
+        random.seed(self.__seed)  # Users without seeds draw from the shared random module.
+
+        steps = 0
+        run_time = 0.0
+        simulations = 0
+        start_time = time.time()
+
+        for configuration in SimulationConfigReader(simulation_filename, sink=results.append):
+            simulated_user = SimulatedUser(configuration)
+
+            run_start_time = time.time()
+            simulation_steps, steps_per_second = simulated_user.run_until_finished()
+            run_time = run_time + time.time() - run_start_time
+
+            configuration.output.save()
+            steps = steps + simulation_steps
+            simulations = simulations + 1
+
+        elapsed_time = time.time() - start_time
+
+        return {'user': user,
+                'documents': corpus.parameters['documents'],
+                'time_limit': time_limit,
+                'simulations': simulations,
+                'steps': steps,
+                'queries': sum([result['summary']['TOTAL_QUERIES_ISSUED'] for result in results]),
+                'seconds': elapsed_time,
+                'sims_per_second': simulations / elapsed_time if elapsed_time > 0 else 0.0,
+                'steps_per_second': steps / run_time if run_time > 0 else 0.0,
+                'peak_rss_mb': get_peak_rss()}
+
+    def __write_configuration(self, corpus, user, time_limit):
+        """
+        Writes a copy of the user's configuration pointing at the corpus, and a simulation configuration running it over every
+        topic of the corpus. Returns the filename of the simulation configuration.
+        """
+        configuration_dir = os.path.join(self.__work_dir, 'configurations')
+
+        if not os.path.exists(configuration_dir):
+            os.makedirs(configuration_dir)
+
+        replacements = {'qrel_file': corpus.qrels_filename,
+                        'stopword_file': corpus.stopwords_filename,
+                        'background_file': corpus.vocab_filename,
+                        'time_limit': str(time_limit)}
+
+        tree = etree.parse(os.path.join(self.__users_directory, '{0}.xml'.format(user)))
+
+        for attribute in tree.iter('attribute'):
+            if attribute.get('name') in replacements:
+                attribute.set('value', replacements[attribute.get('name')])
+
+        case_id = '{0}-{1}-{2}'.format(user, corpus.parameters['documents'], time_limit)
+        user_filename = os.path.join(configuration_dir, '{0}.xml'.format(case_id))
+        tree.write(user_filename)
+
+        topics = '\n'.join([TOPIC_TEMPLATE.format(topic_id, corpus.get_topic_filename(topic_id), corpus.qrels_filename)
+                            for topic_id in corpus.topic_ids])
+
+        simulation_filename = os.path.join(configuration_dir, '{0}-simulation.xml'.format(case_id))
+        simulation_file = open(simulation_filename, 'w')
+        simulation_file.write(SIMULATION_TEMPLATE.format(base_directory=os.path.join(self.__work_dir, 'output'),
+                                                         topics=topics,
+                                                         user_filename=user_filename,
+                                                         index_dir=corpus.index_dir))
+        simulation_file.close()
+
+        return simulation_filename
+
+
+def get_metadata():
+    """
+    Returns a dictionary describing the version of the simulator and the machine the benchmark was run on.
+    """
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                           stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {'revision': revision,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine()}
+
+
+def compare_results(baseline, results):
+    """
+    Compares two sets of results (as returned by BenchmarkSuite.get_results()), matching cases on the user, corpus size and
+    time limit. Returns a list of dictionaries, one per matched case, with the ratio (results / baseline) of the sims/sec and
+    steps/sec - so values above 1 are speedups.
+    """
+    def key(case):
+        return case['user'], case['documents'], case['time_limit']
+
+    baseline_cases = dict([(key(case), case) for case in baseline['cases']])
+    comparison = []
+
+    for case in results['cases']:
+        baseline_case = baseline_cases.get(key(case))
+
+        if baseline_case is None:
+            continue
+
+        def ratio(measure):
+            return case[measure] / baseline_case[measure] if baseline_case[measure] else None
+
+        comparison.append({'user': case['user'],
+                           'documents': case['documents'],
+                           'time_limit': case['time_limit'],
+                           'sims_per_second': ratio('sims_per_second'),
+                           'steps_per_second': ratio('steps_per_second'),
+                           'steps_changed': case['steps'] != baseline_case['steps']})
+
+    return comparison
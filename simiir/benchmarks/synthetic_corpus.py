@@ -0,0 +1,233 @@
+import os
+import json
+import numpy
+import logging
+
+log = logging.getLogger('benchmarks.synthetic_corpus')
+
+#
+# A synthetic test collection, so the simulator can be benchmarked without the TREC collections.
+# Documents are sequences of pseudo-words drawn from a Zipfian distribution over the vocabulary, interspersed with stopwords.
+# Each topic has a set of (mid-frequency) topic terms; relevant documents have a proportion of their words replaced with topic
+# terms, and some non-relevant documents mention them too - so retrieval, and the classifiers, are imperfect.
+#
+# Everything is generated offline, from a seed: a Whoosh index (with the stored fields the WhooshSearchInterface reads),
+# topic files, a QRELS file, a stopword list and a background vocabulary (term,count) file.
+#
+
+STOPWORDS = ['a', 'about', 'after', 'all', 'also', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'been', 'but', 'by',
+             'can', 'could', 'for', 'from', 'had', 'has', 'have', 'he', 'her', 'his', 'if', 'in', 'into', 'is', 'it',
+             'its', 'may', 'more', 'no', 'not', 'of', 'on', 'one', 'or', 'other', 'said', 'she', 'so', 'some', 'such',
+             'than', 'that', 'the', 'their', 'there', 'these', 'they', 'this', 'to', 'was', 'were', 'which', 'who',
+             'will', 'with', 'would', 'relevant', 'document', 'documents', 'discussing', 'describe', 'identify']
+
+SYLLABLES = [consonant + vowel for consonant in 'bdfgklmnprstvz' for vowel in 'aeiou']
+
+
+def get_pseudo_word(index):
+    """
+    Returns the pseudo-word for the given vocabulary index; distinct indexes give distinct words, of at least two syllables.
+    """
+    index = index + len(SYLLABLES)  # Skip the single syllable words.
+    word = ''
+
+    while index:
+        word = word + SYLLABLES[index % len(SYLLABLES)]
+        index = index // len(SYLLABLES)
+
+    return word
+
+
+class SyntheticCorpus(object):
+    """
+    Generates (or reuses) a synthetic test collection within the given directory.
+    """
+    def __init__(self, directory, documents=1000, topics=3, vocabulary=5000, document_length=200, relevant=30, topic_terms=12, seed=0):
+        self.directory = directory
+        self.parameters = {'documents': documents,
+                           'topics': topics,
+                           'vocabulary': vocabulary,
+                           'document_length': document_length,
+                           'relevant': min(relevant, documents),
+                           'topic_terms': topic_terms,
+                           'seed': seed}
+
+        self.index_dir = os.path.join(directory, 'index')
+        self.qrels_filename = os.path.join(directory, 'qrels', 'synthetic.qrels')
+        self.stopwords_filename = os.path.join(directory, 'terms', 'stopwords.txt')
+        self.vocab_filename = os.path.join(directory, 'terms', 'vocab.txt')
+        self.topic_ids = [str(topic_number) for topic_number in range(1, topics + 1)]
+
+    def get_topic_filename(self, topic_id):
+        """
+        Returns the filename of the given topic's file (a title line, followed by the description).
+        """
+        return os.path.join(self.directory, 'topics', 'topic.{0}'.format(topic_id))
+
+    def generate(self):
+        """
+        Generates the collection, unless a collection with the same parameters already exists in the directory.
+        Returns True if the collection was generated.
+        """
+        manifest_filename = os.path.join(self.directory, 'corpus.json')
+
+        if os.path.exists(manifest_filename):
+            manifest_file = open(manifest_filename)
+            manifest = json.load(manifest_file)
+            manifest_file.close()
+
+            if manifest == self.parameters:
+                return False
+
+        for subdirectory in ['index', 'qrels', 'terms', 'topics']:
+            if not os.path.exists(os.path.join(self.directory, subdirectory)):
+                os.makedirs(os.path.join(self.directory, subdirectory))
+
+        log.info("Generating a synthetic corpus of {0} documents in {1}".format(self.parameters['documents'], self.directory))
+        random_state = numpy.random.RandomState(self.parameters['seed'])
+        vocabulary = [get_pseudo_word(index) for index in range(self.parameters['vocabulary'])]
+
+        topics = self.__generate_topics(random_state, vocabulary)
+        documents, qrels = self.__generate_documents(random_state, vocabulary, topics)
+
+        self.__write_index(documents)
+        self.__write_topics(random_state, topics)
+        self.__write_qrels(qrels)
+        self.__write_terms(documents)
+
+        manifest_file = open(manifest_filename, 'w')
+        json.dump(self.parameters, manifest_file)
+        manifest_file.close()
+        return True
+
+    def __generate_topics(self, random_state, vocabulary):
+        """
+        Returns a dictionary of topic ID -> list of topic terms, chosen without replacement from the mid-frequency words.
+        """
+        low = min(50, len(vocabulary) // 10)
+        candidates = random_state.permutation(numpy.arange(low, len(vocabulary)))
+        count = self.parameters['topic_terms']
+
+        return dict([(topic_id, [vocabulary[index] for index in candidates[position * count:(position + 1) * count]])
+                     for position, topic_id in enumerate(self.topic_ids)])
+
+    def __generate_documents(self, random_state, vocabulary, topics):
+        """
+        Returns a list of (document ID, title words, content words) tuples, and a list of (topic ID, document ID, judgement) tuples.
+        """
+        documents_count = self.parameters['documents']
+        length = self.parameters['document_length']
+
+        weights = 1.0 / numpy.arange(1, len(vocabulary) + 1)  # Zipf's law, with an exponent of 1.
+        words = random_state.choice(len(vocabulary), size=(documents_count, length), p=weights / weights.sum())
+        is_stopword = random_state.random_sample((documents_count, length)) < 0.4
+        stopwords = random_state.randint(len(STOPWORDS), size=(documents_count, length))
+
+        document_topics = {}  # Document index -> list of (topic ID, judgement)
+        qrels = []
+
+        for topic_id in self.topic_ids:
+            chosen = random_state.permutation(documents_count)
+            relevant = chosen[:self.parameters['relevant']]
+            mentions = chosen[self.parameters['relevant']:self.parameters['relevant'] * 2]  # Non-relevant, mentioning the topic.
+
+            for document_index in relevant:
+                document_topics.setdefault(document_index, []).append((topic_id, 0.12, 1 + random_state.randint(2)))
+
+            for document_index in mentions:
+                document_topics.setdefault(document_index, []).append((topic_id, 0.03, 0))
+
+        documents = []
+
+        for document_index in range(documents_count):
+            content = [STOPWORDS[stopwords[document_index, position]] if is_stopword[document_index, position] else vocabulary[words[document_index, position]]
+                       for position in range(length)]
+            document_id = 'SYN{0:07d}'.format(document_index)
+
+            for topic_id, proportion, judgement in document_topics.get(document_index, []):
+                positions = numpy.nonzero(random_state.random_sample(length) < proportion)[0]
+                terms = topics[topic_id]
+
+                for position in positions:
+                    content[position] = terms[random_state.randint(len(terms))]
+
+                qrels.append((topic_id, document_id, judgement))
+
+            documents.append((document_id, content[:8], content))
+
+        return documents, qrels
+
+    def __write_index(self, documents):
+        """
+        Writes the Whoosh index, with the fields read by the WhooshSearchInterface.
+        """
+        from whoosh.index import create_in
+        from whoosh.fields import Schema, ID, TEXT
+
+        schema = Schema(docid=ID(stored=True, unique=True),
+                        title=TEXT(stored=True),
+                        content=TEXT(stored=True),
+                        timedate=ID(stored=True),
+                        source=ID(stored=True))
+
+        index = create_in(self.index_dir, schema)
+        writer = index.writer(limitmb=256)
+
+        for document_number, (document_id, title, content) in enumerate(documents):
+            sentences = [' '.join(content[start:start + 15]) for start in range(0, len(content), 15)]
+
+            writer.add_document(docid=unicode(document_id),
+                                title=unicode(' '.join(title)),
+                                content=unicode('. '.join(sentences) + '.'),
+                                timedate=u'2000-01-01',
+                                source=u'SYN')
+
+        writer.commit()
+
+    def __write_topics(self, random_state, topics):
+        """
+        Writes a file for each topic; the title holds three of its terms, and the description the rest, among stopwords.
+        """
+        for topic_id in self.topic_ids:
+            terms = topics[topic_id]
+            description = []
+
+            for term in terms[3:]:
+                description.extend([STOPWORDS[random_state.randint(len(STOPWORDS))], term])
+
+            topic_file = open(self.get_topic_filename(topic_id), 'w')
+            topic_file.write('{0}{1}{1}'.format(' '.join(terms[:3]), os.linesep))
+            topic_file.write('Identify documents discussing {0}.{1}'.format(' '.join(description), os.linesep))
+            topic_file.close()
+
+    def __write_qrels(self, qrels):
+        """
+        Writes the QRELS, in the TREC format (topic, iteration, document ID, judgement).
+        """
+        qrels_file = open(self.qrels_filename, 'w')
+
+        for topic_id, document_id, judgement in qrels:
+            qrels_file.write('{0} 0 {1} {2}{3}'.format(topic_id, document_id, judgement, os.linesep))
+
+        qrels_file.close()
+
+    def __write_terms(self, documents):
+        """
+        Writes the stopword list, and the background vocabulary - the count of each term over the collection.
+        """
+        stopwords_file = open(self.stopwords_filename, 'w')
+        stopwords_file.write(os.linesep.join(STOPWORDS) + os.linesep)
+        stopwords_file.close()
+
+        counts = {}
+
+        for document_id, title, content in documents:
+            for term in content:
+                counts[term] = counts.get(term, 0) + 1
+
+        vocab_file = open(self.vocab_filename, 'w')
+
+        for term, count in sorted(counts.items(), key=lambda item: item[1], reverse=True):
+            vocab_file.write('{0},{1}{2}'.format(term, count, os.linesep))
+
+        vocab_file.close()
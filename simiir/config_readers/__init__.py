@@ -60,6 +60,26 @@ def check_attributes(config_entry):
         else:
             do_check(config_entry['attribute'])
 
+def parse_seed_range(seeds_value):
+    """
+    Given a string (seeds_value), returns the list of seeds it specifies.
+    Either a range, start:stop (as per Python's range(), so stop is excluded), or a comma-separated list of seeds.
+    For example, '0:4' yields [0, 1, 2, 3], and '7,11' yields [7, 11]. A ConfigReaderError is raised if no seeds are specified.
+    """
+    try:
+        if ':' in seeds_value:
+            start, stop = seeds_value.split(':')
+            seeds = range(int(start), int(stop))
+        else:
+            seeds = [int(seed) for seed in seeds_value.split(',')]
+    except ValueError:
+        raise ConfigReaderError("Invalid seeds: '{0}'".format(seeds_value))
+    
+    if not seeds:
+        raise ConfigReaderError("The seeds '{0}' specify no seeds.".format(seeds_value))
+    
+    return seeds
+
 def filesystem_exists_check(path, raise_exception = True):
 	"""
 	Checks to see if the path, specified by parameter path, exists. Can be either a directory or file. If the path exists, True is returned. If the path does not exist, and raise_exception is set to True, an IOError is raised - else False is returned.
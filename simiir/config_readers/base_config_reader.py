@@ -1,10 +1,18 @@
 import os
 import abc
+import copy
 from lxml import etree
-from xml.etree import cElementTree
 from collections import defaultdict
 from simiir.config_readers import ConfigReaderError
 
+#
+# Parsing and validating configuration files is done once per file. DTDs are compiled once, and the validated dictionary
+# for each configuration file is cached - keyed by the file's path and modification time, so edited files are re-read.
+# Each reader receives its own copy of the cached dictionary, as readers (and their component generators) may modify it.
+#
+_dtd_cache = {}
+_config_cache = {}
+
 class BaseConfigReader(object):
     """
     The base Configuration Reader class. Extend this class to implement additional configuration file types.
@@ -20,43 +28,52 @@ class BaseConfigReader(object):
 
         if self._config_filename is None:
             raise ConfigReaderError("No configuration file has been specified.")
-        else:
+        
+        cache_key = (type(self), self._dtd_filename, os.path.abspath(self._config_filename), os.path.getmtime(self._config_filename))
+        
+        if cache_key not in _config_cache:
             self._config_file = etree.parse(self._config_filename)
+            
+            self.__validate_against_dtd()
+            self.__build_dictionary()
+            self._validate_config()
+            
+            _config_cache[cache_key] = self._config_dict
+            self._config_file = None  # The parsed tree is no longer required.
         
-        self.__validate_against_dtd()
-        self.__build_dictionary()
-        self._validate_config()
+        self._config_dict = copy.deepcopy(_config_cache[cache_key])
     
     def __validate_against_dtd(self):
         """
         Parses the configuration file and checks its validity compared to the DTD specification.
+        The DTD is compiled once, and reused for all subsequent files validated against it.
         """
-        # Opens the DTD file and loads it into a lxml DTD object.
-        dtd_file = open(self._dtd_filename, 'r')
-        dtd_object = etree.DTD(dtd_file)
-
-
+        if self._dtd_filename not in _dtd_cache:
+            # Opens the DTD file and loads it into a lxml DTD object.
+            dtd_file = open(self._dtd_filename, 'r')
+            _dtd_cache[self._dtd_filename] = etree.DTD(dtd_file)
+            dtd_file.close()
+        
+        dtd_object = _dtd_cache[self._dtd_filename]
+        
         # .validate() checks if the config file complies to the schema. If it doesn't, this condition is entered.
         if not dtd_object.validate(self._config_file):
-            dtd_file.close()
             raise ConfigReaderError("DTD validation failed on {0}: {1}".format(self._config_filename,
                                                                                dtd_object.error_log.filter_from_errors()[0]))
-
-        # If we get here, the validation passed, so we can close the DTD file object.
-        dtd_file.close()
     
     def __build_dictionary(self):
         """
-        Turns the XML configuration file into a Python dictionary object.
+        Turns the XML configuration file into a Python dictionary object, in a single pass over the parsed tree.
         The nested function recursive_generation() is unsurprisingly recursive.
         """
         def recursive_generation(t):
             """
             Nested helper function that recursively loops through an XML node to construct a dictionary.
+            Comments and processing instructions are skipped.
             Solution from http://stackoverflow.com/a/10077069 (2013-01-19)
             """
             d = {t.tag: {} if t.attrib else None}
-            children = list(t)
+            children = [child for child in t if isinstance(child.tag, basestring)]
 
             if children:
                 dd = defaultdict(list)
@@ -70,8 +87,17 @@ class BaseConfigReader(object):
             if t.attrib:
                 d[t.tag].update(('@' + k, v) for k, v in t.attrib.iteritems())
 
-            if t.text:
-                text = t.text.strip()
+            # The text before the first child element (as comments are skipped, the text either side of them is joined).
+            text = t.text or ''
+            
+            for child in t:
+                if isinstance(child.tag, basestring):
+                    break
+                
+                text = text + (child.tail or '')
+            
+            if text:
+                text = text.strip()
 
                 if children or t.attrib:
                     if text:
@@ -81,10 +107,7 @@ class BaseConfigReader(object):
 
             return d
         
-        string_repr = etree.tostring(self._config_file, pretty_print=True)
-        element_tree = cElementTree.XML(string_repr)
-        
-        self._config_dict = recursive_generation(element_tree)
+        self._config_dict = recursive_generation(self._config_file.getroot())
         self._config_dict = self._config_dict[self._config_dict.keys()[0]]
     
     @abc.abstractmethod
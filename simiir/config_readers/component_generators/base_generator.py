@@ -1,8 +1,17 @@
 import os
+import re
 import abc
 import inspect
 import importlib
 
+#
+# Component classes are found by scanning the source of each package for class definitions, rather than by importing every
+# module in the package - so only the modules of the components a configuration actually uses are imported (along with
+# their dependencies). The index of each package is built once.
+#
+CLASS_DEFINITION = re.compile(r'^class\s+(\w+)\s*[\(:]', re.MULTILINE)
+_class_indexes = {}
+
 class BaseComponentGenerator(object):
     """
     The base Component Generator. Given a configuration dictionary, contains functionality to generate Python objects to be used for a simulation.
@@ -41,13 +50,14 @@ class BaseComponentGenerator(object):
         
         return string_representation
     
-    def _get_object_reference(self, config_details, package, components=[]):
+    def _get_object_reference(self, config_details, package, components=[], optional_components=[]):
         """
         Given a configuration dictionary for a particular class, a package, and an optional list of components...
         Returns an object reference which can be used as part of the simulation.
+        Optional components are only passed if the class's constructor accepts an argument of the same name.
         """
         selected_class = config_details['@class']
-        available_classes = self.__get_available_classes(package)
+        available_classes = self.__find_class(package, selected_class)
         attributes = self.__get_attributes(config_details)
         
         for available_class in available_classes:
@@ -63,6 +73,13 @@ class BaseComponentGenerator(object):
                 for attribute_reference in components:
                     kwargs[attribute_reference[0]] = attribute_reference[1]
                 
+                if optional_components:
+                    constructor_arguments = inspect.getargspec(available_class[1].__init__).args
+                    
+                    for attribute_reference in optional_components:
+                        if attribute_reference[0] in constructor_arguments:
+                            kwargs[attribute_reference[0]] = attribute_reference[1]
+                
                 reference = available_class[1](**kwargs)
                 
                 # If any attributes for the new object are required, now we pass them.
@@ -75,6 +92,50 @@ class BaseComponentGenerator(object):
         
         raise ImportError("Specified class '{0}' could not be found.".format(selected_class))
     
+    def _get_attribute_values(self, config_details):
+        """
+        Given a configuration dictionary for a particular class, returns a dictionary of <name, value> pairs for its attributes.
+        Both constructor arguments and attributes set after instantiation are included.
+        """
+        return dict([(attribute['@name'], attribute['@value']) for attribute in self.__get_attributes(config_details)])
+    
+    def __find_class(self, package, class_name):
+        """
+        Given a Python package name within the simuser package and a class name, returns a list of (name, class) tuples for
+        the class - importing only the module in which the class is defined. If no module in the package defines the class,
+        every module in the package is imported (see __get_available_classes()), so classes imported into a module are found.
+        """
+        module_name = self.__get_class_index(package).get(class_name)
+        
+        if module_name is not None:
+            module = importlib.import_module(module_name)
+            
+            if inspect.isclass(getattr(module, class_name, None)):
+                return [(class_name, getattr(module, class_name))]
+        
+        return self.__get_available_classes(package)
+    
+    def __get_class_index(self, package):
+        """
+        Returns a dictionary mapping the names of the classes defined in the given package to the modules defining them.
+        Modules are scanned in name order; if two modules define a class of the same name, the first is used.
+        """
+        if package not in _class_indexes:
+            class_index = {}
+            
+            for f in sorted(os.listdir(package)):
+                if f.endswith('.py') and not f.startswith('__init__'):
+                    source_file = open(os.path.join(package, f), 'r')
+                    source = source_file.read()
+                    source_file.close()
+                    
+                    for class_name in CLASS_DEFINITION.findall(source):
+                        class_index.setdefault(class_name, '{0}.{1}'.format(package, os.path.splitext(f)[0]))
+            
+            _class_indexes[package] = class_index
+        
+        return _class_indexes[package]
+    
     def __get_available_classes(self, package):
         """
         Given a Python package name within the simuser package, returns a list of available classes within said package.
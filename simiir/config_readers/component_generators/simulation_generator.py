@@ -2,44 +2,89 @@ import os
 from search_interfaces import Topic
 from output_controller import OutputController
 from config_readers.user_config_reader import UserConfigReader
+from search_interfaces.cached_interface import CachedSearchInterface
 from config_readers.component_generators.base_generator import BaseComponentGenerator
 
+
+class SharedComponents(object):
+    """
+    Components shared between the simulations of a seed sweep - the same topic and user, simulated with different seeds.
+    Work that does not depend upon the seed is done once: the topic is read once, the search interface is instantiated once
+    (with a cache of responses, so each distinct query is issued once), and the query list is generated once.
+    """
+    def __init__(self):
+        self.topic = None
+        self.search_interface = None
+        self.__query_generator = None
+    
+    def share_query_list(self, query_generator):
+        """
+        Given the query generator of a simulated user, reuses the query list generated for the first seed of the sweep.
+        Query generators that update their model regenerate their query lists, so are left untouched.
+        """
+        if query_generator.updating or not hasattr(query_generator, '_query_list'):
+            return
+        
+        if self.__query_generator is None or type(self.__query_generator) != type(query_generator):
+            self.__query_generator = query_generator
+        elif self.__query_generator._query_list is not None:
+            query_generator._query_list = self.__query_generator._query_list
+
+
 class SimulationComponentGenerator(BaseComponentGenerator):
     """
     A component generator for Simulations. Extends the BaseComponentGenerator.
     Includes a reference to a UserComponentGenerator, containing all user-relevant components.
     """
-    def __init__(self, simulation_id, config_dict):
+    def __init__(self, simulation_id, config_dict, shared_components=None, index=None):
         """
         Instantiates all the necessary components for the given configuration dictionary.
+        If the configuration is part of a seed sweep, shared_components is the SharedComponents object for the sweep.
+        index is the configuration's index within the sweep (see SimulationConfigReader.get_configuration()).
         """
         super(SimulationComponentGenerator, self).__init__(config_dict)
         
-        # What is the simulation's ID?
+        # What is the simulation's ID? And the seed for the user, if one is specified (None if not)?
         self.simulation_id = simulation_id
+        self.seed = self._config_dict['user'].get('@seed')
+        self.index = index
         
         # Create an OutputController object to handle the saving of output files to disk.
         self.output = OutputController(self, self._config_dict['output'])
         
-        # Generate a Topic object.
-        self.topic = self.__generate_topic()
-        
-        # Generate the search interface to be used.
-        self.search_interface = self._get_object_reference(config_details=self._config_dict['searchInterface'],
-                                                           package='search_interfaces')
+        # Generate a Topic object, and the search interface to be used - or reuse those of the seed sweep.
+        if shared_components is not None and shared_components.topic is not None:
+            self.topic = shared_components.topic
+            self.search_interface = shared_components.search_interface
+        else:
+            self.topic = self.__generate_topic()
+            self.search_interface = self._get_object_reference(config_details=self._config_dict['searchInterface'],
+                                                               package='search_interfaces')
+            
+            if shared_components is not None:
+                self.search_interface = CachedSearchInterface(self.search_interface)
+                shared_components.topic = self.topic
+                shared_components.search_interface = self.search_interface
         
         # Create the user object - by loading the specified file into a UserConfigReader, then obtaining its components.
         user_config_file = self._config_dict['user']['@configurationFile']
-        self.user = UserConfigReader(user_config_file).get_component_generator(self)
+        self.user = UserConfigReader(user_config_file).get_component_generator(self, seed=self.seed, shared_components=shared_components)
         
         # Creates a "base ID" for the saving of files, comprised of different component IDs (to uniquely identify the simulation).
         self.base_id = '{0}-{1}-{2}'.format(self.simulation_id, self.topic.id, self.user.id)
+        
+        if self.seed is not None:
+            self.base_id = '{0}-s{1}'.format(self.base_id, self.seed)
     
     def prettify(self):
         """
         Returns a prettified string representation with the key configuration details for the simulation.
         """
         return_string = "{0}Topic: {1}{2}".format(" "*self.output.output_indentation*2, self.topic.id, os.linesep)
+        
+        if self.seed is not None:
+            return_string = "{0}{1}Seed: {2}{3}".format(return_string, " "*self.output.output_indentation*2, self.seed, os.linesep)
+        
         return_string = "{0}{1}{2}".format(return_string, "{0}Search Interface: {1}{2}{3}".format(" "*self.output.output_indentation*2, self._config_dict['searchInterface']['@class'], os.linesep, self._prettify_attributes(self._config_dict['searchInterface'], self.output.output_indentation)), os.linesep)
         
         return return_string
@@ -5,11 +5,23 @@ from config_readers.component_generators.base_generator import BaseComponentGene
 class UserComponentGenerator(BaseComponentGenerator):
     """
     """
-    def __init__(self, simulation_components, config_dict):
+    def __init__(self, simulation_components, config_dict, seed=None, shared_components=None):
         super(UserComponentGenerator, self).__init__(config_dict)
         
         self.__simulation_components = simulation_components
         
+        # If a seed is specified, it is passed as the base_seed of each component accepting one.
+        seed_components = []
+        
+        if seed is not None:
+            seed_components = [('base_seed', seed)]
+        
+        # Likewise, if common random numbers are enabled, each stochastic component draws from a CommonRandom.
+        self.common_random_numbers = self._config_dict.get('@commonRandomNumbers', False)
+        
+        if self.common_random_numbers:
+            seed_components.append(('common_random_numbers', True))
+        
         
         # Store the user's ID for easy access.
         self.id = self._config_dict['@id']
@@ -19,6 +31,9 @@ class UserComponentGenerator(BaseComponentGenerator):
                                                           package='query_generators',
                                                           components=[])
         
+        if shared_components is not None:
+            shared_components.share_query_list(self.query_generator)
+        
         # Create the search context object.
         # self.search_context = self.__generate_search_context()  # When we had only a single search context class.
         self.search_context = self._get_object_reference(config_details=self._config_dict['searchContext'],
@@ -32,13 +47,15 @@ class UserComponentGenerator(BaseComponentGenerator):
         self.snippet_classifier = self._get_object_reference(config_details=self._config_dict['textClassifiers']['snippetClassifier'],
                                                              package='text_classifiers',
                                                              components=[('topic', self.__simulation_components.topic),
-                                                                         ('search_context', self.search_context)])
+                                                                         ('search_context', self.search_context)],
+                                                             optional_components=seed_components)
         
         # Create the uer's document classifier.
         self.document_classifier = self._get_object_reference(config_details=self._config_dict['textClassifiers']['documentClassifier'],
                                                               package='text_classifiers',
                                                               components=[('topic', self.__simulation_components.topic),
-                                                                          ('search_context', self.search_context)])
+                                                                          ('search_context', self.search_context)],
+                                                              optional_components=seed_components)
         
         # Generate the logger object for the simulation.
         self.logger = self._get_object_reference(config_details=self._config_dict['logger'],
@@ -50,12 +67,31 @@ class UserComponentGenerator(BaseComponentGenerator):
         self.decision_maker = self._get_object_reference(config_details=self._config_dict['stoppingDecisionMaker'],
                                                          package='stopping_decision_makers',
                                                          components=[('search_context', self.search_context),
-                                                                     ('logger', self.logger)])
+                                                                     ('logger', self.logger)],
+                                                         optional_components=seed_components)
         
         # Create the SERP impression component (used for some more advanced stopping models).
         self.serp_impression = self._get_object_reference(config_details=self._config_dict['serpImpression'],
                                                           package='serp_impressions',
-                                                          components=[('search_context', self.search_context)])
+                                                          components=[('search_context', self.search_context)],
+                                                          optional_components=seed_components)
+    
+    def get_component_attributes(self, component_name):
+        """
+        Given the name of one of the user's components (e.g. 'decision_maker'), returns a dictionary of the attribute values
+        specified for that component in the user configuration.
+        """
+        component_config = {
+            'query_generator'    : self._config_dict['queryGenerator'],
+            'search_context'     : self._config_dict['searchContext'],
+            'snippet_classifier' : self._config_dict['textClassifiers']['snippetClassifier'],
+            'document_classifier': self._config_dict['textClassifiers']['documentClassifier'],
+            'logger'             : self._config_dict['logger'],
+            'decision_maker'     : self._config_dict['stoppingDecisionMaker'],
+            'serp_impression'    : self._config_dict['serpImpression'],
+        }
+        
+        return self._get_attribute_values(component_config[component_name])
     
     def prettify(self):
         """
@@ -1,6 +1,7 @@
-from itertools import product
+import os
 from simiir.config_readers import ConfigReaderError
 from simiir.config_readers.base_config_reader import BaseConfigReader
+from simiir.config_readers.user_config_reader import UserConfigReader
 from simiir.config_readers import parse_boolean, empty_string_check, filesystem_exists_check, check_attributes
 
 class SimulationConfigReader(BaseConfigReader):
@@ -8,14 +9,37 @@ class SimulationConfigReader(BaseConfigReader):
     The Simulation Configuration reader - checks for validity in the supplied settings, and creates a series of components for use with the simulations.
     This includes a UserConfigReader - which in turn contains components relevant to a simulated user.
     """
-    def __init__(self, config_filename=None):
+    def __init__(self, config_filename=None, sink=None, topics=None, users=None, output_overrides=None, shard=None, index_range=None, seeds=None):
+        """
+        sink optionally specifies a callable to receive the results of each simulation when the null output backend is used.
+        If supplied, it takes precedence over any sink specified in the configuration file.
+        topics and users optionally restrict the simulations to the given topic IDs and user configuration files.
+        output_overrides is an optional dictionary of output options (e.g. {'backend': 'null'}), overriding the configuration file.
+        shard, a (shard index, shard count) tuple, and index_range, a (start, stop) tuple, optionally select a slice of the
+        configurations to iterate over - see get_configuration() for how configurations are indexed.
+        seeds optionally specifies a list of seeds to run every user with, in place of any seeds in the user configuration files.
+        """
         super(SimulationConfigReader, self).__init__(config_filename=config_filename, dtd_filename='simulation.dtd')
         
-        # Specify the options which do not change over an interation, and those which do.
+        if sink is not None:
+            self._config_dict['output']['@sink'] = sink
+        
+        if output_overrides is not None:
+            for option, value in output_overrides.iteritems():
+                self._config_dict['output']['@{0}'.format(option)] = value
+        
+        self.__topic_filter = topics
+        self.__user_filter = users
+        self.__seeds = seeds
+        
+        # Specify the options which do not change over an interation.
         self.__static = ['output', 'searchInterface']
-        self.__iterables = ['topics', 'users']
         
-        self.__calculate_iterations()
+        # Components shared between the iterations of a seed sweep; the key is (topic ID, user configuration file).
+        self.__shared_components = None
+        self.__shared_key = None
+        
+        self.__calculate_iterations(shard, index_range)
     
     def __iter__(self):
         """
@@ -23,66 +47,165 @@ class SimulationConfigReader(BaseConfigReader):
         """
         return self
     
+    def get_topic_ids(self):
+        """
+        Returns a list of the IDs of all topics in the configuration file, in the order they are specified.
+        """
+        return [topic['@id'] for topic in self.__get_entries('topics')]
+    
+    def get_user_files(self):
+        """
+        Returns a list of the configuration files of all users in the configuration file, in the order they are specified.
+        """
+        return [user['@configurationFile'] for user in self.__get_entries('users')]
+    
     def get_base_dir(self):
         """
         Returns the base directory for the simulations as a string.
         """
         return self._config_dict['output']['@baseDirectory']
     
+    def get_configuration_count(self):
+        """
+        Returns the number of configurations in the full sweep (before any shard or range is selected).
+        """
+        return len(self.__topics) * len(self.__users)
+    
+    def get_index_range(self):
+        """
+        Returns a (start, stop) tuple of the indices of the configurations this reader iterates over (stop is excluded).
+        """
+        return self.__index_range
+    
+    def get_configuration(self, index):
+        """
+        Returns the components for the configuration with the given index, in the range [0, get_configuration_count()).
+        Indices are stable: topics are the outermost dimension, then users, then (for users with seeds) seeds - each in the order
+        specified. The index of configuration (topic t, user u) is t * U + u, where U is the number of users (counting each seed).
+        """
+        if index < 0 or index >= self.get_configuration_count():
+            raise IndexError("Configuration index {0} is out of range.".format(index))
+        
+        topic_index, user_index = divmod(index, len(self.__users))
+        configuration_set = {'topic': self.__topics[topic_index], 'user': self.__users[user_index]}
+        
+        for static_option in self.__static:
+            if static_option not in self._config_dict:
+                raise ConfigReaderError("Simulation configuration option '{0}' not found. Please check the SimulationConfigReader class for typos.".format(static_option))
+            
+            configuration_set[static_option] = self._config_dict[static_option]
+        
+        from component_generators.simulation_generator import SimulationComponentGenerator
+        return SimulationComponentGenerator(self._config_dict['@id'], configuration_set, shared_components=self.__get_shared_components(configuration_set), index=index)
+    
     def next(self):
         """
         Acts as an interator - returns the next set of components for next iteration of the simulation.
         A StopIteration exception is raised if no further configuration iterations are available.
         """
-        def get_next_configuration():
-            """
-            Returns the next configuration set from the configuration file.
-            If no further configuration sets are available, None is returned.
-            """
-            iteration_config = self.__iterables[self.__iterables_counter]
-
-            for static_option in self.__static:
-                if static_option not in self._config_dict:
-                    raise ConfigReaderError("Simulation configuration option '{0}' not found. Please check the SimulationConfigReader class for typos.".format(static_option))
-
-                iteration_config[static_option] = self._config_dict[static_option]
-
-            return iteration_config
-        
-        if self.__iterables_counter >= len(self.__iterables):
+        if self.__iterables_counter >= self.__index_range[1]:
             raise StopIteration  # No more iterations available!
         
-        components = {}
-        configuration_set = get_next_configuration()
-        
-        from component_generators.simulation_generator import SimulationComponentGenerator
-        bg = SimulationComponentGenerator(self._config_dict['@id'], configuration_set)
+        bg = self.get_configuration(self.__iterables_counter)
         
         #print bg
         
         self.__iterables_counter = self.__iterables_counter + 1
         return bg
     
-    def __calculate_iterations(self):
+    def __calculate_iterations(self, shard, index_range):
+        """
+        Works out the dimensions of the sweep (the topics, and the users - with one entry per seed), and the range of indices
+        to iterate over. Configurations are not materialised; each is created from its index when it is reached (see
+        get_configuration()), so a slice of a large sweep can be run without generating the whole sweep.
+        """
+        self.__topics = self.__get_entries('topics')
+        self.__users = self.__get_entries('users')
+        
+        # Restrict the topics and users, if filters were specified.
+        if self.__topic_filter is not None:
+            self.__topics = [topic for topic in self.__topics if topic['@id'] in self.__topic_filter]
+        
+        if self.__user_filter is not None:
+            self.__users = [user for user in self.__users if user['@configurationFile'] in self.__user_filter]
+        
+        self.__users = self.__expand_seeds(self.__users)
+        
+        # Select the range of indices to iterate over; the intersection of the shard and the range, if specified.
+        count = self.get_configuration_count()
+        start, stop = 0, count
+        
+        if shard is not None:
+            shard_index, shard_count = shard
+            
+            if shard_count < 1 or shard_index < 0 or shard_index >= shard_count:
+                raise ConfigReaderError("Invalid shard: {0}/{1}".format(shard_index, shard_count))
+            
+            # Shards are contiguous blocks, so seed sweeps (and the work they share) are rarely split between shards.
+            start, stop = (count * shard_index) // shard_count, (count * (shard_index + 1)) // shard_count
+        
+        if index_range is not None:
+            if index_range[0] < 0 or index_range[1] < index_range[0]:
+                raise ConfigReaderError("Invalid configuration range: {0}:{1}".format(index_range[0], index_range[1]))
+            
+            start, stop = max(start, index_range[0]), min(stop, index_range[1])
+        
+        self.__index_range = (start, max(start, stop))
+        self.__iterables_counter = start
+    
+    def __get_entries(self, type_options):
         """
-        Returns a list of the objects which are to be traversed through, making all the different possible combinations of simulations to run.
+        Returns the list of entries (e.g. topic dictionaries) for the given iterable option (e.g. 'topics').
         """
-        iterables = {}
+        key = self._config_dict[type_options].keys()[0]
+        data = self._config_dict[type_options][key]
         
-        def get_type(type_options):
-            key = self._config_dict[type_options].keys()[0]
-            data = self._config_dict[type_options][key]
+        if type(data) == dict:
+            return [data]
+        
+        return data
+    
+    def __expand_seeds(self, users):
+        """
+        Given the list of users, returns a list with each user that specifies seeds repeated once per seed.
+        The seed is the innermost dimension - so the iterations of a seed sweep are consecutive, and can share components.
+        If seeds were passed to the constructor, every user is repeated once per seed passed.
+        """
+        expanded = []
+        
+        for user in users:
+            seeds = self.__seeds
             
-            if type(data) == dict:
-                iterables[key] = [data]
-            else:
-                iterables[key] = data
+            if seeds is None:
+                seeds = UserConfigReader(user['@configurationFile']).get_seeds()
+            
+            if seeds is None:
+                expanded.append(user)
+                continue
+            
+            for seed in seeds:
+                seeded_user = dict(user)
+                seeded_user['@seed'] = seed
+                expanded.append(seeded_user)
         
-        for config_type in self.__iterables:
-            get_type(config_type)
+        return expanded
+    
+    def __get_shared_components(self, configuration_set):
+        """
+        Returns the SharedComponents object for the given configuration set if it is part of a seed sweep; None otherwise.
+        A new object is created for the first seed of each sweep; only the components of the current sweep are held.
+        """
+        if configuration_set['user'].get('@seed') is None:
+            return None
+        
+        key = (configuration_set['topic']['@id'], configuration_set['user']['@configurationFile'])
         
-        self.__iterables = [dict(zip(iterables, v)) for v in product(*iterables.values())]  # Calculates the cartesian product of all the lists to iterate to generate permutations.
-        self.__iterables_counter = 0
+        if key != self.__shared_key:
+            from component_generators.simulation_generator import SharedComponents
+            self.__shared_components = SharedComponents()
+            self.__shared_key = key
+        
+        return self.__shared_components
     
     def _validate_config(self):
         """
@@ -98,6 +221,54 @@ class SimulationConfigReader(BaseConfigReader):
         self._config_dict['output']['@saveRelevanceJudgments'] = parse_boolean(self._config_dict['output']['@saveRelevanceJudgments'])
         self._config_dict['output']['@trec_eval'] = parse_boolean(self._config_dict['output']['@trec_eval'])
         
+        # Streaming output options are optional; if not specified, output is held in memory until the simulation completes.
+        self._config_dict['output']['@streamOutput'] = parse_boolean(self._config_dict['output'].get('@streamOutput', 'false'))
+        self._config_dict['output']['@flushThreshold'] = int(self._config_dict['output'].get('@flushThreshold', 1000))
+        self._config_dict['output']['@compressOutput'] = parse_boolean(self._config_dict['output'].get('@compressOutput', 'false'))
+        
+        if self._config_dict['output']['@flushThreshold'] < 1:
+            raise ConfigReaderError("The output flushThreshold must be a positive integer.")
+        
+        # The evaluator used when trec_eval is true; either the trec_eval binary (the default), or the native evaluator.
+        self._config_dict['output']['@evaluator'] = self._config_dict['output'].get('@evaluator', 'trec_eval')
+        
+        if self._config_dict['output']['@evaluator'] not in ['trec_eval', 'native']:
+            raise ConfigReaderError("Invalid evaluator: '{0}'".format(self._config_dict['output']['@evaluator']))
+        
+        # The output backend; either individual files per simulation (the default), a single SQLite results store,
+        # or null - where only the summary counters, marked documents and evaluation measures are kept, and passed to a sink.
+        self._config_dict['output']['@backend'] = self._config_dict['output'].get('@backend', 'files')
+        self._config_dict['output']['@storeBatchSize'] = int(self._config_dict['output'].get('@storeBatchSize', 100))
+        
+        if self._config_dict['output']['@backend'] not in ['files', 'sqlite', 'null']:
+            raise ConfigReaderError("Invalid output backend: '{0}'".format(self._config_dict['output']['@backend']))
+        
+        if '@resultsStore' not in self._config_dict['output']:
+            self._config_dict['output']['@resultsStore'] = os.path.join(self._config_dict['output']['@baseDirectory'], 'results.db')
+        
+        # Export of the interaction log as structured events; either none (the default), or JSON lines.
+        self._config_dict['output']['@eventExport'] = self._config_dict['output'].get('@eventExport', 'none')
+        
+        if self._config_dict['output']['@eventExport'] not in ['none', 'jsonl']:
+            raise ConfigReaderError("Invalid event export format: '{0}'".format(self._config_dict['output']['@eventExport']))
+        
+        # Timing of the calls made to each component of the simulated user; off by default.
+        self._config_dict['output']['@componentTiming'] = parse_boolean(self._config_dict['output'].get('@componentTiming', 'false'))
+        
+        # Tracking of the memory used by each simulation; off by default, but implied by a memory budget (in MB).
+        self._config_dict['output']['@memoryTracking'] = parse_boolean(self._config_dict['output'].get('@memoryTracking', 'false'))
+        
+        if '@memoryBudget' in self._config_dict['output']:
+            try:
+                self._config_dict['output']['@memoryBudget'] = float(self._config_dict['output']['@memoryBudget'])
+            except ValueError:
+                raise ConfigReaderError("The output memoryBudget must be a number of MB.")
+            
+            if self._config_dict['output']['@memoryBudget'] <= 0:
+                raise ConfigReaderError("The output memoryBudget must be a positive number of MB.")
+            
+            self._config_dict['output']['@memoryTracking'] = True
+        
         # Topics
         def check_topic(t):
             """
@@ -1,5 +1,5 @@
 from simiir.config_readers.base_config_reader import BaseConfigReader
-from simiir.config_readers import empty_string_check, check_attributes
+from simiir.config_readers import parse_boolean, empty_string_check, check_attributes, parse_seed_range
 from simiir.config_readers.component_generators.user_generator import UserComponentGenerator
 
 class UserConfigReader(BaseConfigReader):
@@ -9,11 +9,18 @@ class UserConfigReader(BaseConfigReader):
     def __init__(self, config_filename=None):
         super(UserConfigReader, self).__init__(config_filename=config_filename, dtd_filename='user.dtd')
     
-    def get_component_generator(self, simulation_components):
+    def get_component_generator(self, simulation_components, seed=None, shared_components=None):
         """
         Returns a component generator for the given user configuration.
+        If a seed is given, it is used as the base_seed of the user's stochastic components.
         """
-        return UserComponentGenerator(simulation_components, self._config_dict)
+        return UserComponentGenerator(simulation_components, self._config_dict, seed=seed, shared_components=shared_components)
+    
+    def get_seeds(self):
+        """
+        Returns the list of seeds the user is to be simulated with, or None if no seeds are specified.
+        """
+        return self._config_dict['@seeds']
     
     def _validate_config(self):
         """
@@ -23,6 +30,15 @@ class UserConfigReader(BaseConfigReader):
         # User ID
         empty_string_check(self._config_dict['@id'])
         
+        # Seeds; optional. If specified, the user is simulated once per seed (see SimulationConfigReader).
+        if '@seeds' in self._config_dict:
+            self._config_dict['@seeds'] = parse_seed_range(self._config_dict['@seeds'])
+        else:
+            self._config_dict['@seeds'] = None
+        
+        # Common random numbers; optional (see utils.random_streams).
+        self._config_dict['@commonRandomNumbers'] = parse_boolean(self._config_dict.get('@commonRandomNumbers', 'false'))
+        
         # Query Generator
         empty_string_check(self._config_dict['queryGenerator']['@class'])
         check_attributes(self._config_dict['queryGenerator'])
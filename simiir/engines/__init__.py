@@ -0,0 +1,5 @@
+class EngineError(Exception):
+    """
+    Raised when a simulation configuration cannot be run by one of the replicate engines (e.g. an unsupported component).
+    """
+    pass
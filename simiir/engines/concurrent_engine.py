@@ -0,0 +1,97 @@
+import gc
+import logging
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+log = logging.getLogger('engines.concurrent_engine')
+
+#
+# Runs independent simulations concurrently, in one process - so that when the search engine is remote (e.g. the ifind
+# engine's Redis cache, or a search service), the round trips of many simulated users are in flight at once, rather than
+# each user waiting on its own in turn.
+#
+# Each simulation's SimulatedUser runs in a worker thread; a user is suspended whenever it blocks on I/O (issuing a query,
+# or retrieving a document), and the others carry on. Only the simulation loop runs in the workers: configurations are
+# generated, and simulations displayed and saved, on the calling thread - in the order the configurations are read - so
+# output controllers, results stores and the aggregate timings are never touched concurrently. At most `concurrency`
+# simulations are in progress at a time.
+#
+# Components shared between simulations (the search interface of a seed sweep) must be thread-safe; the bundled search
+# interfaces are. The Whoosh interfaces give each worker thread its own engine (opening the index once per thread), so
+# queries that miss the cache are searched at once - but as Whoosh ranks in Python, those searches still share the
+# interpreter lock; only their I/O (reading the index, and Redis) overlaps. Users with a seed are reproducible, as each
+# stochastic component draws from its own Random instance; users without one draw from the shared random module, in
+# whatever order the threads interleave. As simulations overlap, per-simulation memory tracking and the component timings
+# of a shared search interface are approximate.
+#
+
+
+class ConcurrentEngine(object):
+    """
+    Runs the simulations of the given configurations (e.g. a SimulationConfigReader), up to concurrency at a time.
+    If limits (see utils.watchdog) are given, each simulation is run with a Watchdog, and its outcome added to the manifest.
+    """
+    def __init__(self, configurations, concurrency, limits=None, manifest=None):
+        self.__configurations = configurations
+        self.__concurrency = concurrency
+        self.__limits = limits
+        self.__manifest = manifest
+
+    def run(self):
+        """
+        Runs every simulation to completion, displaying and saving each (in order) as it completes.
+        Returns the number of simulations run. An exception raised by a simulation is raised here, once those in progress end.
+        """
+        from sim_user import SimulatedUser
+        from simiir.utils.watchdog import Watchdog
+
+        pool = ThreadPool(self.__concurrency)
+        in_progress = deque()  # Of (configuration, watchdog, AsyncResult) tuples, in the order the configurations were read.
+        simulations = 0
+
+        try:
+            for configuration in self.__configurations:
+                if len(in_progress) >= self.__concurrency:
+                    self.__complete(*in_progress.popleft())
+                    simulations = simulations + 1
+
+                user = SimulatedUser(configuration)
+                watchdog = Watchdog(**self.__limits) if self.__manifest is not None else None
+                in_progress.append((configuration, watchdog, pool.apply_async(user.run_until_finished, (watchdog,))))
+
+            while in_progress:
+                self.__complete(*in_progress.popleft())
+                simulations = simulations + 1
+        finally:
+            pool.close()
+            pool.join()
+
+        return simulations
+
+    def __complete(self, configuration, watchdog, result):
+        """
+        Waits for the given simulation to finish, then displays and saves it - or, if it exceeded its limits, records it as
+        failed in the manifest and discards its output.
+        """
+        from simiir.utils.watchdog import SimulationLimitError
+
+        while not result.ready():
+            result.wait(1.0)  # Waits with a timeout, so the wait can be interrupted (e.g. with Ctrl-C).
+
+        try:
+            steps, steps_per_second = result.get()  # Raises the simulation's exception, if it failed.
+        except SimulationLimitError, e:
+            self.__manifest.add(configuration, watchdog, error=e)
+            configuration.output.discard()  # Removes any partial streamed logs.
+            gc.collect()
+            return
+
+        if self.__manifest is not None:
+            self.__manifest.add(configuration, watchdog)
+
+        log.debug("Simulation {0} complete ({1} steps)".format(configuration.base_id, steps))
+
+        configuration.output.display_config()
+        configuration.output.display_report()
+        configuration.output.save()
+        gc.collect()
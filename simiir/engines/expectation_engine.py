@@ -0,0 +1,226 @@
+import logging
+import numpy
+from simiir.engines import EngineError
+from simiir.engines.session_plan import SessionPlan
+from simiir.engines.lockstep_engine import get_component_parameters, get_judge, SUPPORTED_CLASSIFIERS, SUPPORTED_SERP_IMPRESSIONS, SUPPORTED_LOGGERS
+
+log = logging.getLogger('engines.expectation_engine')
+
+#
+# An analytic fast path for qrels-driven simulated users.
+# For each query, the probability of examining the snippet at each rank is computed in closed form from the SERP's judgements
+# (or, for INST, by a dynamic programme over the gain accumulated so far), rather than by sampling. From these, the expected
+# number of snippets and documents examined, documents marked, gain and time are obtained - per query, and for the session.
+#
+# Sessions are combined with a mean-field approximation: queries are issued while the expected elapsed time is within the
+# time limit, and a rank only contributes if the time taken to reach it is within the limit. The probability that each document
+# has been examined earlier in the session is tracked, so previously seen documents are skipped in expectation.
+#
+
+SUPPORTED_DECISION_MAKERS = ['FixedDepthDecisionMaker',
+                             'RBPDecisionMaker',
+                             'INSTDecisionMaker']
+
+
+class ExpectationEngine(object):
+    """
+    Computes the expected outcome of a simulation configuration, over the FixedCostLogger cost model.
+    """
+    def __init__(self, configuration):
+        self.__configuration = configuration
+
+        if getattr(configuration.user.query_generator, 'updating', False):
+            raise EngineError("Query generators that update their model cannot be used with the expectation engine.")
+
+        if configuration.user.serp_impression.novel_snippets_only:
+            raise EngineError("SERP impressions considering novel snippets only cannot be used with the expectation engine.")
+
+        self.__snippet_classifier = get_component_parameters(configuration, 'snippet_classifier', SUPPORTED_CLASSIFIERS, 'expectation')
+        self.__document_classifier = get_component_parameters(configuration, 'document_classifier', SUPPORTED_CLASSIFIERS, 'expectation')
+        self.__serp_impression = get_component_parameters(configuration, 'serp_impression', SUPPORTED_SERP_IMPRESSIONS, 'expectation')
+        self.__decision_maker = get_component_parameters(configuration, 'decision_maker', SUPPORTED_DECISION_MAKERS, 'expectation')
+        self.__logger = get_component_parameters(configuration, 'logger', SUPPORTED_LOGGERS, 'expectation')
+
+        self.__plan = SessionPlan(configuration,
+                                  snippet_judge=get_judge(configuration.user.snippet_classifier, self.__snippet_classifier),
+                                  document_judge=get_judge(configuration.user.document_classifier, self.__document_classifier),
+                                  patch_judgements=self.__serp_impression[0] != 'SimpleSERPImpression')
+
+    def run(self):
+        """
+        Computes the expected outcome of the search session.
+        Returns a dictionary with the expected summary counters (a list of (name, value) tuples, named as per
+        SearchContext.get_summary(), with TOTAL_TREC_RELEVANT_MARKED and TOTAL_TIME added), and a list of dictionaries with
+        the expectations for each query issued.
+        """
+        time_limit = self.__get_time_limit()
+        marked_goal = self.__logger[1].get('marked_goal') if self.__logger[0] == 'FixedCostGoalLogger' else None
+
+        elapsed_time = 0.0
+        totals = dict.fromkeys(['snippets', 'documents', 'marked', 'gain', 'attractive', 'unattractive'], 0.0)
+        queries = []
+        seen_probability = numpy.zeros(0)
+
+        while elapsed_time < time_limit and (marked_goal is None or totals['marked'] < marked_goal):
+            planned_query = self.__plan.get_query(len(queries))
+
+            if planned_query is None:
+                break  # The query generator has run out of queries.
+
+            seen_probability = numpy.concatenate([seen_probability, numpy.zeros(self.__plan.get_document_count() - seen_probability.size)])
+            expectation = self.__expect_query(planned_query, seen_probability, elapsed_time, time_limit)
+
+            elapsed_time = elapsed_time + expectation['time']
+            queries.append(expectation)
+
+            for key in totals.keys():
+                totals[key] = totals[key] + expectation[key]
+
+        summary = [('TOTAL_QUERIES_ISSUED', len(queries)),
+                   ('TOTAL_SNIPPETS_EXAMINED', totals['snippets']),
+                   ('TOTAL_DOCUMENTS_EXAMINED', totals['documents']),
+                   ('TOTAL_DOCUMENTS_MARKED_RELEVANT', totals['marked']),
+                   ('TOTAL_ATTRACTIVE_SERP_IMPRESSIONS', totals['attractive']),
+                   ('TOTAL_UNATTRACTIVE_SERP_IMPRESSIONS', totals['unattractive']),
+                   ('TOTAL_TREC_RELEVANT_MARKED', totals['gain']),
+                   ('TOTAL_TIME', elapsed_time)]
+
+        return {'summary': summary, 'queries': queries}
+
+    def __get_time_limit(self):
+        """
+        Returns the session time limit for the configured logger; FixedCostLoggerNoTime imposes no limit.
+        """
+        if self.__logger[0] == 'FixedCostLoggerNoTime':
+            return float('inf')
+
+        return self.__logger[1]['time_limit']
+
+    def __expect_query(self, planned_query, seen_probability, start_time, time_limit):
+        """
+        Returns a dictionary of the expectations for a single query, issued at start_time.
+        seen_probability (the probability that each document in the plan has been examined) is updated in place.
+        """
+        costs = self.__logger[1]
+        expectation = dict.fromkeys(['snippets', 'documents', 'marked', 'gain', 'attractive', 'unattractive'], 0.0)
+        expectation['query'] = planned_query.text
+        expectation['serp_length'] = len(planned_query.doc_ids)
+        expectation['p_enter'] = 0.0
+        expectation['time'] = costs['query_cost']
+
+        serp_time = start_time + costs['query_cost']
+
+        if serp_time >= time_limit:
+            return expectation  # The time limit is reached before the SERP is examined.
+
+        expectation['time'] = expectation['time'] + costs['serp_results_cost']
+
+        if not planned_query.doc_ids:
+            return expectation  # An empty SERP; no impression is recorded.
+
+        enter = self.__get_enter_probability(planned_query)
+        expectation['p_enter'] = enter
+        expectation['attractive'] = enter
+        expectation['unattractive'] = 1.0 - enter
+
+        columns = planned_query.columns
+        click = (1.0 - seen_probability[columns]) * self.__get_relevant_probability(self.__snippet_classifier, planned_query.snippet_judgements)
+        accept = self.__get_relevant_probability(self.__document_classifier, planned_query.document_judgements)
+
+        # The expected cost of examining each rank; and the time at which each rank is reached (given the user gets there).
+        rank_cost = costs['snippet_cost'] + click * (costs['document_cost'] + accept * costs['mark_document_cost'])
+        reach_time = serp_time + costs['serp_results_cost'] + numpy.concatenate([[0.0], numpy.cumsum(rank_cost)[:-1]])
+
+        examine = self.__get_examine_probability(click) * (reach_time < time_limit) * enter
+
+        expectation['snippets'] = examine.sum()
+        expectation['documents'] = (examine * click).sum()
+        expectation['marked'] = (examine * click * accept).sum()
+        expectation['gain'] = (examine * click * accept * (planned_query.document_judgements > 0)).sum()
+        expectation['time'] = expectation['time'] + (examine * rank_cost).sum()
+
+        seen_probability[columns] += examine * click
+        return expectation
+
+    def __get_enter_probability(self, planned_query):
+        """
+        Returns the probability that the configured SERP impression considers the SERP attractive.
+        """
+        class_name, parameters = self.__serp_impression
+
+        if class_name == 'SimpleSERPImpression':
+            return 1.0
+
+        precision = planned_query.patch_judgements.sum() / float(planned_query.patch_judgements.size)
+
+        if class_name == 'PerfectSERPImpression':
+            return float(precision > parameters['viewport_precision_threshold'])
+
+        if precision > parameters['viewport_precision_threshold']:
+            return 1.0 - parameters['good_abandon_probability']
+
+        return 1.0 - parameters['bad_abandon_probability']
+
+    def __get_relevant_probability(self, classifier, judgements):
+        """
+        Returns the probability that the given classifier considers each item relevant, given the QREL judgements.
+        """
+        class_name, parameters = classifier
+
+        if class_name == 'TrecTextClassifier':
+            return numpy.ones(judgements.size)
+
+        if class_name == 'StochasticInformedTrecTextClassifier':
+            return numpy.where(judgements > 0, min(parameters['rprob'], 1.0), min(parameters['nprob'], 1.0))
+
+        return (judgements > 0).astype(float)
+
+    def __get_examine_probability(self, click):
+        """
+        Given the probability that the snippet at each rank is considered relevant, returns the probability that the user
+        examines the snippet at each rank (having entered the SERP), as per the configured decision maker.
+        """
+        class_name, parameters = self.__decision_maker
+        ranks = numpy.arange(1, click.size + 1)
+
+        if class_name == 'FixedDepthDecisionMaker':
+            return (ranks <= max(parameters['depth'], 1)).astype(float)
+
+        if class_name == 'RBPDecisionMaker':
+            # After rank i, the user continues with probability patience^(i-1).
+            continue_probability = numpy.minimum(float(parameters['patience']) ** (ranks[:-1] - 1.0), 1.0)
+            return numpy.concatenate([[1.0], numpy.cumprod(continue_probability)])
+
+        return self.__get_inst_examine_probability(click, float(parameters['t']))
+
+    def __get_inst_examine_probability(self, click, t):
+        """
+        Returns the probability of examining each rank under INST. As the probability of continuing depends upon the gain
+        accumulated so far (and the judgement at rank 1), the distribution of (first judgement, gain) is propagated rank by rank.
+        """
+        size = click.size
+        examine = numpy.zeros(size)
+        examine[0] = 1.0
+
+        # state[r1, g] - the probability of having examined the current rank, with a first judgement r1 and a gain of g.
+        state = numpy.zeros((2, size + 1))
+        state[1, 1] = click[0]
+        state[0, 0] = 1.0 - click[0]
+        gain = numpy.arange(size + 1)
+        first_judgement = numpy.array([[0.0], [1.0]])
+
+        for rank in range(1, size):
+            # The probability of continuing is W(rank) / W(1), where W(i) = 1 / (i + T + (T - gain))^2.
+            # Only states that can be reached (gain <= rank) are considered.
+            reachable = state > 0
+            w_1 = 1.0 / (1.0 + t + (t - first_judgement)) ** 2
+            w_i = 1.0 / (rank + t + (t - numpy.where(reachable, gain, 0))) ** 2
+            state = numpy.where(reachable, state * numpy.minimum(w_i / w_1, 1.0), 0.0)
+
+            examine[rank] = state.sum()
+
+            shifted = numpy.zeros(state.shape)
+            shifted[:, 1:] = state[:, :-1]
+            state = state * (1.0 - click[rank]) + shifted * click[rank]
+
+        return examine
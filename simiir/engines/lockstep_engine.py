@@ -0,0 +1,487 @@
+import time
+import inspect
+import logging
+import numpy
+from simiir.engines import EngineError
+from simiir.engines.session_plan import SessionPlan
+
+log = logging.getLogger('engines.lockstep_engine')
+
+#
+# A replicate engine for stochastic simulated users.
+# Rather than running a simulation once per seed, R replicates of the same configuration are advanced together, one action
+# per replicate per step. State is held as arrays (one element per replicate), queries, SERPs and judgements are shared
+# through a SessionPlan, and random numbers are drawn in batches.
+#
+# The workflow mirrors SimulatedUser.decide_action(). Only components whose behaviour can be expressed over arrays are
+# supported; the component classes (and their parameters) are read from the configuration.
+#
+
+QUERY, SERP, SNIPPET, DOC, MARK, NONE, DECIDE = range(7)
+
+# The next action, given the last action (rows) and its outcome (columns: False, True). See SimulatedUser.
+TRANSITIONS = numpy.array([[SERP, SERP],        # QUERY
+                           [QUERY, SNIPPET],    # SERP
+                           [DECIDE, DOC],       # SNIPPET
+                           [DECIDE, MARK],      # DOC
+                           [DECIDE, DECIDE],    # MARK
+                           [QUERY, QUERY]])     # NONE (start of the session)
+
+SUPPORTED_CLASSIFIERS = ['TrecTextClassifier',
+                         'InformedTrecTextClassifier',
+                         'PerfectTrecTextClassifier',
+                         'StochasticInformedTrecTextClassifier']
+
+SUPPORTED_SERP_IMPRESSIONS = ['SimpleSERPImpression',
+                              'PerfectSERPImpression',
+                              'StochasticSERPImpression']
+
+SUPPORTED_DECISION_MAKERS = ['FixedDepthDecisionMaker',
+                             'RBPDecisionMaker',
+                             'INSTDecisionMaker',
+                             'SatisfactionDecisionMaker',
+                             'SequentialNonrelDecisionMaker',
+                             'TotalNonrelDecisionMaker',
+                             'TimeDecisionMaker',
+                             'TimeSinceRelevancyDecisionMaker']
+
+SUPPORTED_LOGGERS = ['FixedCostLogger',
+                     'FixedCostLoggerNoTime',
+                     'FixedCostGoalLogger']
+
+
+def get_component_parameters(configuration, component_name, supported_classes, engine_name='replicate'):
+    """
+    Returns a tuple of the class name, and a dictionary of parameters, for the given component of the simulated user.
+    Parameters are the defaults of the component's constructor, overridden by any attributes set in the user configuration.
+    An EngineError is raised if the component's class is not one of the supported classes; engine_name names the engine
+    in its message.
+    """
+    component = getattr(configuration.user, component_name)
+    class_name = type(component).__name__
+
+    if class_name not in supported_classes:
+        raise EngineError("The {0} '{1}' is not supported by the {2} engine.".format(component_name, class_name, engine_name))
+
+    argspec = inspect.getargspec(type(component).__init__)
+    parameters = {}
+
+    if argspec.defaults:
+        parameters.update(zip(argspec.args[-len(argspec.defaults):], argspec.defaults))
+
+    parameters.update(configuration.user.get_component_attributes(component_name))
+    return class_name, parameters
+
+
+def get_judge(classifier, classifier_parameters):
+    """
+    Returns the judgement lookup of the given classifier (for a SessionPlan), or None if the classifier does not use the QRELS.
+    classifier_parameters is the (class name, parameters) tuple returned by get_component_parameters().
+    """
+    if classifier_parameters[0] == 'TrecTextClassifier':
+        return None
+
+    return classifier._get_judgment
+
+
+class LockstepEngine(object):
+    """
+    Runs a number of replicates of a simulation configuration in lockstep.
+    Each replicate behaves as the SimulatedUser would with a different seed; replicates share the session plan, but each
+    has its own random draws.
+    """
+    def __init__(self, configuration, replicates, seed=0):
+        self.__configuration = configuration
+        self.__replicates = replicates
+
+        if getattr(configuration.user.query_generator, 'updating', False):
+            raise EngineError("Query generators that update their model cannot be used with the replicate engine.")
+
+        if type(configuration.user.search_context).__name__ != 'SearchContext':
+            raise EngineError("The replicate engine requires the SearchContext search context.")
+
+        if getattr(configuration.user, 'common_random_numbers', False):
+            raise EngineError("Common random numbers cannot be used with the replicate engine; its random numbers are drawn in batches.")
+
+        self.__snippet_classifier = get_component_parameters(configuration, 'snippet_classifier', SUPPORTED_CLASSIFIERS)
+        self.__document_classifier = get_component_parameters(configuration, 'document_classifier', SUPPORTED_CLASSIFIERS)
+        self.__serp_impression = get_component_parameters(configuration, 'serp_impression', SUPPORTED_SERP_IMPRESSIONS)
+        self.__decision_maker = get_component_parameters(configuration, 'decision_maker', SUPPORTED_DECISION_MAKERS)
+        self.__logger = get_component_parameters(configuration, 'logger', SUPPORTED_LOGGERS)
+
+        # Attributes of the SERP impression which are not constructor arguments are read from the component itself.
+        self.__viewport_size = configuration.user.serp_impression.viewport_size
+        self.__novel_snippets_only = configuration.user.serp_impression.novel_snippets_only
+
+        self.__plan = SessionPlan(configuration,
+                                  snippet_judge=get_judge(configuration.user.snippet_classifier, self.__snippet_classifier),
+                                  document_judge=get_judge(configuration.user.document_classifier, self.__document_classifier),
+                                  patch_judgements=self.__serp_impression[0] != 'SimpleSERPImpression')
+
+        # A separate random stream for each stochastic component.
+        self.__serp_random = numpy.random.RandomState(seed + 0)
+        self.__snippet_random = numpy.random.RandomState(seed + 256)
+        self.__document_random = numpy.random.RandomState(seed + 512)
+        self.__decision_random = numpy.random.RandomState(seed + 1024)
+
+        self.__initialise_state()
+
+    def __initialise_state(self):
+        """
+        Creates the state arrays, with one element per replicate.
+        """
+        replicates = self.__replicates
+
+        self.__active = numpy.ones(replicates, dtype=bool)
+        self.__last_action = numpy.empty(replicates, dtype=numpy.int64)
+        self.__last_action.fill(NONE)
+        self.__action_value = numpy.zeros(replicates, dtype=bool)
+        self.__exhausted = numpy.zeros(replicates, dtype=bool)
+
+        self.__time = numpy.zeros(replicates)
+        self.__last_query_time = numpy.zeros(replicates)
+        self.__last_marked_time = numpy.zeros(replicates)
+        self.__last_relevant_snippet_time = numpy.zeros(replicates)
+
+        self.__query_index = numpy.zeros(replicates, dtype=numpy.int64)  # The index of the current query within the plan.
+        self.__queries_issued = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__results_length = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__position = numpy.zeros(replicates, dtype=numpy.int64)  # Snippets examined for the current query.
+
+        self.__snippets_examined = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__documents_examined = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__documents_marked = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__attractive_serps = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__unattractive_serps = numpy.zeros(replicates, dtype=numpy.int64)
+
+        # Statistics over the snippets examined for the current query, used by the decision makers.
+        self.__relevant_snippets = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__nonrelevant_snippets = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__nonrelevant_run = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__longest_nonrelevant_run = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__cumulative_gain = numpy.zeros(replicates, dtype=numpy.int64)
+        self.__first_judgement = numpy.zeros(replicates, dtype=numpy.int64)
+
+        # Per-document state; one column per document in the plan, grown as required.
+        self.__documents_seen = numpy.zeros((replicates, 0), dtype=bool)
+        self.__snippets_seen = numpy.zeros((replicates, 0), dtype=bool)
+        self.__marked_order = numpy.zeros((replicates, 0), dtype=numpy.int64)
+
+    def run(self):
+        """
+        Runs all replicates until each is finished, as determined by the configured logger.
+        Returns a tuple of the number of steps (actions, over all replicates) performed, and the number of steps per second.
+        """
+        handlers = [(QUERY, self.__do_query),
+                    (SERP, self.__do_serp),
+                    (SNIPPET, self.__do_snippet),
+                    (DOC, self.__do_assess_document),
+                    (MARK, self.__do_mark_document)]
+
+        steps = 0
+        start_time = time.time()
+        self.__active = ~self.__is_finished(numpy.arange(self.__replicates))
+
+        while self.__active.any():
+            replicates = numpy.flatnonzero(self.__active)
+            actions = TRANSITIONS[self.__last_action[replicates], self.__action_value[replicates].astype(numpy.int64)]
+
+            deciding = actions == DECIDE
+
+            if deciding.any():
+                actions[deciding] = self.__do_decide(replicates[deciding])
+
+            for action, handler in handlers:
+                selected = replicates[actions == action]
+
+                if selected.size:
+                    self.__last_action[selected] = action
+                    handler(selected)
+
+            self.__active[replicates] = ~self.__is_finished(replicates)
+            steps = steps + replicates.size
+
+        elapsed_time = time.time() - start_time
+        steps_per_second = steps / elapsed_time if elapsed_time > 0 else 0.0
+
+        log.info("{0} replicates completed in {1} steps ({2:.1f} steps/sec)".format(self.__replicates, steps, steps_per_second))
+        return steps, steps_per_second
+
+    def get_results(self):
+        """
+        Returns a list of dictionaries, one per replicate, with the replicate number, the summary counters (as per
+        SearchContext.get_summary()), the queries issued, and the IDs of the documents marked relevant (in the order marked).
+        """
+        results = []
+
+        for replicate in range(self.__replicates):
+            marked_columns = numpy.flatnonzero(self.__marked_order[replicate])
+            marked_columns = marked_columns[numpy.argsort(self.__marked_order[replicate, marked_columns], kind='mergesort')]
+
+            summary = [('TOTAL_QUERIES_ISSUED', int(self.__queries_issued[replicate])),
+                       ('TOTAL_SNIPPETS_EXAMINED', int(self.__snippets_examined[replicate])),
+                       ('TOTAL_DOCUMENTS_EXAMINED', int(self.__documents_examined[replicate])),
+                       ('TOTAL_DOCUMENTS_MARKED_RELEVANT', int(self.__documents_marked[replicate])),
+                       ('TOTAL_ATTRACTIVE_SERP_IMPRESSIONS', int(self.__attractive_serps[replicate])),
+                       ('TOTAL_UNATTRACTIVE_SERP_IMPRESSIONS', int(self.__unattractive_serps[replicate]))]
+
+            results.append({'replicate': replicate,
+                            'summary': summary,
+                            'queries': [self.__plan.get_query(index).text for index in range(self.__queries_issued[replicate])],
+                            'marked': [self.__plan.doc_ids[column] for column in marked_columns]})
+
+        return results
+
+    def __is_finished(self, replicates):
+        """
+        Returns a boolean array indicating which of the given replicates have finished, as per the configured logger.
+        """
+        class_name, parameters = self.__logger
+        finished = self.__exhausted[replicates].copy()
+
+        if class_name == 'FixedCostLoggerNoTime':
+            return finished
+
+        finished |= ~(self.__time[replicates] < parameters['time_limit'])
+
+        if class_name == 'FixedCostGoalLogger':
+            finished |= self.__documents_marked[replicates] >= parameters['marked_goal']
+
+        return finished
+
+    def __grow_documents(self):
+        """
+        Widens the per-document arrays to include all documents currently in the plan.
+        Capacity is doubled each time, so the arrays are only occasionally copied.
+        """
+        required = self.__plan.get_document_count()
+        capacity = self.__documents_seen.shape[1]
+
+        if required <= capacity:
+            return
+
+        additional = max(required, capacity * 2) - capacity
+        padding = ((0, 0), (0, additional))
+
+        self.__documents_seen = numpy.pad(self.__documents_seen, padding, mode='constant')
+        self.__snippets_seen = numpy.pad(self.__snippets_seen, padding, mode='constant')
+        self.__marked_order = numpy.pad(self.__marked_order, padding, mode='constant')
+
+    def __group_by_query(self, replicates):
+        """
+        Generator yielding (PlannedQuery, replicates) tuples, grouping the given replicates by their current query.
+        """
+        query_indexes = self.__query_index[replicates]
+
+        for query_index in numpy.unique(query_indexes):
+            yield self.__plan.get_query(query_index), replicates[query_indexes == query_index]
+
+    def __do_query(self, replicates):
+        """
+        Issues the next query for each of the given replicates. Replicates for which no further queries exist are exhausted.
+        """
+        next_index = self.__queries_issued[replicates]
+        available = next_index < self.__plan.extend_to(next_index.max())
+        self.__grow_documents()
+
+        exhausted = replicates[~available]
+        self.__exhausted[exhausted] = True
+        self.__action_value[exhausted] = False
+
+        issued = replicates[available]
+        self.__time[issued] += self.__logger[1]['query_cost']
+        self.__last_query_time[issued] = self.__time[issued]
+        self.__last_marked_time[issued] = self.__time[issued]
+
+        self.__query_index[issued] = next_index[available]
+        self.__queries_issued[issued] += 1
+        self.__position[issued] = 0
+
+        self.__relevant_snippets[issued] = 0
+        self.__nonrelevant_snippets[issued] = 0
+        self.__nonrelevant_run[issued] = 0
+        self.__longest_nonrelevant_run[issued] = 0
+        self.__cumulative_gain[issued] = 0
+        self.__first_judgement[issued] = 0
+
+        for planned_query, group in self.__group_by_query(issued):
+            self.__results_length[group] = len(planned_query.doc_ids)
+
+        self.__action_value[issued] = True
+
+    def __do_serp(self, replicates):
+        """
+        Examines the SERP for each of the given replicates, using the configured SERP impression to determine attractiveness.
+        """
+        class_name, parameters = self.__serp_impression
+        self.__time[replicates] += self.__logger[1]['serp_results_cost']
+
+        for planned_query, group in self.__group_by_query(replicates):
+            if not planned_query.doc_ids:
+                self.__action_value[group] = False  # An empty SERP; no impression is recorded.
+                continue
+
+            if class_name == 'SimpleSERPImpression':
+                attractive = numpy.ones(group.size, dtype=bool)
+            else:
+                judgements = numpy.tile(planned_query.patch_judgements, (group.size, 1))
+
+                if self.__novel_snippets_only:
+                    viewport_columns = planned_query.columns[:judgements.shape[1]]
+                    judgements[self.__snippets_seen[group][:, viewport_columns]] = 0
+
+                precision = judgements.sum(axis=1) / float(judgements.shape[1])
+
+                if class_name == 'PerfectSERPImpression':
+                    attractive = ~(precision <= parameters['viewport_precision_threshold'])
+                else:
+                    threshold = numpy.where(precision > parameters['viewport_precision_threshold'],
+                                            parameters['good_abandon_probability'],
+                                            parameters['bad_abandon_probability'])
+                    attractive = ~(self.__serp_random.random_sample(group.size) < threshold)
+
+            self.__attractive_serps[group] += attractive
+            self.__unattractive_serps[group] += ~attractive
+            self.__action_value[group] = attractive
+
+    def __do_snippet(self, replicates):
+        """
+        Examines the next snippet for each of the given replicates.
+        Snippets for documents that have been previously examined are not judged (the judgement is -1).
+        """
+        self.__time[replicates] += self.__logger[1]['snippet_cost']
+
+        for planned_query, group in self.__group_by_query(replicates):
+            ranks = self.__position[group]
+            columns = planned_query.columns[ranks]
+            self.__position[group] += 1
+
+            unseen = ~self.__documents_seen[group, columns]
+            self.__snippets_seen[group, columns] = True
+
+            judgements = numpy.empty(group.size, dtype=numpy.int64)
+            judgements.fill(-1)
+            judgements[unseen] = self.__classify(self.__snippet_classifier,
+                                                 self.__snippet_random,
+                                                 planned_query.snippet_judgements[ranks[unseen]])
+
+            relevant = judgements > 0
+            self.__last_relevant_snippet_time[group[relevant]] = self.__time[group[relevant]]
+            self.__action_value[group] = relevant
+
+            self.__update_query_statistics(group, judgements)
+
+        self.__snippets_examined[replicates] += 1
+
+    def __update_query_statistics(self, replicates, judgements):
+        """
+        Updates the statistics over the current query's examined snippets with the latest judgements.
+        """
+        first = self.__position[replicates] == 1
+        self.__first_judgement[replicates[first]] = judgements[first]
+
+        self.__relevant_snippets[replicates] += judgements > 0
+        self.__nonrelevant_snippets[replicates] += judgements == 0
+        self.__nonrelevant_run[replicates] = numpy.where(judgements == 0, self.__nonrelevant_run[replicates] + 1, 0)
+        self.__longest_nonrelevant_run[replicates] = numpy.maximum(self.__longest_nonrelevant_run[replicates],
+                                                                   self.__nonrelevant_run[replicates])
+        self.__cumulative_gain[replicates] += numpy.maximum(judgements, 0)
+
+    def __do_assess_document(self, replicates):
+        """
+        Examines the document for the current snippet for each of the given replicates; relevant documents are marked.
+        """
+        self.__time[replicates] += self.__logger[1]['document_cost']
+        self.__documents_examined[replicates] += 1
+
+        for planned_query, group in self.__group_by_query(replicates):
+            ranks = self.__position[group] - 1
+            columns = planned_query.columns[ranks]
+            self.__documents_seen[group, columns] = True
+
+            relevant = self.__classify(self.__document_classifier,
+                                       self.__document_random,
+                                       planned_query.document_judgements[ranks])
+
+            self.__documents_marked[group[relevant]] += 1
+            self.__marked_order[group[relevant], columns[relevant]] = self.__documents_marked[group[relevant]]
+            self.__action_value[group] = relevant
+
+    def __do_mark_document(self, replicates):
+        """
+        Marks the current document for each of the given replicates (the document was judged relevant when examined).
+        """
+        self.__time[replicates] += self.__logger[1]['mark_document_cost']
+        self.__last_marked_time[replicates] = self.__time[replicates]
+        self.__action_value[replicates] = True
+
+    def __classify(self, classifier, random_state, judgements):
+        """
+        Returns a boolean array of relevance decisions for the given QREL judgements, as made by the given classifier.
+        """
+        class_name, parameters = classifier
+
+        if class_name == 'TrecTextClassifier':
+            return numpy.ones(judgements.size, dtype=bool)
+
+        if class_name == 'StochasticInformedTrecTextClassifier':
+            threshold = numpy.where(judgements > 0, parameters['rprob'], parameters['nprob'])
+            return ~(random_state.random_sample(judgements.size) > threshold)
+
+        return judgements > 0
+
+    def __do_decide(self, replicates):
+        """
+        Returns an array of the next action (QUERY or SNIPPET) for each of the given replicates.
+        If the end of the SERP has been reached, the next action is always a query; otherwise, the decision maker decides.
+        """
+        actions = numpy.empty(replicates.size, dtype=numpy.int64)
+        actions.fill(QUERY)
+
+        deciding = ~(self.__position[replicates] + 1 > self.__results_length[replicates])
+
+        if deciding.any():
+            stop = self.__decide_stop(replicates[deciding])
+            actions[deciding] = numpy.where(stop, QUERY, SNIPPET)
+
+        return actions
+
+    def __decide_stop(self, replicates):
+        """
+        Returns a boolean array, indicating whether the configured decision maker would stop examining the current SERP.
+        """
+        class_name, parameters = self.__decision_maker
+        position = self.__position[replicates]
+
+        if class_name == 'FixedDepthDecisionMaker':
+            return ~(position < parameters['depth'])
+
+        if class_name == 'RBPDecisionMaker':
+            rbp_score = parameters['patience'] ** (position - 1.0)
+            return self.__decision_random.random_sample(replicates.size) > rbp_score
+
+        if class_name == 'INSTDecisionMaker':
+            t = float(parameters['t'])
+            w_i = 1.0 / (position + t + (t - self.__cumulative_gain[replicates])) ** 2
+            w_1 = 1.0 / (1 + t + (t - numpy.maximum(self.__first_judgement[replicates], 0))) ** 2
+            return self.__decision_random.random_sample(replicates.size) > (w_i / w_1)
+
+        if class_name == 'SatisfactionDecisionMaker':
+            return (parameters['relevant_threshold'] > 0) & (self.__relevant_snippets[replicates] >= parameters['relevant_threshold'])
+
+        if class_name == 'SequentialNonrelDecisionMaker':
+            return (parameters['nonrelevant_threshold'] > 0) & (self.__longest_nonrelevant_run[replicates] >= parameters['nonrelevant_threshold'])
+
+        if class_name == 'TotalNonrelDecisionMaker':
+            return (parameters['nonrelevant_threshold'] > 0) & (self.__nonrelevant_snippets[replicates] >= parameters['nonrelevant_threshold'])
+
+        if class_name == 'TimeDecisionMaker':
+            return (self.__time[replicates] - self.__last_query_time[replicates]) >= parameters['timeout_threshold']
+
+        # TimeSinceRelevancyDecisionMaker
+        if parameters['on_mark']:
+            last_relevant_time = self.__last_marked_time[replicates]
+        else:
+            last_relevant_time = self.__last_relevant_snippet_time[replicates]
+
+        return (self.__time[replicates] - last_relevant_time) >= parameters['timeout_threshold']
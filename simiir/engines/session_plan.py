@@ -0,0 +1,121 @@
+import numpy
+
+class PlannedQuery(object):
+    """
+    A single query within a SessionPlan - the query text, the documents on its SERP (in rank order), and the judgements
+    the simulated user's components would look up for each of those documents.
+    """
+    def __init__(self, text, doc_ids, columns, snippet_judgements, document_judgements, patch_judgements):
+        self.text = text
+        self.doc_ids = doc_ids                          # Document IDs on the SERP, in rank order.
+        self.columns = columns                          # For each rank, the column of the document within the plan.
+        self.snippet_judgements = snippet_judgements    # Judgement looked up by the snippet classifier, for each rank.
+        self.document_judgements = document_judgements  # Judgement looked up by the document classifier, for each rank.
+        self.patch_judgements = patch_judgements        # Binary judgements used by the SERP impression (the viewport only).
+
+
+class SessionPlan(object):
+    """
+    The sequence of queries, SERPs and judgements shared by all replicates of a simulation configuration.
+
+    For query generators that do not update their model, the queries issued by a simulated user depend only upon the queries
+    issued before them - so the nth query (and its SERP) is the same for every replicate, whatever was examined in between.
+    The plan is built lazily, using the configuration's own query generator and search context, so each query is generated,
+    issued and judged once - no matter how many replicates reach it.
+
+    Each distinct document in the plan is assigned a column, so replicates can track the documents they have seen in arrays.
+    """
+    def __init__(self, configuration, snippet_judge=None, document_judge=None, patch_judgements=False):
+        """
+        snippet_judge and document_judge are callables taking a topic ID and document ID, returning a judgement; if None,
+        judgements are not looked up. If patch_judgements is True, the SERP impression's viewport judgements are computed.
+        """
+        self.__search_context = configuration.user.search_context
+        self.__query_generator = configuration.user.query_generator
+        self.__serp_impression = configuration.user.serp_impression
+        self.__topic_id = configuration.topic.id
+
+        self.__snippet_judge = snippet_judge
+        self.__document_judge = document_judge
+        self.__patch_judgements = patch_judgements
+
+        self.__queries = []
+        self.__exhausted = False
+
+        self.__columns = {}
+        self.doc_ids = []  # The document ID for each column.
+
+    def extend_to(self, index):
+        """
+        Ensures that queries up to (and including) the given index have been planned, if the query generator can provide them.
+        Returns the number of queries in the plan.
+        """
+        while len(self.__queries) <= index and not self.__exhausted:
+            self.__plan_next_query()
+
+        return len(self.__queries)
+
+    def get_query(self, index):
+        """
+        Returns the PlannedQuery at the given index; None if the query generator runs out of queries before it is reached.
+        """
+        if self.extend_to(index) > index:
+            return self.__queries[index]
+
+        return None
+
+    def get_query_count(self):
+        """
+        Returns the number of queries planned so far.
+        """
+        return len(self.__queries)
+
+    def get_document_count(self):
+        """
+        Returns the number of distinct documents (columns) in the plan so far.
+        """
+        return len(self.doc_ids)
+
+    def __plan_next_query(self):
+        """
+        Obtains the next query from the query generator, issues it through the search context, and looks up the judgements.
+        """
+        self.__query_generator.update_model(self.__search_context)
+        query_text = self.__query_generator.get_next_query(self.__search_context)
+
+        if not query_text:
+            self.__exhausted = True
+            return
+
+        self.__search_context.add_issued_query(query_text)
+        results = self.__search_context.get_current_results() or []
+        doc_ids = [result.docid for result in results]
+
+        columns = numpy.array([self.__get_column(doc_id) for doc_id in doc_ids], dtype=numpy.int64)
+        snippet_judgements = self.__get_judgements(self.__snippet_judge, doc_ids)
+        document_judgements = self.__get_judgements(self.__document_judge, doc_ids)
+        patch_judgements = numpy.zeros(0, dtype=numpy.int64)
+
+        if self.__patch_judgements and doc_ids:
+            patch_judgements = numpy.array(self.__serp_impression._get_patch_judgements(), dtype=numpy.int64)
+
+        self.__queries.append(PlannedQuery(query_text, doc_ids, columns, snippet_judgements, document_judgements, patch_judgements))
+
+    def __get_judgements(self, judge, doc_ids):
+        """
+        Returns an array of judgements for the given documents, using the judge callable. If there is no judge, all are zero.
+        """
+        if judge is None:
+            return numpy.zeros(len(doc_ids), dtype=numpy.int64)
+
+        return numpy.array([judge(self.__topic_id, doc_id) for doc_id in doc_ids], dtype=numpy.int64)
+
+    def __get_column(self, doc_id):
+        """
+        Returns the column for the given document ID, assigning a new column if the document has not been seen before.
+        """
+        if doc_id not in self.__columns:
+            self.__columns[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+
+        return self.__columns[doc_id]
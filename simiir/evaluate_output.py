@@ -0,0 +1,44 @@
+import os
+import sys
+from simiir.utils.trec_evaluation import TrecEvaluator, format_measures, read_run_file
+
+
+def main(output_directory, qrels_filename):
+    """
+    Batch evaluation of an entire simulation output directory.
+    The qrels are read once; every .rels file in the directory is then evaluated in turn, with the corresponding .out file written alongside it.
+    """
+    evaluator = TrecEvaluator(qrels_filename)
+    evaluated = 0
+    
+    for filename in sorted(os.listdir(output_directory)):
+        if not filename.endswith('.rels'):
+            continue
+        
+        run_filename = os.path.join(output_directory, filename)
+        output_filename = '{0}.out'.format(os.path.splitext(run_filename)[0])
+        rankings = read_run_file(run_filename)
+        
+        with open(output_filename, 'w') as output_file:
+            # Each simulation's .rels file contains a single topic.
+            # An empty .rels file yields no measures, which mirrors trec_eval's behaviour for an empty run.
+            for topic_id in sorted(rankings.keys()):
+                output_file.write(format_measures(evaluator.evaluate(topic_id, rankings[topic_id])))
+        
+        evaluated = evaluated + 1
+    
+    print "Evaluated {0} simulation(s) in {1}.".format(evaluated, output_directory)
+
+
+def usage(script_name):
+    """
+    Prints the usage message to the output stream.
+    """
+    print "Usage: {0} [output_directory] [qrels_filename]".format(script_name)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        usage(sys.argv[0])
+    else:
+        main(sys.argv[1], sys.argv[2])
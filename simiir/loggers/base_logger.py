@@ -10,6 +10,14 @@ class BaseLogger(object):
         self._output_controller = output_controller
         self._search_context = search_context
         self._queries_exhausted = False
+        
+        self._action_mapping = {
+            Actions.QUERY  : self._log_query,
+            Actions.SERP   : self._log_serp,
+            Actions.SNIPPET: self._log_snippet,
+            Actions.DOC    : self._log_assess,
+            Actions.MARK   : self._log_mark_document,
+        }
     
     def log_action(self, action_name, **kwargs):
         """
@@ -17,16 +25,10 @@ class BaseLogger(object):
         Import loggers.Actions to use the appropriate event type when determining the action.
         Use additional keywords to provide additional arguments to the logger.
         """
-        action_mapping = {
-            Actions.QUERY  : self._log_query,
-            Actions.SERP   : self._log_serp,
-            Actions.SNIPPET: self._log_snippet,
-            Actions.DOC    : self._log_assess,
-            Actions.MARK   : self._log_mark_document,
-        }
+        action_method = self._action_mapping.get(action_name)
         
-        if action_mapping[action_name]:
-            action_mapping[action_name](**kwargs)
+        if action_method:
+            action_method(**kwargs)
         else:
             self.__log_unknown_action(action_name)
     
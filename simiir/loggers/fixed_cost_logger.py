@@ -68,17 +68,14 @@ class FixedCostLogger(BaseLogger):
         """
         Re-implementation of the _report() method from BaseLogger.
         Includes additional details in the message such as the total elapsed time, and maximum time available to the user after the action has been processed.
+        The event is passed to the OutputController as a compact tuple; text formatting is deferred until the log is written.
         """
-        log_entry_mapper = {
-            Actions.QUERY  : kwargs.get('query'),
-            Actions.SERP   : kwargs.get('status'),
-            Actions.SNIPPET: "{0} {1}".format(kwargs.get('status'), kwargs.get('doc_id')),
-            Actions.DOC    : "{0} {1}".format(kwargs.get('status'), kwargs.get('doc_id')),
-            Actions.MARK   : "{0} {1}".format(kwargs.get('status'), kwargs.get('doc_id')),
-        }
+        if action == Actions.QUERY:
+            status = kwargs.get('query')
+        else:
+            status = kwargs.get('status')
         
-        base = super(FixedCostLogger, self)._report(action, **kwargs)
-        self._output_controller.log("{0}{1} {2} {3}".format(base, self._time_limit, self._total_time, log_entry_mapper[action]))
+        self._output_controller.log_event(action, status, kwargs.get('doc_id'), self._total_time, self._time_limit)
     
     def _log_query(self, **kwargs):
         """
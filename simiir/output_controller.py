@@ -1,4 +1,154 @@
 import os
+import gzip
+import json
+from collections import deque
+from loggers import Actions
+from simiir.utils.trec_evaluation import TrecEvaluator, format_measures
+from simiir.results_store import get_results_store, get_results_sink
+from simiir.utils.component_timer import ComponentTimer, add_to_aggregate
+from simiir.utils.memory_tracker import MemoryTracker
+
+
+def format_log_entry(entry):
+    """
+    Returns the text representation of an interaction log entry, as written to the .log file.
+    Entries are either event tuples (action, status, doc_id, elapsed, limit), info tuples ('INFO', info_type, text),
+    or preformatted strings (which are returned unchanged). For QUERY events, the status holds the query text.
+    """
+    if type(entry) is not tuple:
+        return entry
+    
+    if len(entry) == 3:
+        return "INFO {0} {1}".format(entry[1], entry[2])
+    
+    action, status, doc_id, elapsed, limit = entry
+    
+    if action == Actions.QUERY or action == Actions.SERP:
+        return "ACTION {0} {1} {2} {3}".format(action, limit, elapsed, status)
+    
+    return "ACTION {0} {1} {2} {3} {4}".format(action, limit, elapsed, status, doc_id)
+
+
+def get_event_fields(entry):
+    """
+    Returns a dictionary representation of an interaction log entry, suitable for analysis without parsing the text log.
+    """
+    if type(entry) is not tuple:
+        return {'text': entry}
+    
+    if len(entry) == 3:
+        return {'action': entry[0], 'info_type': entry[1], 'text': entry[2]}
+    
+    return dict(zip(('action', 'status', 'doc_id', 'elapsed', 'limit'), entry))
+
+
+def format_log_entry_json(entry):
+    """
+    Returns the JSON representation of an interaction log entry, as written to the .events.jsonl export.
+    """
+    return json.dumps(get_event_fields(entry), sort_keys=True)
+
+
+class StreamingLogFile(object):
+    """
+    An append-only log which writes entries to disk as they are produced, rather than holding them in memory.
+    Entries are buffered, and written out (and flushed) every flush_threshold entries - so memory use is bounded, and
+    a crashed simulation leaves everything up to the last flush on disk.
+    
+    Each entry is written to every target, a (filename_function, formatter) tuple - the formatter turns an entry into a line.
+    Filenames are obtained from the filename_function callables when the files are first written to, as the
+    simulation's base ID may not be known when the log is created. If compress is True, the output is gzipped,
+    and the suffix .gz is appended to each filename.
+    """
+    def __init__(self, targets, flush_threshold=1000, compress=False):
+        self.__targets = targets
+        self.__flush_threshold = flush_threshold
+        self.__compress = compress
+        
+        self.__buffer = []
+        self.__files = None
+        self.__filenames = []
+        self.__closed = False
+    
+    def append(self, entry):
+        """
+        Adds an entry to the log. Entries added after the log has been closed are ignored.
+        """
+        if self.__closed:
+            return
+        
+        self.__buffer.append(entry)
+        
+        if len(self.__buffer) >= self.__flush_threshold:
+            self.flush()
+    
+    def flush(self):
+        """
+        Writes any buffered entries to the underlying files, opening the files if they have not yet been opened.
+        Each entry is terminated with os.linesep - the same format as used when output is not streamed.
+        """
+        if self.__files is None:
+            self.__open()
+        
+        for (filename_function, formatter), output_file in zip(self.__targets, self.__files):
+            if self.__buffer:
+                output_file.write(''.join(['{0}{1}'.format(formatter(entry), os.linesep) for entry in self.__buffer]))
+            
+            output_file.flush()
+        
+        self.__buffer = []
+    
+    def close(self):
+        """
+        Flushes any remaining entries, and closes the files. Empty files are created if no entries were logged.
+        """
+        if self.__closed:
+            return
+        
+        self.flush()
+        
+        for output_file in self.__files:
+            output_file.close()
+        
+        self.__closed = True
+    
+    def discard(self):
+        """
+        Closes the files without writing any buffered entries, and removes them - for a log left incomplete by a failed
+        simulation. A log that has already been closed is kept.
+        """
+        if self.__closed:
+            return
+        
+        self.__buffer = []
+        
+        if self.__files is not None:
+            for output_file in self.__files:
+                output_file.close()
+            
+            for filename in self.__filenames:
+                if os.path.exists(filename):
+                    os.remove(filename)
+        
+        self.__closed = True
+    
+    def __open(self):
+        """
+        Opens each of the target files for writing, with gzip compression if required.
+        """
+        self.__files = []
+        
+        for filename_function, formatter in self.__targets:
+            filename = filename_function()
+            
+            if self.__compress:
+                filename = '{0}.gz'.format(filename)
+                self.__files.append(gzip.open(filename, 'wb'))
+            else:
+                self.__files.append(open(filename, 'w'))
+            
+            self.__filenames.append(filename)
+
 
 class OutputController(object):
     """
@@ -11,21 +161,80 @@ class OutputController(object):
         self.__save_interaction_log_flag = output_configuration['@saveInteractionLog']
         self.__save_relevance_judgments_flag = output_configuration['@saveRelevanceJudgments']
         self.__trec_eval_flag = output_configuration['@trec_eval']
-
+        self.__stream_output_flag = output_configuration.get('@streamOutput', False)
+        self.__export_events_flag = output_configuration.get('@eventExport', None) == 'jsonl'
+        self.__evaluator = output_configuration.get('@evaluator', 'trec_eval')
+        self.__evaluation_measures = None
+        self.__results_store = None
+        self.__results_sink = None
+        self.__sink = output_configuration.get('@sink')
+        self.__component_timer = None
+        
+        if output_configuration.get('@componentTiming', False):
+            self.__component_timer = ComponentTimer()
+        
+        self.__memory_tracker = None
+        
+        if output_configuration.get('@memoryTracking', False):
+            # Started here, as the output controller is created before the other components of the simulation.
+            self.__memory_tracker = MemoryTracker(budget=output_configuration.get('@memoryBudget'))
+            self.__memory_tracker.start()
+        
+        if output_configuration.get('@backend', 'files') == 'sqlite':
+            # All results are written to a single, shared results store rather than to individual files.
+            self.__results_store = get_results_store(output_configuration['@resultsStore'], output_configuration.get('@storeBatchSize', 100))
+            self.__stream_output_flag = False
+        elif output_configuration.get('@backend', 'files') == 'null':
+            # Metrics only; no logs are kept, and the results are passed to a sink rather than written to files.
+            self.__results_sink = get_results_sink(self.__sink, self.__base_directory)
+            self.__stream_output_flag = False
+        
         self.__save_config_log_flag = True
-        self.__interaction_log = []
-        self.__query_log = []
+        
+        if self.__results_sink is not None:
+            # Log entries are discarded as they arrive.
+            self.__interaction_log = deque(maxlen=0)
+            self.__query_log = deque(maxlen=0)
+        elif self.__stream_output_flag:
+            # Log entries are written to disk as they arrive; nothing accumulates in memory.
+            flush_threshold = output_configuration.get('@flushThreshold', 1000)
+            compress = output_configuration.get('@compressOutput', False)
+            
+            interaction_log_targets = []
+            
+            if self.__save_interaction_log_flag:
+                interaction_log_targets.append((self.__get_interaction_log_filename, format_log_entry))
+            
+            if self.__export_events_flag:
+                interaction_log_targets.append((self.__get_event_export_filename, format_log_entry_json))
+            
+            if interaction_log_targets:
+                self.__interaction_log = StreamingLogFile(interaction_log_targets, flush_threshold, compress)
+            else:
+                self.__interaction_log = deque(maxlen=0)  # The interaction log is not saved, so entries are discarded.
+            
+            self.__query_log = StreamingLogFile([(self.__get_query_log_filename, str)], flush_threshold, compress)
+        else:
+            self.__interaction_log = []
+            self.__query_log = []
         
         self.output_indentation = 2  # Controls the level of indentation when outputting results to stdout.
                                      # Publicly facing instance variable - is used by the Component Generators prettify() methods.
     
     def log(self, entry):
         """
-        Adds an event to the interaction log.
-        For informational log entries (not actions) call log_info().
+        Adds a preformatted entry to the interaction log.
+        For actions, log_event() should be preferred; for informational log entries (not actions) call log_info().
         """
         self.__interaction_log.append(entry)
     
+    def log_event(self, action, status, doc_id, elapsed, limit):
+        """
+        Adds an action event to the interaction log, as a compact (action, status, doc_id, elapsed, limit) tuple.
+        The event is only formatted as text if (and when) the interaction log is written to disk.
+        """
+        self.__interaction_log.append((action, status, doc_id, elapsed, limit))
+    
     def log_info(self, info_type=None, text=""):
         """
         Logs additional information to the interaction log which may be useful when supplemented with action log entries.
@@ -41,7 +250,7 @@ class OutputController(object):
         if info_type is None:
             info_type = "CUSTOM"
         
-        self.__interaction_log.append("INFO {0} {1}".format(info_type, text))
+        self.__interaction_log.append(('INFO', info_type, text))
     
     def log_query(self, query):
         """
@@ -52,7 +261,11 @@ class OutputController(object):
     def display_config(self):
         """
         Sends a prettified version of the current simulation's configuration to stdout.
+        Nothing is displayed when the null output backend is used.
         """
+        if self.__results_sink is not None:
+            return
+        
         os.system('cls' if os.name == 'nt' else 'clear')
         
         simulation_base_id = self.__simulation_configuration.base_id
@@ -67,7 +280,11 @@ class OutputController(object):
     def display_report(self):
         """
         Prints a summary of the results from the simulation to stdout.
+        Nothing is displayed when the null output backend is used.
         """
+        if self.__results_sink is not None:
+            return
+        
         search_context_summary = self.__simulation_configuration.user.search_context.report()
         
         print
@@ -79,12 +296,166 @@ class OutputController(object):
         """
         Publicly exposed function used for saving all output files to disk.
         Calls a private method for each in turn - whether or not the files are saved is dependent upon the set flags.
+        If a results store is used, the results are added to the store instead; with the null backend, they are passed to the sink.
         """
+        if self.__component_timer is not None:
+            add_to_aggregate(self.__base_directory, self.__component_timer)
+        
+        self.__stop_memory_tracker()
+        
+        if self.__results_sink is not None:
+            self.__save_to_results_sink()
+            return
+        
+        if self.__results_store is not None:
+            self.__save_to_results_store()
+            return
+        
         self.__save_interaction_log()
+        self.__save_event_export()
         self.__save_relevance_judgments()
         self.__save_query_log()
         self.__save_simulation_config()
-        self.__run_trec_eval()
+        
+        if self.__evaluator == 'native':
+            self.__run_native_evaluation()
+        else:
+            self.__run_trec_eval()
+    
+    def save_replicates(self, replicate_results):
+        """
+        Saves the results of replicates run by a replicate engine (see the engines package), as returned by its get_results().
+        Each replicate is added to the results store if one is used; otherwise, its results are passed to the results sink
+        (by default, appended to summary.jsonl in the base directory). The base ID of each replicate is suffixed with -r<n>.
+        If the trec_eval flag is set, the marked documents of each replicate are evaluated with the native evaluator.
+        """
+        configuration = self.__simulation_configuration
+        evaluator = None
+        results_sink = self.__results_sink
+        self.__stop_memory_tracker()
+        
+        if self.__trec_eval_flag:
+            evaluator = TrecEvaluator(configuration.topic.qrels_filename)
+        
+        if self.__results_store is None and results_sink is None:
+            results_sink = get_results_sink(self.__sink, self.__base_directory)
+        
+        for result in replicate_results:
+            base_id = '{0}-r{1}'.format(configuration.base_id, result['replicate'])
+            measures = None
+            
+            if evaluator is not None:
+                measures = evaluator.evaluate(configuration.topic.id, [(doc_id, rank) for rank, doc_id in enumerate(result['marked'], start=1)])
+            
+            if self.__results_store is not None:
+                self.__results_store.add_simulation(base_id=base_id,
+                                                    simulation_id=configuration.simulation_id,
+                                                    topic_id=configuration.topic.id,
+                                                    user_id=configuration.user.id,
+                                                    summary=result['summary'],
+                                                    measures=measures,
+                                                    queries=result['queries'],
+                                                    marked=result['marked'])
+            else:
+                results_sink({'base_id': base_id,
+                              'simulation_id': configuration.simulation_id,
+                              'topic_id': configuration.topic.id,
+                              'user_id': configuration.user.id,
+                              'replicate': result['replicate'],
+                              'summary': dict(result['summary']),
+                              'marked': result['marked'],
+                              'measures': dict(measures) if measures is not None else None})
+    
+    def save_expectation(self, expectation):
+        """
+        Saves the expected outcome of the simulation, as returned by ExpectationEngine.run() (see the engines package).
+        The expected summary counters are added to the results store if one is used; otherwise, they are passed to the results
+        sink (by default, appended to summary.jsonl in the base directory), along with the expectations for each query.
+        The base ID is suffixed with -expected.
+        """
+        configuration = self.__simulation_configuration
+        base_id = '{0}-expected'.format(configuration.base_id)
+        self.__stop_memory_tracker()
+        summary = [(name, float(value)) for name, value in expectation['summary']]
+        
+        if self.__results_store is not None:
+            self.__results_store.add_simulation(base_id=base_id,
+                                                simulation_id=configuration.simulation_id,
+                                                topic_id=configuration.topic.id,
+                                                user_id=configuration.user.id,
+                                                summary=summary,
+                                                queries=[query['query'] for query in expectation['queries']])
+            return
+        
+        results_sink = self.__results_sink
+        
+        if results_sink is None:
+            results_sink = get_results_sink(self.__sink, self.__base_directory)
+        
+        results_sink({'base_id': base_id,
+                      'simulation_id': configuration.simulation_id,
+                      'topic_id': configuration.topic.id,
+                      'user_id': configuration.user.id,
+                      'expectation': True,
+                      'summary': dict(summary),
+                      'queries': [dict((key, value if isinstance(value, (basestring, int)) else float(value)) for key, value in query.items())
+                                  for query in expectation['queries']]})
+    
+    def discard(self):
+        """
+        Abandons the output of a simulation that failed (e.g. one stopped by a utils.watchdog.Watchdog): the memory tracker is
+        stopped, and streamed logs are closed and their partial files removed. Nothing is saved; other output is only written
+        by save(), so there are no other files to remove.
+        """
+        self.__stop_memory_tracker()
+        
+        for streamed_log in [self.__interaction_log, self.__query_log]:
+            if isinstance(streamed_log, StreamingLogFile):
+                streamed_log.discard()
+        
+        self.__interaction_log = []
+        self.__query_log = []
+    
+    def get_evaluation_measures(self):
+        """
+        Returns a list of (measure, value) tuples computed by the native evaluator for the simulation.
+        If the native evaluator has not been run, None is returned.
+        """
+        return self.__evaluation_measures
+    
+    def get_component_timer(self):
+        """
+        Returns the ComponentTimer for the simulation if the componentTiming flag is set; otherwise, None.
+        """
+        return self.__component_timer
+    
+    def get_shared_objects(self):
+        """
+        Returns a list of the objects shared with the output controllers of forked sessions (see utils.session_forks): the
+        results store and sink. Raises a ValueError if output is streamed, as the logs of a fork would be written to the
+        files of the session it was forked from.
+        """
+        if self.__stream_output_flag:
+            raise ValueError("Sessions cannot be forked when streamOutput is set.")
+        
+        return [self.__results_store, self.__results_sink, self.__sink]
+    
+    def get_memory_summary(self):
+        """
+        Returns the summary of the memory used by the simulation (see MemoryTracker.get_summary()) if the memoryTracking flag is
+        set and the simulation has been saved; otherwise, None.
+        """
+        if self.__memory_tracker is None:
+            return None
+        
+        return self.__memory_tracker.get_summary()
+    
+    def __stop_memory_tracker(self):
+        """
+        Samples the memory in use at the end of the simulation (if the memoryTracking flag is set), warning if it is over budget.
+        """
+        if self.__memory_tracker is not None and self.__memory_tracker.get_summary() is None:
+            self.__memory_tracker.stop(simulation_id=self.__simulation_configuration.base_id)
 
     def __save_simulation_config(self):
         """
@@ -107,6 +478,16 @@ class OutputController(object):
             log_file.write(os.linesep)
             search_context_summary = self.__simulation_configuration.user.search_context.report()
             log_file.write(search_context_summary)
+            
+            if self.__component_timer is not None:
+                log_file.write(os.linesep)
+                log_file.write("{0}Component Timings:{1}".format(" "*self.output_indentation, os.linesep))
+                log_file.write(self.__component_timer.report())
+            
+            if self.__memory_tracker is not None:
+                log_file.write(os.linesep)
+                log_file.write("{0}Memory Usage:{1}".format(" "*self.output_indentation, os.linesep))
+                log_file.write(self.__memory_tracker.report())
 
             log_file.close()
 
@@ -116,24 +497,39 @@ class OutputController(object):
         Depending on the status of the interaction log flag, saves the interaction log to disk.
         """
         if self.__save_interaction_log_flag:
-            interaction_log_filename = '{0}.log'.format(self.__simulation_configuration.base_id)
-            interaction_log_filename = os.path.join(self.__base_directory, interaction_log_filename)
+            if self.__stream_output_flag:
+                self.__interaction_log.close()
+                return
             
-            log_file = open(interaction_log_filename, 'w')
+            log_file = open(self.__get_interaction_log_filename(), 'w')
             
             for entry in self.__interaction_log:
-                log_file.write('{0}{1}'.format(entry, os.linesep))
+                log_file.write('{0}{1}'.format(format_log_entry(entry), os.linesep))
             
             log_file.close()
     
+    def __save_event_export(self):
+        """
+        If event export is enabled, saves the interaction log as JSON lines (one object per event) to disk.
+        """
+        if self.__export_events_flag:
+            if self.__stream_output_flag:
+                self.__interaction_log.close()  # Closed by __save_interaction_log() if the interaction log is also saved.
+                return
+            
+            with open(self.__get_event_export_filename(), 'w') as export_file:
+                for entry in self.__interaction_log:
+                    export_file.write('{0}{1}'.format(format_log_entry_json(entry), os.linesep))
+    
     def __save_query_log(self):
         """
         Saves the query log to the output file.
         """
-        query_log_filename = '{0}.queries'.format(self.__simulation_configuration.base_id)
-        query_log_filename = os.path.join(self.__base_directory, query_log_filename)
+        if self.__stream_output_flag:
+            self.__query_log.close()
+            return
         
-        log_file = open(query_log_filename, 'w')
+        log_file = open(self.__get_query_log_filename(), 'w')
         
         for entry in self.__query_log:
             log_file.write('{0}{1}'.format(entry, os.linesep))
@@ -173,4 +569,106 @@ class OutputController(object):
             output_filename = '{0}.out'.format(self.__simulation_configuration.base_id)
             output_filename = os.path.join(self.__base_directory, output_filename)
             
-            os.system('trec_eval {0} {1} > {2}'.format(qrels_filename, relevance_judgments_filename, output_filename))
\ No newline at end of file
+            os.system('trec_eval {0} {1} > {2}'.format(qrels_filename, relevance_judgments_filename, output_filename))
+    
+    def __run_native_evaluation(self):
+        """
+        Evaluates the documents marked relevant by the simulated user in-process, producing the same .out file as trec_eval.
+        Unlike __run_trec_eval(), the relevance judgments do not need to be saved to disk. Only runs if the trec_eval flag is set.
+        """
+        if self.__trec_eval_flag:
+            self.__evaluate()
+            
+            output_filename = '{0}.out'.format(self.__simulation_configuration.base_id)
+            output_filename = os.path.join(self.__base_directory, output_filename)
+            
+            with open(output_filename, 'w') as output_file:
+                output_file.write(format_measures(self.__evaluation_measures))
+    
+    def __get_interaction_log_filename(self):
+        """
+        Returns the path to the interaction log file for the current simulation.
+        """
+        interaction_log_filename = '{0}.log'.format(self.__simulation_configuration.base_id)
+        return os.path.join(self.__base_directory, interaction_log_filename)
+    
+    def __get_event_export_filename(self):
+        """
+        Returns the path to the JSON lines event export for the current simulation.
+        """
+        event_export_filename = '{0}.events.jsonl'.format(self.__simulation_configuration.base_id)
+        return os.path.join(self.__base_directory, event_export_filename)
+    
+    def __get_query_log_filename(self):
+        """
+        Returns the path to the query log file for the current simulation.
+        """
+        query_log_filename = '{0}.queries'.format(self.__simulation_configuration.base_id)
+        return os.path.join(self.__base_directory, query_log_filename)
+    
+    def __evaluate(self):
+        """
+        Evaluates the documents marked relevant by the simulated user with the native evaluator, storing the measures.
+        """
+        topic = self.__simulation_configuration.topic
+        search_context = self.__simulation_configuration.user.search_context
+        
+        evaluator = TrecEvaluator(topic.qrels_filename)
+        self.__evaluation_measures = evaluator.evaluate_marked(topic.id, search_context.get_relevant_documents())
+    
+    def __save_to_results_store(self):
+        """
+        Adds the results of the simulation to the results store; the summary counters, evaluation measures (if the trec_eval flag is set),
+        queries, marked documents and - depending on the status of the interaction log flag - the interaction log.
+        Evaluation always uses the native evaluator, as no files are written for trec_eval to read.
+        """
+        configuration = self.__simulation_configuration
+        search_context = configuration.user.search_context
+        
+        if self.__trec_eval_flag:
+            self.__evaluate()
+        
+        marked = [document.doc_id for document in search_context.get_relevant_documents()]
+        events = self.__interaction_log if self.__save_interaction_log_flag else None
+        
+        self.__results_store.add_simulation(base_id=configuration.base_id,
+                                            simulation_id=configuration.simulation_id,
+                                            topic_id=configuration.topic.id,
+                                            user_id=configuration.user.id,
+                                            summary=search_context.get_summary(),
+                                            measures=self.__evaluation_measures,
+                                            queries=self.__query_log,
+                                            marked=marked,
+                                            events=events)
+    
+    def __save_to_results_sink(self):
+        """
+        Passes a dictionary of the simulation's results to the results sink: the IDs of the simulation, the summary counters,
+        the IDs of the marked documents (in the order in which they were marked), if the trec_eval flag is set - the
+        measures from the native evaluator and, if the componentTiming or memoryTracking flags are set, the component timings
+        and memory summary.
+        """
+        configuration = self.__simulation_configuration
+        search_context = configuration.user.search_context
+        measures = None
+        
+        if self.__trec_eval_flag:
+            self.__evaluate()
+            measures = dict(self.__evaluation_measures)
+        
+        result = {'base_id': configuration.base_id,
+                  'simulation_id': configuration.simulation_id,
+                  'topic_id': configuration.topic.id,
+                  'user_id': configuration.user.id,
+                  'summary': dict(search_context.get_summary()),
+                  'marked': [document.doc_id for document in search_context.get_relevant_documents()],
+                  'measures': measures}
+        
+        if self.__component_timer is not None:
+            result['timings'] = dict([(label, {'calls': calls, 'seconds': seconds})
+                                      for label, calls, seconds in self.__component_timer.get_timings()])
+        
+        if self.__memory_tracker is not None:
+            result['memory'] = self.__memory_tracker.get_summary()
+        
+        self.__results_sink(result)
@@ -7,7 +7,6 @@ from ifind.common.query_generation import SingleQueryGeneration
 from ifind.common.smoothed_language_model import BayesLanguageModel, SmoothedLanguageModel
 from ifind.common.query_generation import SingleQueryGeneration, BiTermQueryGeneration, TriTermQueryGeneration
 from ifind.common.query_ranker import QueryRanker
-from bs4 import BeautifulSoup
 import itertools
 
 
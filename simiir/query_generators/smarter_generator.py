@@ -5,7 +5,6 @@ from ifind.common.query_generation import SingleQueryGeneration
 from ifind.common.smoothed_language_model import BayesLanguageModel, SmoothedLanguageModel
 from ifind.common.query_generation import SingleQueryGeneration, BiTermQueryGeneration, TriTermQueryGeneration
 from ifind.common.query_ranker import QueryRanker
-from bs4 import BeautifulSoup
 
 
 class SmarterQueryGenerator(BaseQueryGenerator):
@@ -128,6 +127,7 @@ class SmarterQueryGenerator(BaseQueryGenerator):
         if rel_text_list:
             snippet_text = ' '.join(rel_text_list)
         
+        from bs4 import BeautifulSoup  # Imported on first use; bs4 is only required by the generators that parse snippets.
         snippet_soup = BeautifulSoup(snippet_text,'html.parser')
         
         return snippet_soup.get_text()
\ No newline at end of file
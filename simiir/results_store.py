@@ -0,0 +1,208 @@
+import os
+import json
+import atexit
+import sqlite3
+import importlib
+
+#
+# A consolidated results store for large simulation sweeps.
+# Rather than writing several small files per simulation, per-simulation summaries, evaluation measures, queries,
+# marked documents and interaction events are written to a single SQLite database, in batched transactions.
+#
+
+_stores = {}
+_sinks = {}
+
+SUMMARY_COLUMNS = ['TOTAL_QUERIES_ISSUED',
+                   'TOTAL_SNIPPETS_EXAMINED',
+                   'TOTAL_DOCUMENTS_EXAMINED',
+                   'TOTAL_DOCUMENTS_MARKED_RELEVANT',
+                   'TOTAL_ATTRACTIVE_SERP_IMPRESSIONS',
+                   'TOTAL_UNATTRACTIVE_SERP_IMPRESSIONS']
+
+
+def get_results_store(filename, batch_size=100):
+    """
+    Factory function returning the SQLiteResultsStore for the given filename.
+    A single store is shared by all simulations writing to the same file within the process.
+    """
+    if filename not in _stores:
+        _stores[filename] = SQLiteResultsStore(filename, batch_size=batch_size)
+
+    return _stores[filename]
+
+
+def get_results_sink(sink, base_directory):
+    """
+    Returns a callable which accepts the results dictionary of a single simulation (used by the null output backend).
+    sink may be a callable, a dotted path to a callable (e.g. mypackage.mymodule.collect), or None - in which case
+    results are appended as JSON lines to summary.jsonl in the given base directory.
+    """
+    if sink is None:
+        filename = os.path.join(base_directory, 'summary.jsonl')
+
+        if filename not in _sinks:
+            _sinks[filename] = JsonLinesSink(filename)
+
+        return _sinks[filename]
+
+    if callable(sink):
+        return sink
+
+    module_name, callable_name = sink.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), callable_name)
+
+
+def close_results_stores():
+    """
+    Commits any pending rows, and closes all open results stores and sinks.
+    This is called automatically when the interpreter exits.
+    """
+    for filename in _stores.keys():
+        _stores.pop(filename).close()
+
+    for filename in _sinks.keys():
+        _sinks.pop(filename).close()
+
+atexit.register(close_results_stores)
+
+
+class SQLiteResultsStore(object):
+    """
+    Writes simulation results to a SQLite database.
+    Rows are held in memory, and are written in a single transaction once batch_size simulations have been added.
+    """
+    def __init__(self, filename, batch_size=100):
+        self.__batch_size = batch_size
+        self.__pending_simulations = 0
+
+        self.__simulations = []
+        self.__measures = []
+        self.__queries = []
+        self.__marked = []
+        self.__events = []
+
+        self.__connection = sqlite3.connect(filename)
+        self.__connection.text_factory = str
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA synchronous=NORMAL')
+        self.__create_tables()
+
+    def __create_tables(self):
+        """
+        Creates the tables for the store, if they do not already exist.
+        """
+        summary_columns = ', '.join(['{0} INTEGER'.format(column.lower()) for column in SUMMARY_COLUMNS])
+
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS simulations '
+                                  '(base_id TEXT PRIMARY KEY, simulation_id TEXT, topic_id TEXT, user_id TEXT, '
+                                  '{0})'.format(summary_columns))
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS measures (base_id TEXT, measure TEXT, value REAL)')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS queries (base_id TEXT, seq INTEGER, query TEXT)')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS marked (base_id TEXT, rank INTEGER, doc_id TEXT)')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS events '
+                                  '(base_id TEXT, seq INTEGER, action TEXT, status TEXT, doc_id TEXT, '
+                                  'elapsed INTEGER, time_limit INTEGER, text TEXT)')
+
+        for table in ['measures', 'queries', 'marked', 'events']:  # So the rows of a simulation can be found (and replaced).
+            self.__connection.execute('CREATE INDEX IF NOT EXISTS {0}_base_id ON {0} (base_id)'.format(table))
+
+        self.__connection.commit()
+
+    def add_simulation(self, base_id, simulation_id, topic_id, user_id, summary, measures=None, queries=None, marked=None, events=None):
+        """
+        Adds the results of a single simulation to the store.
+        summary is a list of (name, value) tuples from SearchContext.get_summary(); measures a list of (measure, value) tuples.
+        queries, marked (document IDs) and events are lists, stored in the order given.
+        Events are interaction log entries; event tuples are stored in separate columns, and anything else as text.
+        """
+        summary = dict(summary)
+        self.__simulations.append(tuple([base_id, simulation_id, topic_id, user_id] + [summary.get(column) for column in SUMMARY_COLUMNS]))
+
+        if measures:
+            self.__measures.extend([(base_id, measure, value) for measure, value in measures if not isinstance(value, basestring)])
+
+        if queries:
+            self.__queries.extend([(base_id, seq, query) for seq, query in enumerate(queries, start=1)])
+
+        if marked:
+            self.__marked.extend([(base_id, rank, doc_id) for rank, doc_id in enumerate(marked, start=1)])
+
+        if events:
+            self.__events.extend([(base_id, seq) + self.__get_event_row(entry) for seq, entry in enumerate(events, start=1)])
+
+        self.__pending_simulations = self.__pending_simulations + 1
+
+        if self.__pending_simulations >= self.__batch_size:
+            self.commit()
+
+    def __get_event_row(self, entry):
+        """
+        Returns the (action, status, doc_id, elapsed, time_limit, text) columns for an interaction log entry.
+        """
+        if type(entry) is not tuple:
+            return (None, None, None, None, None, entry)
+
+        if len(entry) == 3:  # ('INFO', info_type, text)
+            return (entry[0], entry[1], None, None, None, entry[2])
+
+        return entry + (None,)
+
+    def commit(self):
+        """
+        Writes all pending rows to the database in a single transaction.
+        The rows of any simulation already in the store (e.g. from a sweep that is rerun, or resumed) are replaced.
+        """
+        if self.__pending_simulations == 0:
+            return
+
+        placeholders = ', '.join(['?'] * (4 + len(SUMMARY_COLUMNS)))
+        base_ids = [(base_id,) for base_id in set([row[0] for row in self.__simulations])]
+
+        with self.__connection:
+            for table in ['measures', 'queries', 'marked', 'events']:
+                self.__connection.executemany('DELETE FROM {0} WHERE base_id = ?'.format(table), base_ids)
+
+            self.__connection.executemany('INSERT OR REPLACE INTO simulations VALUES ({0})'.format(placeholders), self.__simulations)
+            self.__connection.executemany('INSERT INTO measures VALUES (?, ?, ?)', self.__measures)
+            self.__connection.executemany('INSERT INTO queries VALUES (?, ?, ?)', self.__queries)
+            self.__connection.executemany('INSERT INTO marked VALUES (?, ?, ?)', self.__marked)
+            self.__connection.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self.__events)
+
+        self.__simulations = []
+        self.__measures = []
+        self.__queries = []
+        self.__marked = []
+        self.__events = []
+        self.__pending_simulations = 0
+
+    def close(self):
+        """
+        Commits any pending rows, and closes the connection to the database.
+        """
+        self.commit()
+        self.__connection.close()
+
+
+class JsonLinesSink(object):
+    """
+    The default results sink for the null output backend.
+    Appends the results of each simulation to a file as a single line of JSON; the file is opened on the first write.
+    """
+    def __init__(self, filename):
+        self.__filename = filename
+        self.__file = None
+
+    def __call__(self, results):
+        if self.__file is None:
+            self.__file = open(self.__filename, 'a')
+
+        self.__file.write('{0}{1}'.format(json.dumps(results, sort_keys=True), os.linesep))
+
+    def close(self):
+        """
+        Closes the underlying file, if it has been opened.
+        """
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import math
+import argparse
+import logging
+from run_simiir import run_configurations
+from config_readers.simulation_config_reader import SimulationConfigReader
+
+log = logging.getLogger('run_adaptive_replication')
+
+#
+# Adaptive replication of the configurations of a simulation configuration file. Rather than running every (topic, user)
+# configuration with a fixed number of seeds, each is run with a few seeds, and more are added in batches only until the
+# confidence interval of the mean of a chosen measure is narrow enough - or a cap on the number of replicates is reached.
+# Configurations whose outcome varies little between seeds (e.g. users with deterministic components) stop early, and the
+# replicates go to those that need them. The precision achieved for each configuration is reported.
+#
+# Seeds are numbered consecutively from first_seed, in place of any seeds in the user configuration files. Simulations use
+# the null output backend, with the results of each passed to a sink, and evaluated by the native evaluator.
+#
+
+
+def normal_quantile(p):
+    """
+    Returns the p-quantile of the standard normal distribution (for 0 < p < 1), found by bisection.
+    """
+    low, high = -10.0, 10.0
+
+    for i in range(100):
+        middle = (low + high) / 2.0
+
+        if 0.5 * (1.0 + math.erf(middle / math.sqrt(2.0))) < p:
+            low = middle
+        else:
+            high = middle
+
+    return (low + high) / 2.0
+
+
+def t_quantile(p, degrees_of_freedom):
+    """
+    Returns the p-quantile of Student's t distribution. For one and two degrees of freedom, the closed forms are used;
+    otherwise, an approximation from the normal quantile with the Cornish-Fisher expansion - accurate to about three decimal
+    places for four or more degrees of freedom.
+    """
+    if degrees_of_freedom == 1:
+        return math.tan(math.pi * (p - 0.5))
+
+    if degrees_of_freedom == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+
+    z = normal_quantile(p)
+    v = float(degrees_of_freedom)
+
+    return (z +
+            (z**3 + z) / (4 * v) +
+            (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2) +
+            (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3) +
+            (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * v**4))
+
+
+def get_interval(values, confidence):
+    """
+    Returns a (mean, standard deviation, half-width) tuple for the given values (at least two), where the half-width is that of
+    the t confidence interval of the mean at the given confidence level (e.g. 0.95).
+    """
+    count = len(values)
+    mean = sum(values) / float(count)
+    deviation = math.sqrt(sum([(value - mean) ** 2 for value in values]) / (count - 1))
+    half_width = t_quantile(1.0 - (1.0 - confidence) / 2.0, count - 1) * deviation / math.sqrt(count)
+
+    return mean, deviation, half_width
+
+
+class AdaptiveReplication(object):
+    """
+    Runs each (topic, user) configuration of a simulation configuration file until the confidence interval of the mean of a
+    measure is narrow enough.
+    """
+    def __init__(self, config_filename, measure, half_width, relative=False, confidence=0.95,
+                 min_replicates=5, max_replicates=100, batch_size=5, first_seed=0):
+        """
+        measure is the name of an evaluation measure (e.g. 'P_10') or a summary counter (e.g. 'TOTAL_DOCUMENTS_MARKED_RELEVANT').
+        half_width is the target half-width of the confidence interval; if relative is True, it is a proportion of the mean.
+        Each configuration is run with min_replicates seeds, then batch_size more at a time, up to max_replicates.
+        """
+        if min_replicates < 2:
+            raise ValueError("min_replicates must be at least 2.")
+
+        if max_replicates < min_replicates:
+            raise ValueError("max_replicates must be at least min_replicates.")
+
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1.")
+
+        self.__config_filename = config_filename
+        self.__measure = measure
+        self.__half_width = half_width
+        self.__relative = relative
+        self.__confidence = confidence
+        self.__min_replicates = min_replicates
+        self.__max_replicates = max_replicates
+        self.__batch_size = batch_size
+        self.__first_seed = first_seed
+
+        config_reader = SimulationConfigReader(config_filename)
+        self.__topic_ids = config_reader.get_topic_ids()
+        self.__user_files = config_reader.get_user_files()
+        self.__base_dir = config_reader.get_base_dir()
+
+        self.__configurations = []
+
+    def run(self, **run_arguments):
+        """
+        Runs every configuration; run_arguments are passed to run_configurations() (e.g. concurrency=4).
+        Returns the list of configuration reports (see get_report()).
+        """
+        for topic_id in self.__topic_ids:
+            for user_file in self.__user_files:
+                self.__configurations.append(self.__run_configuration(topic_id, user_file, run_arguments))
+
+        return self.__configurations
+
+    def get_report(self):
+        """
+        Returns a dictionary describing the run: the target, the precision achieved for each configuration, and the number of
+        simulations run compared to running every configuration max_replicates times.
+        """
+        simulations = sum([configuration['replicates'] for configuration in self.__configurations])
+        maximum = self.__max_replicates * len(self.__configurations)
+
+        return {'measure': self.__measure,
+                'half_width': self.__half_width,
+                'relative': self.__relative,
+                'confidence': self.__confidence,
+                'configurations': self.__configurations,
+                'met': len([configuration for configuration in self.__configurations if configuration['met']]),
+                'simulations': simulations,
+                'maximum': maximum,
+                'fraction': simulations / float(maximum) if maximum else 0.0}
+
+    def save_report(self):
+        """
+        Saves the report (see get_report()) to adaptive_replication.json in the simulation's base directory.
+        Returns the filename.
+        """
+        if not os.path.exists(self.__base_dir):
+            os.makedirs(self.__base_dir)
+
+        report_filename = os.path.join(self.__base_dir, 'adaptive_replication.json')
+        report_file = open(report_filename, 'w')
+        json.dump(self.get_report(), report_file, indent=2)
+        report_file.close()
+
+        return report_filename
+
+    def __run_configuration(self, topic_id, user_file, run_arguments):
+        """
+        Runs the given user on the given topic, in batches of seeds, until the target is met or the cap is reached.
+        Returns a dictionary of the precision achieved.
+        """
+        values = []
+
+        def sink(result):
+            values.append(self.__get_value(result))
+
+        replicates = 0
+        batch_size = self.__min_replicates
+
+        while True:
+            seeds = range(self.__first_seed + replicates, self.__first_seed + replicates + batch_size)
+            config_reader = SimulationConfigReader(self.__config_filename,
+                                                   sink=sink,
+                                                   topics=[topic_id],
+                                                   users=[user_file],
+                                                   seeds=seeds,
+                                                   output_overrides={'backend': 'null', 'trec_eval': True})
+
+            run_configurations(config_reader, **run_arguments)
+            replicates = replicates + batch_size
+
+            mean, deviation, half_width = get_interval(values, self.__confidence)
+            target = self.__half_width * abs(mean) if self.__relative else self.__half_width
+            met = half_width <= target
+
+            if met or replicates >= self.__max_replicates:
+                break
+
+            batch_size = min(self.__batch_size, self.__max_replicates - replicates)
+
+        log.info("Topic {0}, user {1}: {2} replicate(s), mean {3:.4f} +/- {4:.4f}{5}".format(
+            topic_id, user_file, replicates, mean, half_width, '' if met else ' (target not met)'))
+
+        return {'topic': topic_id,
+                'user': user_file,
+                'replicates': replicates,
+                'mean': mean,
+                'deviation': deviation,
+                'half_width': half_width,
+                'met': met}
+
+    def __get_value(self, result):
+        """
+        Returns the value of the measure from a result passed to the sink.
+        """
+        if result.get('measures') and self.__measure in result['measures']:
+            return result['measures'][self.__measure]
+
+        if self.__measure in result['summary']:
+            return result['summary'][self.__measure]
+
+        if result.get('measures') == {}:  # The topic has no QRELS, so was not evaluated (see utils.trec_evaluation).
+            raise KeyError("Topic {0} has no relevance judgements, so '{1}' cannot be computed.".format(
+                result['topic_id'], self.__measure))
+
+        raise KeyError("The measure '{0}' is neither an evaluation measure nor a summary counter.".format(self.__measure))
+
+
+def parse_arguments(arguments):
+    """
+    Parses the command line arguments, returning an argparse Namespace.
+    """
+    parser = argparse.ArgumentParser(description="Runs each configuration of a simulation configuration file until the "
+                                                 "confidence interval of a measure is narrow enough.")
+    parser.add_argument('config_filename', help="the simulation configuration file")
+    parser.add_argument('--measure', default='TOTAL_DOCUMENTS_MARKED_RELEVANT',
+                        help="the evaluation measure or summary counter to estimate (default TOTAL_DOCUMENTS_MARKED_RELEVANT)")
+    parser.add_argument('--half-width', type=float, required=True,
+                        help="the target half-width of the confidence interval of the mean")
+    parser.add_argument('--relative', action='store_true', help="the half-width is a proportion of the mean (e.g. 0.05)")
+    parser.add_argument('--confidence', type=float, default=0.95, help="the confidence level of the interval (default 0.95)")
+    parser.add_argument('--min-replicates', type=int, default=5,
+                        help="the number of seeds each configuration is first run with (default 5)")
+    parser.add_argument('--max-replicates', type=int, default=100,
+                        help="the most seeds a configuration is run with (default 100)")
+    parser.add_argument('--batch-size', type=int, default=5,
+                        help="the number of seeds added at a time, until the target is met (default 5)")
+    parser.add_argument('--first-seed', type=int, default=0, help="the first seed used (default 0)")
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help="run up to this many simulations of a batch at a time, in threads")
+
+    return parser.parse_args(arguments)
+
+
+if __name__ == '__main__':
+    args = parse_arguments(sys.argv[1:])
+    logging.basicConfig(filename='sim.log', level=logging.DEBUG)
+
+    replication = AdaptiveReplication(args.config_filename, args.measure, args.half_width, relative=args.relative,
+                                      confidence=args.confidence, min_replicates=args.min_replicates,
+                                      max_replicates=args.max_replicates, batch_size=args.batch_size,
+                                      first_seed=args.first_seed)
+    configurations = replication.run(concurrency=args.concurrency)
+    report = replication.get_report()
+
+    for configuration in configurations:
+        print "{0} {1}: {2} replicate(s), {3:.4f} +/- {4:.4f}{5}".format(configuration['topic'],
+                                                                        configuration['user'],
+                                                                        configuration['replicates'],
+                                                                        configuration['mean'],
+                                                                        configuration['half_width'],
+                                                                        '' if configuration['met'] else ' (target not met)')
+
+    print "Target met for {0} of {1} configurations.".format(report['met'], len(configurations))
+    print "Ran {0} of {1} simulations ({2:.1%} of the maximum).".format(report['simulations'], report['maximum'], report['fraction'])
+    print "Report saved to {0}".format(replication.save_report())
@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import math
+import argparse
+import logging
+from run_simiir import run_configurations
+from config_readers.simulation_config_reader import SimulationConfigReader
+
+log = logging.getLogger('run_adaptive_search')
+
+#
+# Adaptive parameter search over the users of a simulation configuration (e.g. as generated by sim_config_generator).
+# Rather than running every user on every topic, successive halving is used: all users are run on a small subset of the
+# topics, the users are ranked by the mean of a chosen measure, and only the best 1/eta are run on a larger subset (eta times
+# larger). This is repeated until one user remains, or all topics have been used.
+#
+# Simulations use the null output backend, with the results of each passed to a sink, and evaluated by the native evaluator.
+# Results are kept between rungs, so surviving users are only run on the topics they have not been run on before.
+#
+
+class SuccessiveHalving(object):
+    """
+    Runs successive halving over the users of a simulation configuration file.
+    """
+    def __init__(self, config_filename, measure, eta=3, min_topics=1, minimise=False):
+        """
+        measure is the name of an evaluation measure (e.g. 'P_10') or a summary counter (e.g. 'TOTAL_DOCUMENTS_MARKED_RELEVANT').
+        Users are ranked by their mean value over topics; the highest first, unless minimise is True.
+        """
+        if eta < 2:
+            raise ValueError("eta must be at least 2.")
+
+        if min_topics < 1:
+            raise ValueError("min_topics must be at least 1.")
+
+        self.__config_filename = config_filename
+        self.__measure = measure
+        self.__eta = eta
+        self.__min_topics = min_topics
+        self.__minimise = minimise
+
+        config_reader = SimulationConfigReader(config_filename)
+        self.__topic_ids = config_reader.get_topic_ids()
+        self.__user_files = config_reader.get_user_files()
+        self.__base_dir = config_reader.get_base_dir()
+
+        self.__values = dict([(user_file, {}) for user_file in self.__user_files])  # user file -> {topic ID: [values]}
+        self.__simulations = 0
+        self.__rungs = []
+
+    def run(self, **run_arguments):
+        """
+        Runs the search; run_arguments are passed to run_configurations() (e.g. replicates=100).
+        Returns the list of surviving user configuration files, best first.
+        """
+        survivors = list(self.__user_files)
+        topic_count = min(self.__min_topics, len(self.__topic_ids))
+
+        while True:
+            topic_ids = self.__topic_ids[:topic_count]
+
+            for user_file in survivors:
+                self.__run_user(user_file, topic_ids, run_arguments)
+
+            ranking = self.__rank(survivors, topic_ids)
+            keep = max(1, int(math.ceil(len(survivors) / float(self.__eta))))
+
+            if topic_count == len(self.__topic_ids):
+                keep = len(survivors)  # All topics have been used; the ranking is final.
+
+            survivors = [user_file for user_file, score in ranking[:keep]]
+
+            self.__rungs.append({'topics': topic_ids,
+                                 'ranking': [{'user': user_file, 'score': score} for user_file, score in ranking],
+                                 'survivors': survivors})
+
+            log.info("Rung {0}: {1} topic(s), {2} user(s) kept.".format(len(self.__rungs), topic_count, len(survivors)))
+
+            if len(survivors) == 1 or topic_count == len(self.__topic_ids):
+                return survivors
+
+            topic_count = min(topic_count * self.__eta, len(self.__topic_ids))
+
+    def get_report(self):
+        """
+        Returns a dictionary describing the search: the rungs run, and the number of (user, topic) simulations run compared
+        to the full grid.
+        """
+        full_grid = len(self.__user_files) * len(self.__topic_ids)
+
+        return {'measure': self.__measure,
+                'minimise': self.__minimise,
+                'eta': self.__eta,
+                'rungs': self.__rungs,
+                'simulations': self.__simulations,
+                'full_grid': full_grid,
+                'fraction': self.__simulations / float(full_grid)}
+
+    def save_report(self):
+        """
+        Saves the report (see get_report()) to adaptive_search.json in the simulation's base directory.
+        Returns the filename.
+        """
+        if not os.path.exists(self.__base_dir):
+            os.makedirs(self.__base_dir)
+
+        report_filename = os.path.join(self.__base_dir, 'adaptive_search.json')
+        report_file = open(report_filename, 'w')
+        json.dump(self.get_report(), report_file, indent=2)
+        report_file.close()
+
+        return report_filename
+
+    def __run_user(self, user_file, topic_ids, run_arguments):
+        """
+        Runs the given user on any of the given topics it has not been run on before, recording the measure for each.
+        """
+        values = self.__values[user_file]
+        new_topic_ids = [topic_id for topic_id in topic_ids if topic_id not in values]
+
+        if not new_topic_ids:
+            return
+
+        def sink(result):
+            values.setdefault(result['topic_id'], []).append(self.__get_value(result))
+
+        config_reader = SimulationConfigReader(self.__config_filename,
+                                               sink=sink,
+                                               topics=new_topic_ids,
+                                               users=[user_file],
+                                               output_overrides={'backend': 'null', 'trec_eval': True})
+
+        run_configurations(config_reader, **run_arguments)
+        self.__simulations = self.__simulations + len(new_topic_ids)
+
+    def __get_value(self, result):
+        """
+        Returns the value of the measure from a result passed to the sink.
+        """
+        if result.get('measures') and self.__measure in result['measures']:
+            return result['measures'][self.__measure]
+
+        if self.__measure in result['summary']:
+            return result['summary'][self.__measure]
+
+        raise KeyError("The measure '{0}' is neither an evaluation measure nor a summary counter.".format(self.__measure))
+
+    def __rank(self, user_files, topic_ids):
+        """
+        Returns a list of (user file, score) tuples, best first; the score is the mean value of the measure over the topics.
+        Seeds and replicates of a topic are averaged first, so each topic counts equally.
+        """
+        ranking = []
+
+        for user_file in user_files:
+            topic_means = [sum(self.__values[user_file][topic_id]) / float(len(self.__values[user_file][topic_id]))
+                           for topic_id in topic_ids if self.__values[user_file].get(topic_id)]
+
+            ranking.append((user_file, sum(topic_means) / len(topic_means) if topic_means else float('nan')))
+
+        def sort_key(entry):
+            score = entry[1]
+
+            if score != score:  # NaN; no results, so ranked last.
+                return float('inf')
+
+            return score if self.__minimise else -score
+
+        return sorted(ranking, key=sort_key)  # A stable sort; ties keep the order of the configuration file.
+
+
+def parse_arguments(arguments):
+    """
+    Parses the command line arguments, returning an argparse Namespace.
+    """
+    parser = argparse.ArgumentParser(description="Runs successive halving over the users of a simulation configuration file.")
+    parser.add_argument('config_filename', help="the simulation configuration file")
+    parser.add_argument('--measure', default='map',
+                        help="the evaluation measure or summary counter to rank users by (default map)")
+    parser.add_argument('--minimise', action='store_true', help="rank users by the lowest value of the measure")
+    parser.add_argument('--eta', type=int, default=3,
+                        help="the proportion of users dropped (1 - 1/eta), and the growth in topics, at each rung (default 3)")
+    parser.add_argument('--min-topics', type=int, default=1, help="the number of topics used in the first rung (default 1)")
+    parser.add_argument('--replicates', type=int, default=None,
+                        help="run each configuration this many times, in lockstep, with the replicate engine")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="the base seed for the random streams of the replicate engine (default 0)")
+
+    return parser.parse_args(arguments)
+
+
+if __name__ == '__main__':
+    args = parse_arguments(sys.argv[1:])
+    logging.basicConfig(filename='sim.log', level=logging.DEBUG)
+
+    search = SuccessiveHalving(args.config_filename, args.measure, eta=args.eta, min_topics=args.min_topics, minimise=args.minimise)
+    survivors = search.run(replicates=args.replicates, seed=args.seed)
+    report = search.get_report()
+
+    print "Best user: {0}".format(survivors[0])
+    print "Ran {0} of {1} simulations ({2:.1%} of the full grid).".format(report['simulations'], report['full_grid'], report['fraction'])
+    print "Report saved to {0}".format(search.save_report())
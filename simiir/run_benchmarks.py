@@ -0,0 +1,75 @@
+import sys
+import json
+import argparse
+import logging
+from benchmarks.suite import BenchmarkSuite, compare_results, DEFAULT_USERS
+
+#
+# Runs the end-to-end benchmark over synthetic corpora (see the benchmarks package), saving the results as JSON.
+# Given the results of a previous run (e.g. of an earlier version) with --compare, the speedup of each case is printed.
+#
+
+
+def parse_integer_list(value):
+    """
+    Parses a comma-separated list of integers (e.g. 1000,5000).
+    """
+    try:
+        return [int(item) for item in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("Expected a comma-separated list of integers, e.g. 1000,5000.")
+
+
+def parse_arguments(arguments):
+    """
+    Parses the command line arguments, returning an argparse Namespace.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks the simulator over synthetic corpora.")
+    parser.add_argument('--work-dir', default='benchmark_data',
+                        help="the directory the corpora and configurations are generated in; corpora are reused (default benchmark_data)")
+    parser.add_argument('--output', default='benchmark_results.json', help="the file the results are saved to (default benchmark_results.json)")
+    parser.add_argument('--compare', default=None, help="the results of a previous run, to compare against")
+    parser.add_argument('--users', default=','.join(DEFAULT_USERS),
+                        help="a comma-separated list of the user configurations (from example_sims/users) to run")
+    parser.add_argument('--corpus-sizes', type=parse_integer_list, default=[1000, 5000],
+                        help="the numbers of documents in the corpora (default 1000,5000)")
+    parser.add_argument('--time-limits', type=parse_integer_list, default=[150, 300, 600, 1200],
+                        help="the session lengths (the loggers' time_limit) to run (default 150,300,600,1200)")
+    parser.add_argument('--topics', type=int, default=3, help="the number of topics in each corpus (default 3)")
+    parser.add_argument('--seed', type=int, default=0, help="the seed for generating the corpora and running the users (default 0)")
+
+    return parser.parse_args(arguments)
+
+
+if __name__ == '__main__':
+    args = parse_arguments(sys.argv[1:])
+    logging.basicConfig(filename='sim.log', level=logging.INFO)
+
+    suite = BenchmarkSuite(args.work_dir, users=args.users.split(','), corpus_sizes=args.corpus_sizes,
+                           time_limits=args.time_limits, topics=args.topics, seed=args.seed)
+    results = suite.run()
+
+    results_file = open(args.output, 'w')
+    json.dump(results, results_file, indent=2, sort_keys=True)
+    results_file.close()
+
+    print "{0:<30} {1:>9} {2:>6} {3:>10} {4:>10}".format('user', 'documents', 'limit', 'sims/sec', 'steps/sec')
+
+    for case in results['cases']:
+        print "{0:<30} {1:>9} {2:>6} {3:>10.2f} {4:>10.0f}".format(case['user'], case['documents'], case['time_limit'],
+                                                                    case['sims_per_second'], case['steps_per_second'])
+
+    print "Peak RSS: {0:.1f} MB. Results saved to {1}".format(results['peak_rss_mb'], args.output)
+
+    if args.compare:
+        baseline_file = open(args.compare)
+        baseline = json.load(baseline_file)
+        baseline_file.close()
+
+        print
+        print "Compared with {0} (revision {1}):".format(args.compare, baseline['metadata']['revision'])
+
+        for row in compare_results(baseline, results):
+            print "{0:<30} {1:>9} {2:>6} {3:>9.2f}x {4:>9.2f}x{5}".format(row['user'], row['documents'], row['time_limit'],
+                                                                       row['sims_per_second'] or 0.0, row['steps_per_second'] or 0.0,
+                                                                       " (steps differ)" if row['steps_changed'] else "")
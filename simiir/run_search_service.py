@@ -0,0 +1,75 @@
+import sys
+import argparse
+import logging
+from search_service import SearchService, DEFAULT_PORT
+
+#
+# Runs the local search service (see search_service), hosting the given Whoosh indexes until interrupted.
+# Simulations then use the ServiceSearchInterface, with the name of the index, in place of the WhooshSearchInterface.
+#
+
+
+def parse_value(value):
+    """
+    Converts an option value to an integer, float or boolean where it looks like one; otherwise, it is left as a string.
+    """
+    for convert in [int, float]:
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+
+    if value.lower() in ['true', 'false']:
+        return value.lower() == 'true'
+
+    return value
+
+
+def parse_index(index_value):
+    """
+    Parses an index argument of the form name=directory[,option=value...], returning a tuple of the name, and a dictionary of
+    the keyword arguments for the WhooshSearchInterface (e.g. ap=/data/ap_index,model=1,pval=0.75).
+    """
+    try:
+        name, arguments = index_value.split('=', 1)
+        arguments = arguments.split(',')
+        options = dict([option.split('=', 1) for option in arguments[1:]])
+    except ValueError:
+        raise argparse.ArgumentTypeError("An index must be of the form name=directory[,option=value...], e.g. ap=/data/ap_index,model=1.")
+
+    options = dict([(option, parse_value(value)) for option, value in options.items()])
+    options['whoosh_index_dir'] = arguments[0]
+    return name, options
+
+
+def parse_arguments(arguments):
+    """
+    Parses the command line arguments, returning an argparse Namespace.
+    """
+    parser = argparse.ArgumentParser(description="Hosts Whoosh indexes for the simulations on this machine.")
+    parser.add_argument('--index', type=parse_index, action='append', required=True,
+                        help="an index to host, as name=directory[,option=value...] - options are those of the WhooshSearchInterface (e.g. model, pval); may be repeated")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="the localhost port to listen on (default {0})".format(DEFAULT_PORT))
+    parser.add_argument('--cache-size', type=int, default=10000, help="the number of responses (and documents) to cache (default 10000)")
+    parser.add_argument('--batch-size', type=int, default=64, help="the most requests to an index handled in a batch (default 64)")
+
+    return parser.parse_args(arguments)
+
+
+if __name__ == '__main__':
+    args = parse_arguments(sys.argv[1:])
+    logging.basicConfig(filename='search_service.log', level=logging.INFO)
+
+    from search_interfaces.whoosh_interface import WhooshSearchInterface
+    indexes = dict([(name, WhooshSearchInterface(**options)) for name, options in args.index])
+
+    service = SearchService(indexes, port=args.port, cache_size=args.cache_size, batch_size=args.batch_size)
+    print "Search service listening on 127.0.0.1:{0}, hosting {1}".format(args.port, ', '.join(sorted(indexes)))
+
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+        print "Search service stopped: {0}".format(service.get_stats())
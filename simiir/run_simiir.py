@@ -1,50 +1,199 @@
 import os
 import sys
-from sim_user import SimulatedUser
-from progress_indicator import ProgressIndicator
-from config_readers.simulation_config_reader import SimulationConfigReader
+import argparse
 import gc
 import logging
 
+# The simulator's modules (and their dependencies, e.g. lxml and numpy) are imported when first needed, rather than here;
+# so parsing the command line (e.g. --help) is fast, and --profile-imports can time them.
 
-def main(config_filename):
+
+def main(config_filename, replicates=None, seed=0, expectation=False, shard=None, index_range=None, concurrency=None, limits=None):
     """
     The main simulation!
     For every configuration permutation, create a Simulated user object, and run the simulation (the while loop).
     Then save, report, and repeat ad naseum.
+    If replicates is specified, each configuration is instead run that many times in lockstep by the replicate engine.
+    If expectation is True, the expected outcome of each configuration is computed by the expectation engine instead.
+    shard (a (shard index, shard count) tuple) and index_range (a (start, stop) tuple) select a slice of the configurations.
+    If concurrency is specified, up to that many simulations are run at once by the concurrent engine.
+    limits is an optional dictionary of per-simulation limits (max_seconds, max_steps, max_memory) - see utils.watchdog.
     """
+    from config_readers.simulation_config_reader import SimulationConfigReader
+    
     logging.basicConfig(filename='sim.log',level=logging.DEBUG)
-    config_reader = SimulationConfigReader(config_filename)
-    
-    for configuration in config_reader:
-        #print "Running experiment {base_id}...".format(base_id=configuration.base_id),
-        
-        user = SimulatedUser(configuration)
-        progress = ProgressIndicator(configuration)
-        configuration.output.display_config()
-        
-        while not configuration.user.logger.is_finished():
-            #progress.update()  # Update the progress indicator in the terminal.
-            user.decide_action()
-        
-        configuration.output.display_report()
-        #print "complete."
-        configuration.output.save()
-        gc.collect()
-
-    completed_file = open(os.path.join(config_reader.get_base_dir(), 'COMPLETED'), 'w')
+    config_reader = SimulationConfigReader(config_filename, shard=shard, index_range=index_range)
+    
+    # When a slice is run, the slice is recorded in the filenames - so the slices run by separate nodes can be told apart.
+    completed_filename = 'COMPLETED'
+    manifest_filename = 'manifest.jsonl'
+    
+    if shard is not None or index_range is not None:
+        completed_filename = 'COMPLETED-{0}-{1}'.format(*config_reader.get_index_range())
+        manifest_filename = 'manifest-{0}-{1}.jsonl'.format(*config_reader.get_index_range())
+    
+    run_configurations(config_reader, replicates=replicates, seed=seed, expectation=expectation, concurrency=concurrency,
+                       limits=limits, manifest_filename=manifest_filename)
+    
+    completed_file = open(os.path.join(config_reader.get_base_dir(), completed_filename), 'w')
     completed_file.close()
 
 
-def usage(script_name):
+def run_configurations(config_reader, replicates=None, seed=0, expectation=False, concurrency=None, limits=None,
+                       manifest_filename='manifest.jsonl'):
+    """
+    Runs (and saves the output of) each configuration provided by the given SimulationConfigReader. See main().
+    If limits are given, the outcome of each simulation is recorded in the manifest (manifest_filename, in the base directory);
+    simulations exceeding a limit are stopped, recorded as failed, and not saved.
+    """
+    from sim_user import SimulatedUser
+    from progress_indicator import ProgressIndicator
+    from results_store import close_results_stores
+    from simiir.utils.component_timer import save_aggregate_timings
+    from simiir.utils.watchdog import Watchdog, SimulationLimitError, Manifest
+    
+    manifest = None
+    
+    if limits:
+        manifest = Manifest(os.path.join(config_reader.get_base_dir(), manifest_filename))
+    
+    if concurrency is not None and concurrency > 1:
+        from engines.concurrent_engine import ConcurrentEngine
+        ConcurrentEngine(config_reader, concurrency, limits=limits, manifest=manifest).run()
+    else:
+        for configuration in config_reader:
+            #print "Running experiment {base_id}...".format(base_id=configuration.base_id),
+            
+            if expectation:
+                from engines.expectation_engine import ExpectationEngine
+                configuration.output.display_config()
+                configuration.output.save_expectation(ExpectationEngine(configuration).run())
+                gc.collect()
+                continue
+            
+            if replicates:
+                from engines.lockstep_engine import LockstepEngine
+                configuration.output.display_config()
+                engine = LockstepEngine(configuration, replicates, seed=seed + (configuration.seed or 0))  # Offset by the sweep's seed, if any.
+                engine.run()
+                configuration.output.save_replicates(engine.get_results())
+                gc.collect()
+                continue
+            
+            user = SimulatedUser(configuration)
+            progress = ProgressIndicator(configuration)
+            configuration.output.display_config()
+            
+            if manifest is None:
+                user.run_until_finished()  # Runs until the logger reports the simulation is finished; see SimulatedUser.decide_action().
+            else:
+                watchdog = Watchdog(**limits)
+                
+                try:
+                    user.run_until_finished(watchdog=watchdog)
+                except SimulationLimitError, e:
+                    manifest.add(configuration, watchdog, error=e)
+                    configuration.output.discard()  # Removes any partial streamed logs.
+                    gc.collect()
+                    continue
+                
+                manifest.add(configuration, watchdog)
+            
+            configuration.output.display_report()
+            #print "complete."
+            configuration.output.save()
+            gc.collect()
+    
+    if manifest is not None and manifest.failed:
+        print "{0} simulation(s) exceeded their limits; see {1}".format(manifest.failed, manifest_filename)
+    
+    close_results_stores()  # Commits any results still pending in a results store.
+    save_aggregate_timings()  # Only if the componentTiming flag is set; see utils.component_timer.
+
+
+def parse_shard(shard_value):
+    """
+    Parses a shard argument of the form i/N (for 0 <= i < N), returning a tuple (i, N).
+    """
+    try:
+        shard_index, shard_count = [int(value) for value in shard_value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("A shard must be of the form i/N, e.g. 0/4.")
+    
+    if shard_count < 1 or shard_index < 0 or shard_index >= shard_count:
+        raise argparse.ArgumentTypeError("A shard i/N requires 0 <= i < N.")
+    
+    return shard_index, shard_count
+
+
+def parse_index_range(range_value):
+    """
+    Parses a range argument of the form a:b (a included, b excluded), returning a tuple (a, b).
+    """
+    try:
+        start, stop = [int(value) for value in range_value.split(':')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("A range must be of the form a:b, e.g. 0:1000.")
+    
+    if start < 0 or stop < start:
+        raise argparse.ArgumentTypeError("A range a:b requires 0 <= a <= b.")
+    
+    return start, stop
+
+
+def parse_arguments(arguments):
     """
-    Prints the usage message to the output stream.
+    Parses the command line arguments, returning an argparse Namespace.
     """
-    print "Usage: {0} [configuration_filename]".format(script_name)
+    parser = argparse.ArgumentParser(description="Runs the simulations specified in a simulation configuration file.")
+    parser.add_argument('config_filename', help="the simulation configuration file")
+    engine_group = parser.add_mutually_exclusive_group()
+    engine_group.add_argument('--replicates', type=int, default=None,
+                              help="run each configuration this many times, in lockstep, with the replicate engine")
+    engine_group.add_argument('--expectation', action='store_true',
+                              help="compute the expected outcome of each configuration with the expectation engine")
+    engine_group.add_argument('--concurrency', type=int, default=None,
+                              help="run up to this many simulations at once, in threads - to overlap the requests made to a remote search engine")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="the base seed for the random streams of the replicate engine (default 0)")
+    parser.add_argument('--shard', type=parse_shard, default=None,
+                        help="run only shard i of N (i/N, 0 <= i < N) - a contiguous block of the configurations")
+    parser.add_argument('--range', dest='index_range', type=parse_index_range, default=None,
+                        help="run only the configurations with indices a (included) to b (excluded), as a:b")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="stop any simulation running for longer than this many seconds, and carry on with the next")
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help="stop any simulation performing more than this many steps (actions), and carry on with the next")
+    parser.add_argument('--max-memory', type=float, default=None,
+                        help="stop any simulation growing the process's memory use (RSS) by more than this many MB, and carry on")
+    parser.add_argument('--profile-imports', action='store_true',
+                        help="time the imports made by the simulator, and print the slowest once the simulations are complete")
+    
+    args = parser.parse_args(arguments)
+    
+    if (args.max_seconds is not None or args.max_steps is not None or args.max_memory is not None) and \
+            (args.replicates or args.expectation):
+        parser.error("limits cannot be used with the replicate or expectation engines")
+    
+    return args
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2 or len(sys.argv) > 2:
-        usage(sys.argv[0])
-    else:
-        main(sys.argv[1])
\ No newline at end of file
+    args = parse_arguments(sys.argv[1:])
+    profiler = None
+    
+    if args.profile_imports:
+        from utils.import_profiler import ImportProfiler
+        profiler = ImportProfiler()
+        profiler.start()
+    
+    limits = dict([(name, value) for name, value in [('max_seconds', args.max_seconds),
+                                                     ('max_steps', args.max_steps),
+                                                     ('max_memory', args.max_memory)] if value is not None])
+    
+    main(args.config_filename, replicates=args.replicates, seed=args.seed, expectation=args.expectation,
+         shard=args.shard, index_range=args.index_range, concurrency=args.concurrency, limits=limits)
+    
+    if profiler is not None:
+        profiler.stop()
+        print profiler.get_report()
\ No newline at end of file
@@ -0,0 +1,306 @@
+#
+# Running statistics over the snippets and documents examined by the simulated user, kept by the SearchContext so that
+# stopping decision makers need not rescan the examined lists on every decision.
+#
+# Judgments are assigned to an item after it has been examined (and the item may be left unjudged, with a judgment of -1,
+# if it has been seen before). So the most recently examined item is held "live": its judgment is read when the statistics
+# are, and it is only folded into the running totals once the next item is examined. Judgments of earlier items are not
+# expected to change; if one is revised, revise() must be called, and the totals are recomputed.
+#
+
+
+class ExaminedItemStatistics(object):
+    """
+    Running statistics over the items (snippets or documents) examined for a single query, in the order they were examined.
+    Items are judged relevant if their judgment is > 0, and non-relevant if it is 0; -1 denotes an unjudged item.
+    Non-relevant items may be skipped if an earlier item with the same doc_id was judged non-relevant (as per the Skip
+    decision makers); the first earlier occurrence of the doc_id is considered.
+    """
+    def __init__(self):
+        self.__items = []
+        self.__reset()
+
+    def __reset(self):
+        """
+        Resets the totals over the committed items (all but the last item examined).
+        """
+        self.__committed = 0
+        self.__judgments = []
+        self.__relevant_count = 0
+        self.__nonrelevant_count = 0
+        self.__novel_nonrelevant_count = 0
+        self.__streak = 0
+        self.__longest_streak = 0
+        self.__novel_streak = 0
+        self.__longest_novel_streak = 0
+        self.__gain = 0
+        self.__first_judgments = {}  # doc_id -> the judgment of its first occurrence.
+        self.__last_relevant_doc_id = None
+        self.__discounted_gains = {}  # discount -> [discounted gain, number of committed items included]
+
+    def add(self, item):
+        """
+        Adds an examined item; the previously examined item (if any) is committed to the totals.
+        """
+        if self.__items:
+            self.__commit(self.__items[-1])
+
+        self.__items.append(item)
+
+    def revise(self, item):
+        """
+        Called when the judgment of an examined item has been changed after a later item was examined.
+        """
+        if self.__items and item is not self.__items[-1]:
+            self.__reset()
+
+            for earlier_item in self.__items[:-1]:
+                self.__commit(earlier_item)
+
+    def __commit(self, item):
+        """
+        Adds the given item (with its judgment, now final) to the totals.
+        """
+        judgment = item.judgment
+        self.__committed = self.__committed + 1
+        self.__judgments.append(judgment)
+
+        if judgment > 0:
+            self.__relevant_count = self.__relevant_count + 1
+            self.__gain = self.__gain + judgment
+            self.__last_relevant_doc_id = item.doc_id
+
+        self.__nonrelevant_count, self.__streak, self.__novel_nonrelevant_count, self.__novel_streak = self.__count(item, judgment)
+        self.__longest_streak = max(self.__longest_streak, self.__streak)
+        self.__longest_novel_streak = max(self.__longest_novel_streak, self.__novel_streak)
+
+        if item.doc_id not in self.__first_judgments:
+            self.__first_judgments[item.doc_id] = judgment
+
+    def __count(self, item, judgment):
+        """
+        Returns the non-relevant count, streak, novel non-relevant count and novel streak once the given item is included.
+        """
+        if judgment != 0:
+            return self.__nonrelevant_count, 0, self.__novel_nonrelevant_count, 0
+
+        if self.__first_judgments.get(item.doc_id, -1) == 0:
+            # Seen before in this query, and judged non-relevant then; skipped, so the novel streak is neither extended nor broken.
+            return self.__nonrelevant_count + 1, self.__streak + 1, self.__novel_nonrelevant_count, self.__novel_streak
+
+        return self.__nonrelevant_count + 1, self.__streak + 1, self.__novel_nonrelevant_count + 1, self.__novel_streak + 1
+
+    def __get_live(self):
+        """
+        Returns the item examined last (not yet committed), or None.
+        """
+        if len(self.__items) > self.__committed:
+            return self.__items[-1]
+
+        return None
+
+    def get_count(self):
+        """
+        Returns the number of items examined.
+        """
+        return len(self.__items)
+
+    def get_relevant_count(self):
+        """
+        Returns the number of items judged relevant.
+        """
+        live = self.__get_live()
+        return self.__relevant_count + (1 if live is not None and live.judgment > 0 else 0)
+
+    def get_nonrelevant_count(self, skip_repeated=False):
+        """
+        Returns the number of items judged non-relevant; with skip_repeated, items seen (and judged non-relevant) earlier are skipped.
+        """
+        counts = self.__get_live_counts()
+        return counts[2] if skip_repeated else counts[0]
+
+    def get_nonrelevant_streak(self, skip_repeated=False):
+        """
+        Returns the number of consecutive items judged non-relevant, up to and including the last item examined.
+        Any item not judged non-relevant (including unjudged items) breaks the streak, except - with skip_repeated - skipped items.
+        """
+        counts = self.__get_live_counts()
+        return counts[3] if skip_repeated else counts[1]
+
+    def get_longest_nonrelevant_streak(self, skip_repeated=False):
+        """
+        Returns the longest streak of items judged non-relevant (see get_nonrelevant_streak()) seen so far.
+        """
+        counts = self.__get_live_counts()
+
+        if skip_repeated:
+            return max(self.__longest_novel_streak, counts[3])
+
+        return max(self.__longest_streak, counts[1])
+
+    def __get_live_counts(self):
+        """
+        Returns the non-relevant count, streak, novel non-relevant count and novel streak, including the live item.
+        """
+        live = self.__get_live()
+
+        if live is None:
+            return self.__nonrelevant_count, self.__streak, self.__novel_nonrelevant_count, self.__novel_streak
+
+        return self.__count(live, live.judgment)
+
+    def get_gain(self):
+        """
+        Returns the cumulative gain; the sum of the judgments, with unjudged items counting as 0.
+        """
+        live = self.__get_live()
+        return self.__gain + (live.judgment if live is not None and live.judgment > 0 else 0)
+
+    def get_discounted_gain(self, discount):
+        """
+        Returns the discounted cumulative gain; the sum of the judgment at each position (from 1) divided by position ** discount.
+        The sum over the committed items is kept for each discount requested, and extended as items are committed.
+        """
+        discounted_gain = self.__discounted_gains.setdefault(discount, [0.0, 0])
+
+        for position in range(discounted_gain[1] + 1, self.__committed + 1):
+            discounted_gain[0] += max(float(self.__judgments[position - 1]), 0.0) * (1.0 / (float(position) ** discount))
+
+        discounted_gain[1] = self.__committed
+        live = self.__get_live()
+
+        if live is None:
+            return discounted_gain[0]
+
+        return discounted_gain[0] + max(float(live.judgment), 0.0) * (1.0 / (float(len(self.__items)) ** discount))
+
+    def get_first_judgment(self):
+        """
+        Returns the judgment of the first item examined, or None if no items have been examined.
+        """
+        if not self.__items:
+            return None
+
+        if self.__committed:
+            return self.__judgments[0]
+
+        return self.__items[0].judgment
+
+    def get_last_relevant_doc_id(self):
+        """
+        Returns the doc_id of the item judged relevant most recently, or None if no item has been judged relevant.
+        """
+        live = self.__get_live()
+
+        if live is not None and live.judgment > 0:
+            return live.doc_id
+
+        return self.__last_relevant_doc_id
+
+
+class QueryStatistics(object):
+    """
+    Running statistics for the current query: over the snippets examined, the documents examined, and the ranks of the SERP.
+    """
+    def __init__(self, results=None):
+        self.snippets = ExaminedItemStatistics()
+        self.documents = ExaminedItemStatistics()
+        self.__results = results
+        self.__ranks = None
+
+    def set_results(self, results):
+        """
+        Sets the results of the SERP the ranks are taken from.
+        """
+        self.__results = results
+        self.__ranks = None
+
+    def get_rank(self, doc_id):
+        """
+        Returns the rank (from 1) of the given doc_id on the SERP - its last occurrence, if it appears more than once - or 0 if
+        it does not appear. The ranks are indexed on first use.
+        """
+        if self.__ranks is None:
+            self.__ranks = {}
+
+            for rank, result in enumerate(self.__results or [], start=1):
+                self.__ranks[result.docid] = rank
+
+        return self.__ranks.get(doc_id, 0)
+
+    def get_last_relevant_rank(self, consider_documents=False):
+        """
+        Returns the SERP rank of the snippet (or document) judged relevant most recently; 0 if there is none.
+        """
+        items = self.documents if consider_documents else self.snippets
+        doc_id = items.get_last_relevant_doc_id()
+
+        if doc_id is None:
+            return 0
+
+        return self.get_rank(doc_id)
+
+
+class SessionStatistics(object):
+    """
+    Running statistics for the search session as a whole: the totals over all queries, and the number of times each doc_id
+    has been examined.
+    """
+    def __init__(self):
+        self.snippets_examined = 0
+        self.documents_examined = 0
+        self.__relevant_snippets = 0
+        self.__relevant_documents = 0
+        self.__snippet_observations = {}
+        self.__document_observations = {}
+        self.__current_query = None
+
+    def add_query(self, query_statistics):
+        """
+        Starts the statistics for a new query; the totals of the previous query are added to those of the session.
+        """
+        if self.__current_query is not None:
+            self.__relevant_snippets = self.__relevant_snippets + self.__current_query.snippets.get_relevant_count()
+            self.__relevant_documents = self.__relevant_documents + self.__current_query.documents.get_relevant_count()
+
+        self.__current_query = query_statistics
+
+    def add_snippet(self, snippet):
+        """
+        Records the examination of a snippet.
+        """
+        self.snippets_examined = self.snippets_examined + 1
+        self.__snippet_observations[snippet.doc_id] = self.__snippet_observations.get(snippet.doc_id, 0) + 1
+
+    def add_document(self, document):
+        """
+        Records the examination of a document.
+        """
+        self.documents_examined = self.documents_examined + 1
+        self.__document_observations[document.doc_id] = self.__document_observations.get(document.doc_id, 0) + 1
+
+    def get_relevant_snippet_count(self):
+        """
+        Returns the number of snippets judged relevant over the session.
+        """
+        current = self.__current_query.snippets.get_relevant_count() if self.__current_query is not None else 0
+        return self.__relevant_snippets + current
+
+    def get_relevant_document_count(self):
+        """
+        Returns the number of documents judged relevant over the session.
+        """
+        current = self.__current_query.documents.get_relevant_count() if self.__current_query is not None else 0
+        return self.__relevant_documents + current
+
+    def get_snippet_observation_count(self, doc_id):
+        """
+        Returns the number of times a snippet with the given doc_id has been examined.
+        """
+        return self.__snippet_observations.get(doc_id, 0)
+
+    def get_document_observation_count(self, doc_id):
+        """
+        Returns the number of times a document with the given doc_id has been examined.
+        """
+        return self.__document_observations.get(doc_id, 0)
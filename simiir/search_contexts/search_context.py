@@ -3,6 +3,7 @@ import abc
 from simiir.loggers import Actions
 from ifind.search.query import Query
 from simiir.search_interfaces import Document
+from simiir.search_contexts.query_statistics import QueryStatistics, SessionStatistics
 import logging
 
 log = logging.getLogger('search_context.search_context')
@@ -11,9 +12,10 @@ class NoRelevanceRevision(object):
     """
     Determines what to do when a nonrelevant document has been selected.
     """
-    def __init__(self, irrelevant_documents, snippets_examined):
+    def __init__(self, irrelevant_documents, snippets_examined, on_revision=None):
         self._irrelevant_documents = irrelevant_documents
         self._snippets_examined = snippets_examined
+        self._on_revision = on_revision  # Called with each snippet whose judgement is revised.
     
     def add_irrelevant_document(self, document):
         """
@@ -26,8 +28,8 @@ class RelevanceRevision(NoRelevanceRevision):
     """
     Uses revised relevance to change the snippet judgement when the associated document is considered non-relevant.
     """
-    def __init__(self, irrelevant_documents, snippets_examined):
-        super(RelevanceRevision, self).__init__(irrelevant_documents, snippets_examined)
+    def __init__(self, irrelevant_documents, snippets_examined, on_revision=None):
+        super(RelevanceRevision, self).__init__(irrelevant_documents, snippets_examined, on_revision)
     
     def add_irrelevant_document(self, document):
         """
@@ -36,6 +38,9 @@ class RelevanceRevision(NoRelevanceRevision):
         for snippet in self._snippets_examined:
             if document.doc_id == snippet.doc_id:
                 snippet.judgment = 0
+                
+                if self._on_revision is not None:
+                    self._on_revision(snippet)
         
         super(RelevanceRevision, self).add_irrelevant_document(document)
 
@@ -83,6 +88,9 @@ class SearchContext(object):
         
         self._relevant_documents = []            # All documents marked relevant throughout the search session.
         self._irrelevant_documents = []          # All documents marked irrelevant throughout the search session.
+        
+        self._query_statistics = QueryStatistics()     # Running statistics for the current query, and the session as a whole;
+        self._session_statistics = SessionStatistics()  # so decision makers need not rescan the examined snippets and documents.
 
         self.query_limit = 0                     # 0 - no limit on the number issued. Otherwise, the number of queries is capped
         self.relevance_revision = 0              # 0 - no revising of relevance judgements, 1- updates the relevance judgement of snippets
@@ -112,7 +120,7 @@ class SearchContext(object):
         if value not in rr_strategies.keys():
             raise ValueError("Value {0} for the relevance revision approach is not valid.".format(value))
         
-        self._relevance_revision = rr_strategies[value](self._irrelevant_documents, self._snippets_examined)
+        self._relevance_revision = rr_strategies[value](self._irrelevant_documents, self._snippets_examined, self._revise_statistics)
 
     
     def report(self):
@@ -128,14 +136,23 @@ class SearchContext(object):
         return_string = return_string + "    Number of Unattractive SERPs Examined: {0}".format(self._unattractive_serp_count)
         
         self._output_controller.log_info(info_type="SUMMARY")
-        self._output_controller.log_info(info_type="TOTAL_QUERIES_ISSUED", text=len(self._issued_queries))
-        self._output_controller.log_info(info_type="TOTAL_SNIPPETS_EXAMINED", text=len(self._all_snippets_examined))
-        self._output_controller.log_info(info_type="TOTAL_DOCUMENTS_EXAMINED", text=len(self._all_documents_examined))
-        self._output_controller.log_info(info_type="TOTAL_DOCUMENTS_MARKED_RELEVANT", text=len(self._relevant_documents))
-        self._output_controller.log_info(info_type="TOTAL_ATTRACTIVE_SERP_IMPRESSIONS", text=self._attractive_serp_count)
-        self._output_controller.log_info(info_type="TOTAL_UNATTRACTIVE_SERP_IMPRESSIONS", text=self._unattractive_serp_count)
+        
+        for info_type, value in self.get_summary():
+            self._output_controller.log_info(info_type=info_type, text=value)
         
         return return_string
+    
+    def get_summary(self):
+        """
+        Returns the basic statistics held within the search context as a list of (name, value) tuples.
+        The names are the same as those used for the SUMMARY entries in the interaction log.
+        """
+        return [('TOTAL_QUERIES_ISSUED', len(self._issued_queries)),
+                ('TOTAL_SNIPPETS_EXAMINED', len(self._all_snippets_examined)),
+                ('TOTAL_DOCUMENTS_EXAMINED', len(self._all_documents_examined)),
+                ('TOTAL_DOCUMENTS_MARKED_RELEVANT', len(self._relevant_documents)),
+                ('TOTAL_ATTRACTIVE_SERP_IMPRESSIONS', self._attractive_serp_count),
+                ('TOTAL_UNATTRACTIVE_SERP_IMPRESSIONS', self._unattractive_serp_count)]
 
     def get_last_action(self):
         """
@@ -183,6 +200,9 @@ class SearchContext(object):
         self._current_snippet = None
         
         self._current_serp_position = 0
+        
+        self._query_statistics = QueryStatistics(self._last_results)
+        self._session_statistics.add_query(self._query_statistics)
     
     def _set_serp_action(self):
         """
@@ -206,6 +226,8 @@ class SearchContext(object):
         self._snippets_examined.append(snippet)
         self._all_snippets_examined.append(snippet)
         self._current_snippet = snippet
+        self._query_statistics.snippets.add(snippet)
+        self._session_statistics.add_snippet(snippet)
         
         # Sets the current document
         self._current_document = self._search_interface.get_document(snippet.id)
@@ -222,6 +244,8 @@ class SearchContext(object):
         """
         self._documents_examined.append(self._current_document)
         self._all_documents_examined.append(self._current_document)
+        self._query_statistics.documents.add(self._current_document)
+        self._session_statistics.add_document(self._current_document)
     
     def _set_mark_action(self):
         """
@@ -253,6 +277,7 @@ class SearchContext(object):
         self._issued_queries.append(query_object)
         self._last_query = query_object
         self._last_results = self._last_query.response.results
+        self._query_statistics.set_results(self._last_results)
     
     
     def get_last_query(self):
@@ -301,26 +326,14 @@ class SearchContext(object):
         Returns a zero or positive integer representing the number of times the simulated user has seen the given document in previous SERPs.
         If the returned value is 0, the document is new to the user, otherwise the document has been seen as many times as the returned value.
         """
-        occurrences = 0
-        
-        for document in self._all_documents_examined:
-            if document.doc_id == selected_document.doc_id:
-                occurrences = occurrences + 1
-        
-        return occurrences
+        return self._session_statistics.get_document_observation_count(selected_document.doc_id)
     
     def get_snippet_observation_count(self, selected_snippet):
         """
         Returns a zero or positive integer representing the number of times the simulated user has seen the given snippet in previous SERPs.
         If the returned value is 0, the document is new to the user, otherwise the snippet has been seen as many times as the returned value.
         """
-        occurrences = 0
-        
-        for snippet in self._all_snippets_examined:
-            if snippet.doc_id == selected_snippet.doc_id:
-                occurrences = occurrences + 1
-        
-        return occurrences
+        return self._session_statistics.get_snippet_observation_count(selected_snippet.doc_id)
     
     def get_snippet_observation_judgment(self, selected_snippet):
         """
@@ -439,6 +452,25 @@ class SearchContext(object):
         """
         return self._all_documents_examined
     
+    def get_query_statistics(self):
+        """
+        Returns the running statistics (a QueryStatistics object) over the snippets and documents examined for the CURRENT QUERY.
+        Stopping decision makers should prefer these to rescanning the lists of examined snippets and documents.
+        """
+        return self._query_statistics
+    
+    def get_session_statistics(self):
+        """
+        Returns the running statistics (a SessionStatistics object) over the ENTIRE SEARCH SESSION.
+        """
+        return self._session_statistics
+    
+    def _revise_statistics(self, snippet):
+        """
+        Called by the relevance revision approach when the judgement of an examined snippet is revised.
+        """
+        self._query_statistics.snippets.revise(snippet)
+    
     def get_issued_queries(self):
         """
         Returns a list of all queries that have been issued for the given search session.
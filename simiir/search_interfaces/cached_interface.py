@@ -0,0 +1,80 @@
+from simiir.search_interfaces.base_interface import BaseSearchInterface
+import logging
+import threading
+
+log = logging.getLogger('simuser.search_interfaces.cached_interface')
+
+
+class CachedSearchInterface(BaseSearchInterface):
+    """
+    Wraps another search interface, keeping the response to each query issued - so identical queries are only issued to the
+    underlying search engine once. Used to share SERPs between the simulations of a seed sweep (see SimulationConfigReader),
+    where each seed issues the same queries to the same engine.
+    Responses are shared between callers, and must be treated as read-only.
+    """
+    def __init__(self, search_interface):
+        super(CachedSearchInterface, self).__init__()
+        self.__search_interface = search_interface
+        self.__responses = {}
+        self.__pending = {}  # Key -> threading.Event, for queries being issued by another thread.
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def issue_query(self, query, top=100):
+        """
+        Returns the response for the given ifind Query object, issuing it to the underlying search interface if the same query
+        (with the same paging, for the same topic) has not been issued before.
+        Safe to call from several threads (see engines.concurrent_engine); if the same query is being issued by another thread,
+        its response is waited for rather than issuing the query again.
+        """
+        topic_id = query.topic.id if getattr(query, 'topic', None) is not None else None
+        key = (query.terms, getattr(query, 'skip', None), top, topic_id)
+
+        while True:
+            with self.__lock:
+                if key in self.__responses:
+                    self.hits = self.hits + 1
+                    response = self.__responses[key]
+                    query.top = top
+                    break
+
+                pending = self.__pending.get(key)
+                issuing = pending is None
+
+                if issuing:
+                    self.misses = self.misses + 1
+                    pending = self.__pending[key] = threading.Event()
+
+            if not issuing:
+                pending.wait()  # Then look again; if the other thread failed, the query is issued here.
+                continue
+
+            try:
+                response = self.__search_interface.issue_query(query, top=top)
+
+                with self.__lock:
+                    self.__responses[key] = response
+            finally:
+                with self.__lock:
+                    del self.__pending[key]
+
+                pending.set()
+
+            break
+
+        self._last_query = query
+        self._last_response = response
+        return response
+
+    def get_document(self, document_id):
+        """
+        Retrieves a Document object from the underlying search interface.
+        """
+        return self.__search_interface.get_document(document_id)
+
+    def get_search_interface(self):
+        """
+        Returns the underlying (wrapped) search interface.
+        """
+        return self.__search_interface
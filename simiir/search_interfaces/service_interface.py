@@ -0,0 +1,96 @@
+import json
+import socket
+import threading
+from simiir.search_interfaces.base_interface import BaseSearchInterface
+from simiir.search_service import DEFAULT_PORT, SearchServiceError, decode_response, decode_document
+import logging
+
+log = logging.getLogger('simuser.search_interfaces.service_interface')
+
+
+class ServiceSearchInterface(BaseSearchInterface):
+    """
+    A search interface for an index hosted by the local search service (see search_service and run_search_service.py), so that
+    the simulators on a node share one warm index, and one cache of responses, rather than each opening the index itself.
+    index is the name the index is hosted under. A connection is opened for each thread using the interface (see
+    engines.concurrent_engine), and reopened once if the service has closed it.
+    """
+    def __init__(self, index, port=DEFAULT_PORT, host='127.0.0.1', timeout=60):
+        super(ServiceSearchInterface, self).__init__()
+        self.__index = index
+        self.__address = (host, port)
+        self.__timeout = timeout
+        self.__connections = threading.local()
+
+    def issue_query(self, query, top=100):
+        """
+        Issues the given ifind Query object to the service, returning the response.
+        """
+        query.top = top
+        result = self.__request({'op': 'search', 'index': self.__index, 'terms': query.terms,
+                                 'skip': getattr(query, 'skip', None), 'top': top})
+        response = decode_response(result)
+
+        self._last_query = query
+        self._last_response = response
+        return response
+
+    def get_document(self, document_id):
+        """
+        Retrieves a Document object for the given document from the service.
+        """
+        return decode_document(self.__request({'op': 'document', 'index': self.__index, 'document_id': document_id}))
+
+    def get_stats(self):
+        """
+        Returns the service's statistics (see SearchService.get_stats()).
+        """
+        return self.__request({'op': 'stats'})
+
+    def __request(self, request):
+        """
+        Sends a request to the service, returning the result. A SearchServiceError is raised if the service reports an error.
+        """
+        line = json.dumps(request) + '\n'
+
+        try:
+            reply = self.__send(line)
+        except socket.error:
+            log.debug("Reconnecting to the search service at {0}:{1}".format(*self.__address))
+            self.__close()
+            reply = self.__send(line)
+
+        if not reply['ok']:
+            raise SearchServiceError(reply['error'])
+
+        return reply['result']
+
+    def __send(self, line):
+        """
+        Sends a line on this thread's connection (opening it if need be), returning the decoded reply.
+        """
+        connection = getattr(self.__connections, 'socket', None)
+
+        if connection is None:
+            connection = socket.create_connection(self.__address, self.__timeout)
+            self.__connections.socket = connection
+            self.__connections.reader = connection.makefile('rb')
+
+        connection.sendall(line)
+        reply = self.__connections.reader.readline()
+
+        if not reply:
+            raise socket.error("The search service closed the connection")
+
+        return json.loads(reply)
+
+    def __close(self):
+        """
+        Closes this thread's connection, if open.
+        """
+        connection = getattr(self.__connections, 'socket', None)
+
+        if connection is not None:
+            self.__connections.reader.close()
+            connection.close()
+            self.__connections.socket = None
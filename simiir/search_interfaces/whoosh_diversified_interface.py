@@ -26,7 +26,8 @@ class WhooshDiversifiedInterface(WhooshSearchInterface):
         a diversified/non-diversified set of results cannot be cached.
         """
         query.top = top
-        response = self._engine.search(query)
+        
+        response = self._get_engine().search(query)
         
         # Diversify the results.
         response = self.diversify_results(response, query.topic.id, to_rank=self._to_rank, lam=self._lam)
@@ -1,4 +1,5 @@
 import os
+import threading
 from whoosh.index import open_dir
 from simiir.search_interfaces import Document
 from ifind.search.cache import RedisConn
@@ -23,36 +24,55 @@ class WhooshSearchInterface(BaseSearchInterface):
         self.__index = open_dir(whoosh_index_dir)
         self.__reader = self.__index.reader()
         self.__redis_conn = None
+        self._lock = threading.Lock()  # The index reader is not thread-safe; see engines.concurrent_engine.
         
-        if host is None:
-            self._engine = Whooshtrec(whoosh_index_dir=whoosh_index_dir, model=model, implicit_or=implicit_or)
-        else:
-            self._engine = Whooshtrec(whoosh_index_dir=whoosh_index_dir, model=model, implicit_or=implicit_or, cache='engine', host=host, port=port)
-        
-        # Update (2017-05-02) for snippet fragment tweaking.
-        # SIGIR Study (2017) uses frag_type==1 (2 doesn't give sensible results), surround==40, snippet_sizes==2,0,1,4
-        self._engine.snippet_size = frag_size
-        self._engine.set_fragmenter(frag_type=frag_type, surround=frag_surround)
-        
-        if pval:
-            self._engine.set_model(model, pval)
+        self.__engine_arguments = (whoosh_index_dir, model, implicit_or, pval, frag_type, frag_size, frag_surround, host, port)
+        self.__engines = threading.local()  # The engines are not thread-safe; each thread searches with its own.
     
     def issue_query(self, query, top=100):
         """
         Allows one to issue a query to the underlying search engine. Takes an ifind Query object.
         """
         query.top = top
-        response = self._engine.search(query)
+        response = self._get_engine().search(query)
         
         self._last_query = query
         self._last_response = response
         return response
     
+    def _get_engine(self):
+        """
+        Returns the Whooshtrec engine of the calling thread, creating it on first use. Each thread has its own engine (and so
+        its own searcher), so concurrent simulations sharing the interface (see engines.concurrent_engine) search at once.
+        """
+        engine = getattr(self.__engines, 'engine', None)
+        
+        if engine is None:
+            whoosh_index_dir, model, implicit_or, pval, frag_type, frag_size, frag_surround, host, port = self.__engine_arguments
+            
+            if host is None:
+                engine = Whooshtrec(whoosh_index_dir=whoosh_index_dir, model=model, implicit_or=implicit_or)
+            else:
+                engine = Whooshtrec(whoosh_index_dir=whoosh_index_dir, model=model, implicit_or=implicit_or, cache='engine', host=host, port=port)
+            
+            # Update (2017-05-02) for snippet fragment tweaking.
+            # SIGIR Study (2017) uses frag_type==1 (2 doesn't give sensible results), surround==40, snippet_sizes==2,0,1,4
+            engine.snippet_size = frag_size
+            engine.set_fragmenter(frag_type=frag_type, surround=frag_surround)
+            
+            if pval:
+                engine.set_model(model, pval)
+            
+            self.__engines.engine = engine
+        
+        return engine
+    
     def get_document(self, document_id):
         """
         Retrieves a Document object for the given document specified by parameter document_id.
         """
-        fields = self.__reader.stored_fields(int(document_id))
+        with self._lock:
+            fields = self.__reader.stored_fields(int(document_id))
         
         title = fields['title']
         content = fields['content']
@@ -0,0 +1,301 @@
+import json
+import Queue
+import logging
+import threading
+import SocketServer
+from collections import OrderedDict
+
+log = logging.getLogger('search_service')
+
+#
+# A local search service, so the simulators on a node can share warm indexes rather than each opening its own.
+# The service hosts one or more Whoosh indexes (each behind a WhooshSearchInterface, opened once), and listens on a
+# localhost TCP port; simulations use the ServiceSearchInterface (see search_interfaces.service_interface) to query it.
+#
+# Each connection is served by its own thread, but requests for an index are handed to a single worker thread per index,
+# which takes them in batches: identical queries (and documents) within a batch are only looked up once. Responses are
+# held in a cache shared by all indexes and clients (least recently used entries are evicted), already serialised.
+#
+# The protocol is line-based: each request is a JSON object on a line of its own, answered with a JSON object on a line.
+# Requests have an op (search, document or stats); responses have ok (true or false), and result or error.
+# Response and Document objects are sent as their attributes (those of simple types), and rebuilt by the client.
+#
+
+DEFAULT_PORT = 8421
+
+SIMPLE_TYPES = (type(None), bool, int, long, float, basestring)
+
+
+class SearchServiceError(Exception):
+    """
+    Raised when the search service cannot answer a request (e.g. an unknown index, or the search failed).
+    """
+    pass
+
+
+def get_attributes(obj):
+    """
+    Returns a dictionary of the attributes of the given object that can be represented in JSON (values of simple types,
+    or lists of them).
+    """
+    attributes = {}
+
+    for name, value in vars(obj).items():
+        if isinstance(value, SIMPLE_TYPES):
+            attributes[name] = value
+        elif isinstance(value, (list, tuple)) and all([isinstance(item, SIMPLE_TYPES) for item in value]):
+            attributes[name] = list(value)
+
+    return attributes
+
+
+def set_attributes(cls, attributes):
+    """
+    Returns a new instance of cls with the given attributes, without calling its constructor.
+    """
+    obj = cls.__new__(cls)
+    obj.__dict__.update(attributes)
+    return obj
+
+
+def encode_response(response):
+    """
+    Returns a JSON-serialisable representation of an ifind Response object, and its results.
+    """
+    attributes = get_attributes(response)
+    attributes['results'] = [get_attributes(result) for result in response.results]
+    return attributes
+
+
+def decode_response(attributes):
+    """
+    Rebuilds an ifind Response object (with its results) from the representation returned by encode_response().
+    """
+    from ifind.search.response import Response, Result
+
+    response = set_attributes(Response, attributes)
+    response.results = [set_attributes(Result, result) for result in attributes['results']]
+    return response
+
+
+def decode_document(attributes):
+    """
+    Rebuilds a Document object from its attributes (see get_attributes()).
+    """
+    from simiir.search_interfaces import Document
+    return set_attributes(Document, attributes)
+
+
+class ResponseCache(object):
+    """
+    A thread-safe cache of serialised responses, holding up to size entries; least recently used entries are evicted first.
+    """
+    def __init__(self, size=10000):
+        self.__size = size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, count=True):
+        """
+        Returns the entry for the given key, or None if there is none. If count is False, the lookup is not counted as a hit or miss.
+        """
+        with self.__lock:
+            value = self.__entries.pop(key, None)
+
+            if value is None:
+                self.misses = self.misses + (1 if count else 0)
+                return None
+
+            self.hits = self.hits + (1 if count else 0)
+            self.__entries[key] = value  # Reinserted, so it is now the most recently used.
+            return value
+
+    def put(self, key, value):
+        """
+        Adds an entry, evicting the least recently used entry if the cache is full.
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__entries[key] = value
+
+            if len(self.__entries) > self.__size:
+                self.__entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class PendingRequest(object):
+    """
+    A request waiting to be answered by an IndexWorker. wait() returns the serialised result, or raises a SearchServiceError.
+    """
+    def __init__(self, key, request):
+        self.key = key
+        self.request = request
+        self.result = None
+        self.error = None
+        self.__event = threading.Event()
+
+    def answer(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.__event.set()
+
+    def wait(self):
+        self.__event.wait()
+
+        if self.error is not None:
+            raise SearchServiceError(self.error)
+
+        return self.result
+
+
+class IndexWorker(threading.Thread):
+    """
+    Answers the requests for a single index, in batches of up to batch_size, from a warm search interface.
+    The search interface is only ever used by this thread.
+    """
+    def __init__(self, name, search_interface, cache, batch_size=64):
+        super(IndexWorker, self).__init__(name='IndexWorker-{0}'.format(name))
+        self.daemon = True
+        self.index_name = name
+        self.batches = 0
+        self.requests = 0
+        self.__search_interface = search_interface
+        self.__cache = cache
+        self.__batch_size = batch_size
+        self.__queue = Queue.Queue()
+
+    def submit(self, key, request):
+        """
+        Queues a request (with the given cache key); returns the PendingRequest to wait on.
+        """
+        pending = PendingRequest(key, request)
+        self.__queue.put(pending)
+        return pending
+
+    def run(self):
+        while True:
+            batch = [self.__queue.get()]
+
+            while len(batch) < self.__batch_size:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except Queue.Empty:
+                    break
+
+            self.batches = self.batches + 1
+            self.requests = self.requests + len(batch)
+            self.__process(batch)
+
+    def __process(self, batch):
+        """
+        Answers each request of the batch; requests with the same key are answered with the same lookup.
+        """
+        grouped = OrderedDict()
+
+        for pending in batch:
+            grouped.setdefault(pending.key, []).append(pending)
+
+        for key, requests in grouped.items():
+            result = self.__cache.get(key, count=False)  # May have been cached by an earlier batch since the request was queued.
+            error = None
+
+            if result is None:
+                try:
+                    result = self.__look_up(requests[0].request)
+                    self.__cache.put(key, result)
+                except Exception, e:
+                    log.exception("Request {0} failed".format(requests[0].request))
+                    error = "{0}: {1}".format(type(e).__name__, e)
+
+            for pending in requests:
+                pending.answer(result=result, error=error)
+
+    def __look_up(self, request):
+        """
+        Issues the query (or retrieves the document) of the given request; returns the serialised result.
+        """
+        if request['op'] == 'document':
+            return json.dumps(get_attributes(self.__search_interface.get_document(request['document_id'])))
+
+        from ifind.search.query import Query
+
+        query = Query(request['terms'])
+        query.skip = request.get('skip')
+        response = self.__search_interface.issue_query(query, top=request.get('top', 100))
+        return json.dumps(encode_response(response))
+
+
+class SearchRequestHandler(SocketServer.StreamRequestHandler):
+    """
+    Serves the requests made over a single connection, in turn, until the client disconnects.
+    """
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+
+            if not line:
+                break
+
+            try:
+                result = self.server.answer(json.loads(line))
+                self.wfile.write('{{"ok": true, "result": {0}}}\n'.format(result))
+            except (SearchServiceError, ValueError, KeyError), e:
+                self.wfile.write(json.dumps({'ok': False, 'error': str(e)}) + '\n')
+
+            self.wfile.flush()
+
+
+class SearchService(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """
+    The search service; indexes is a dictionary of index name -> search interface to host.
+    Only listens on localhost. Call serve_forever() to start answering requests.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, indexes, port=DEFAULT_PORT, cache_size=10000, batch_size=64):
+        SocketServer.TCPServer.__init__(self, ('127.0.0.1', port), SearchRequestHandler)
+        self.cache = ResponseCache(cache_size)
+        self.workers = {}
+
+        for name, search_interface in indexes.items():
+            self.workers[name] = IndexWorker(name, search_interface, self.cache, batch_size=batch_size)
+            self.workers[name].start()
+
+    def answer(self, request):
+        """
+        Returns the serialised result of the given request (a dictionary).
+        """
+        if request['op'] == 'stats':
+            return json.dumps(self.get_stats())
+
+        worker = self.workers.get(request['index'])
+
+        if worker is None:
+            raise SearchServiceError("Unknown index '{0}'".format(request['index']))
+
+        if request['op'] == 'search':
+            key = ('search', worker.index_name, request['terms'], request.get('skip'), request.get('top', 100))
+        elif request['op'] == 'document':
+            key = ('document', worker.index_name, request['document_id'])
+        else:
+            raise SearchServiceError("Unknown op '{0}'".format(request['op']))
+
+        result = self.cache.get(key)
+
+        if result is None:
+            result = worker.submit(key, request).wait()
+
+        return result
+
+    def get_stats(self):
+        """
+        Returns a dictionary of statistics: for the cache, and the requests and batches handled for each index.
+        """
+        return {'cache': {'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses},
+                'indexes': dict([(name, {'requests': worker.requests, 'batches': worker.batches})
+                                 for name, worker in self.workers.items()])}
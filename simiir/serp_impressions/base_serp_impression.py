@@ -115,9 +115,13 @@ class BaseSERPImpression(object):
         # This probably should be refactored in the future, so that the objects can be directly compared, not the docids.
         previously_examined_snippets = [snippet.doc_id for snippet in self._search_context.get_all_examined_snippets()]
         
+        # The judgements of the whole viewport are looked up together (in one round trip, for a Redis-based data handler).
+        patch_judgements = self._qrel_data_handler.get_values_fallback(self._search_context.topic.id,
+                                                                       [result.docid for result in results_list[:goto_depth]])
+        
         for i in range(0, goto_depth):
             snippet = Document(results_list[i].whooshid, results_list[i].title, results_list[i].summary, results_list[i].docid)
-            judgement = self._qrel_data_handler.get_value_fallback(self._search_context.topic.id, results_list[i].docid)
+            judgement = patch_judgements[i]
             
             if judgement is None:  # Should not happen with a fallback topic; sanity check
                 judgement = 0
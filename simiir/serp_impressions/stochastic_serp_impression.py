@@ -1,5 +1,6 @@
 from random import Random
 from simiir.serp_impressions.base_serp_impression import BaseSERPImpression
+from simiir.utils.random_streams import CommonRandom
 
 class StochasticSERPImpression(BaseSERPImpression):
     """
@@ -7,6 +8,7 @@ class StochasticSERPImpression(BaseSERPImpression):
     Works out the judged precision. If the precision is less than a certain threshold,
     we roll the dice (bad_abandon_probability) -- and if it is above, we also roll the
     dice (good_abandon_probability).
+    If common_random_numbers is True, the dice are rolled from a CommonRandom (see utils.random_streams).
     """
     def __init__(self,
                  search_context,
@@ -16,7 +18,8 @@ class StochasticSERPImpression(BaseSERPImpression):
                  good_abandon_probability=0.5,
                  bad_abandon_probability=0.5,
                  base_seed=0,
-                 viewport_precision_threshold=0.1):
+                 viewport_precision_threshold=0.1,
+                 common_random_numbers=False):
         super(StochasticSERPImpression, self).__init__(search_context=search_context,
                                                        qrel_file=qrel_file,
                                                        host=host,
@@ -28,6 +31,9 @@ class StochasticSERPImpression(BaseSERPImpression):
         
         self.__random = Random()
         self.__random.seed(base_seed + 0)
+        
+        if common_random_numbers:
+            self.__random = CommonRandom(base_seed, 'serp_impression', search_context)
     
     
     def is_serp_attractive(self):
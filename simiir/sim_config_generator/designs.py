@@ -0,0 +1,168 @@
+import math
+import random
+
+#
+# Space-filling designs for sim_config_generator. Rather than the full grid, a design places a chosen number of points in
+# the unit hypercube [0, 1)^d - one dimension per attribute given as a range - so that the points cover the space evenly.
+# Each point becomes a user configuration; see apply_design() in sim_config_generator.py for how points are mapped to values.
+#
+#   lhs        - a Latin hypercube: each attribute's range is split into n equal strata, and each stratum is used exactly once.
+#   sobol      - the first n points of a (randomly shifted) Sobol sequence; best with n a power of two. Up to 16 attributes.
+#   orthogonal - a randomised Bose orthogonal array, OA(p^2, p + 1, p, 2): each attribute takes p levels, and every pair of
+#                levels of every pair of attributes appears equally often. p is the smallest prime for which p + 1 >= d and
+#                p^2 >= n; so p^2 points are returned, which may be more than n.
+#
+
+# Direction numbers for the Sobol sequence (Joe and Kuo, 2008): for each dimension after the first, the degree s of its
+# primitive polynomial, the polynomial's coefficients a, and the initial direction numbers m.
+SOBOL_DIRECTIONS = [(1, 0, [1]),
+                    (2, 1, [1, 3]),
+                    (3, 1, [1, 3, 1]),
+                    (3, 2, [1, 1, 1]),
+                    (4, 1, [1, 1, 3, 3]),
+                    (4, 4, [1, 3, 5, 13]),
+                    (5, 2, [1, 1, 5, 5, 17]),
+                    (5, 4, [1, 1, 5, 5, 5]),
+                    (5, 7, [1, 1, 7, 11, 19]),
+                    (5, 11, [1, 1, 5, 1, 1]),
+                    (5, 13, [1, 1, 1, 3, 11]),
+                    (5, 14, [1, 3, 5, 5, 31]),
+                    (6, 1, [1, 3, 3, 9, 7, 49]),
+                    (6, 13, [1, 1, 1, 15, 21, 21]),
+                    (6, 16, [1, 3, 1, 13, 27, 49])]
+
+SOBOL_BITS = 32
+
+
+class DesignError(Exception):
+    """
+    Raised when a design cannot be generated (e.g. an unknown design, or too many dimensions).
+    """
+    pass
+
+
+def latin_hypercube(size, dimensions, seed=0):
+    """
+    Returns a list of size points (each a list of dimensions values in [0, 1)) forming a Latin hypercube; each point is
+    placed at random within its stratum.
+    """
+    generator = random.Random(seed)
+    columns = []
+
+    for dimension in range(dimensions):
+        strata = range(size)
+        generator.shuffle(strata)
+        columns.append([(stratum + generator.random()) / size for stratum in strata])
+
+    return [list(point) for point in zip(*columns)]
+
+
+def get_sobol_directions(dimensions):
+    """
+    Returns a list of the SOBOL_BITS direction numbers (as integers) for each of the given number of dimensions.
+    """
+    if dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise DesignError("Sobol designs support up to {0} attributes.".format(len(SOBOL_DIRECTIONS) + 1))
+
+    directions = [[1 << (SOBOL_BITS - 1 - bit) for bit in range(SOBOL_BITS)]]  # The first dimension is the van der Corput sequence.
+
+    for degree, coefficients, initial in SOBOL_DIRECTIONS[:dimensions - 1]:
+        numbers = [initial[bit] << (SOBOL_BITS - 1 - bit) for bit in range(degree)]
+
+        for bit in range(degree, SOBOL_BITS):
+            number = numbers[bit - degree] ^ (numbers[bit - degree] >> degree)
+
+            for k in range(1, degree):
+                if (coefficients >> (degree - 1 - k)) & 1:
+                    number = number ^ numbers[bit - k]
+
+            numbers.append(number)
+
+        directions.append(numbers)
+
+    return directions
+
+
+def sobol(size, dimensions, seed=0):
+    """
+    Returns a list of the first size points of the Sobol sequence in the given number of dimensions (in Gray code order).
+    Each dimension is shifted by a random digital shift (from seed), which keeps the sequence's stratification.
+    """
+    directions = get_sobol_directions(dimensions)
+    generator = random.Random(seed)
+    shifts = [generator.getrandbits(SOBOL_BITS) for dimension in range(dimensions)]
+    scale = 1.0 / (1 << SOBOL_BITS)
+    points = []
+
+    for index in range(size):
+        gray_code = index ^ (index >> 1)
+        point = []
+
+        for dimension in range(dimensions):
+            value = shifts[dimension]
+            bit = 0
+
+            while gray_code >> bit:
+                if (gray_code >> bit) & 1:
+                    value = value ^ directions[dimension][bit]
+
+                bit = bit + 1
+
+            point.append(value * scale)
+
+        points.append(point)
+
+    return points
+
+
+def is_prime(number):
+    """
+    Returns True if the given number is prime.
+    """
+    return number > 1 and all([number % divisor for divisor in range(2, int(math.sqrt(number)) + 1)])
+
+
+def orthogonal_array(size, dimensions, seed=0):
+    """
+    Returns the points of a randomised Bose orthogonal array with at least size points (see above). The levels of each
+    attribute are permuted at random (from seed), and each point is placed at the centre of its cell.
+    """
+    levels = 2
+
+    while not is_prime(levels) or levels + 1 < dimensions or levels * levels < size:
+        levels = levels + 1
+
+    generator = random.Random(seed)
+    permutations = []
+
+    for dimension in range(dimensions):
+        permutation = range(levels)
+        generator.shuffle(permutation)
+        permutations.append(permutation)
+
+    points = []
+
+    for i in range(levels):
+        for j in range(levels):
+            row = [i, j] + [(i + k * j) % levels for k in range(1, levels)]
+            points.append([(permutations[dimension][row[dimension]] + 0.5) / levels for dimension in range(dimensions)])
+
+    return points
+
+
+DESIGNS = {'lhs': latin_hypercube,
+           'sobol': sobol,
+           'orthogonal': orthogonal_array}
+
+
+def get_design(design, size, dimensions, seed=0):
+    """
+    Returns the points of the named design (one of DESIGNS) in the given number of dimensions.
+    """
+    if design not in DESIGNS:
+        raise DesignError("Unknown design '{0}'; use one of {1}.".format(design, ', '.join(sorted(DESIGNS.keys()))))
+
+    if size < 1:
+        raise DesignError("The design size must be at least 1.")
+
+    return DESIGNS[design](size, dimensions, seed)
@@ -1,10 +1,13 @@
 import os
 import re
+import math
 import sys
+import copy
 import itertools
 from lxml import etree
 from xml.etree import cElementTree
 from collections import defaultdict
+from designs import get_design
 
 simulation_base_dir = ""
 
@@ -93,7 +96,8 @@ def read_file_to_string(filename):
 
 def get_permutations(dict_repr):
     '''
-    Contains a list of tuples, with each tuple containing dictionaries representing a particular combination.
+    Returns an iterator of tuples, with each tuple containing dictionaries representing a particular combination.
+    Permutations are generated lazily, in a fixed order (the last component varies fastest).
     Note that topics are ignored; these are stored within the simulation configuration file.
     '''
     query_generators = dict_repr['simulation']['user']['queryGenerator']
@@ -103,12 +107,83 @@ def get_permutations(dict_repr):
     loggers =  dict_repr['simulation']['user']['logger']
     search_contexts = dict_repr['simulation']['user']['searchContext']
     
-    return list(itertools.product(query_generators,
-                                  snippet_classifiers,
-                                  document_classifiers,
-                                  decision_makers,
-                                  loggers,
-                                  search_contexts))
+    return itertools.product(query_generators,
+                             snippet_classifiers,
+                             document_classifiers,
+                             decision_makers,
+                             loggers,
+                             search_contexts)
+
+def get_attribute_list(component):
+    """
+    Returns a list of the attribute dictionaries of the given component (which may hold a single dictionary, or none).
+    """
+    attributes = component.get('attribute', [])
+    
+    if type(attributes) == dict:
+        attributes = [attributes]
+    
+    return attributes
+
+def is_range(attribute_dict):
+    """
+    Returns True if the given attribute is specified as a range (with min and max), rather than a value.
+    """
+    return '@min' in attribute_dict and '@max' in attribute_dict
+
+def get_range_value(attribute_dict, unit_value):
+    """
+    Maps a value in [0, 1) to a value in the attribute's range, returned as a string. Integer attributes take each value in
+    [min, max] with equal probability; others are scaled linearly (or logarithmically, if scale="log").
+    """
+    if attribute_dict['@type'] in ['int', 'integer']:
+        minimum, maximum = int(attribute_dict['@min']), int(attribute_dict['@max'])
+        return str(min(maximum, minimum + int(math.floor(unit_value * (maximum - minimum + 1)))))
+    
+    minimum, maximum = float(attribute_dict['@min']), float(attribute_dict['@max'])
+    
+    if attribute_dict.get('@scale') == 'log':
+        return '{0:.6g}'.format(math.exp(math.log(minimum) + unit_value * (math.log(maximum) - math.log(minimum))))
+    
+    return '{0:.6g}'.format(minimum + unit_value * (maximum - minimum))
+
+def apply_design(dict_repr, permutations):
+    '''
+    Returns an iterator of the permutations, with the attributes given as ranges (with min and max, rather than a value)
+    filled in by the design specified by the user element - one tuple per design point. Set design to lhs, sobol or
+    orthogonal (see designs.py), designSize to the number of points, and optionally designSeed (default 0). The index of
+    each point is available to the user's baseID as [[design]]. Permutations without ranged attributes are returned as-is.
+    '''
+    user_dict = dict_repr['simulation']['user']
+    
+    for iteration in permutations:
+        ranged = [(component_index, attribute_index)
+                  for component_index, component in enumerate(iteration)
+                  for attribute_index, attribute in enumerate(get_attribute_list(component)) if is_range(attribute)]
+        
+        if not ranged:
+            yield iteration
+            continue
+        
+        if '@design' not in user_dict:
+            raise ValueError("Attributes are given as ranges, but the user element specifies no design.")
+        
+        points = get_design(user_dict['@design'],
+                            int(user_dict.get('@designSize', 100)),
+                            len(ranged),
+                            int(user_dict.get('@designSeed', 0)))
+        
+        for point_index, point in enumerate(points):
+            point_iteration = copy.deepcopy(iteration)
+            
+            for (component_index, attribute_index), unit_value in zip(ranged, point):
+                attribute = get_attribute_list(point_iteration[component_index])[attribute_index]
+                attribute['@value'] = get_range_value(attribute, unit_value)
+            
+            for component in point_iteration:
+                component['design'] = str(point_index)
+            
+            yield point_iteration
 
 def create_attribute_markup(attribute_dict):
     """
@@ -228,6 +303,10 @@ def generate_markup(dict_repr, permutations, gen_filename):
         for tag in tags:
             tag_name = tag[0]
             
+            if tag_name == 'design':
+                user_base_id = user_base_id.replace("[[design]]", iteration[0].get('design', ''))
+                continue
+            
             if tag_name.startswith('textClassifiers.'):
                 tag_name = tag_name[16:]
             
@@ -332,6 +411,8 @@ def usage(filename):
     print "Usage: python {0} <xml_source>".format(filename)
     print "Where:"
     print "  <xml_source>: the source XML file from which to generate simulation configuration files. See example.xml."
+    print "To cover attribute ranges (min and max) with a chosen number of users, rather than the full grid, set design on the user element."
+    print "To tune parameters without running every generated user on every topic, see run_adaptive_search.py."
 
 if __name__ == '__main__':
     if len(sys.argv) > 1 and len(sys.argv) < 3:
@@ -339,7 +420,7 @@ if __name__ == '__main__':
         dict_repr = build_dictionary(sys.argv[1])
         tidy_dictionary(dict_repr)
         
-        permutations = get_permutations(dict_repr)
+        permutations = apply_design(dict_repr, get_permutations(dict_repr))
         generate_markup(dict_repr, permutations, sys.argv[1])
         
         sys.exit(0)
@@ -1,11 +1,18 @@
 import os
+import time
+import logging
 from loggers import Actions
 
+log = logging.getLogger('sim_user.sim_user')
+
+DECIDE = 'DECIDE'  # A pseudo-action in the transition table; the next action is chosen by the decision maker.
+
 class SimulatedUser(object):
     """
     The simulated user. Stores references to all the required components, and contains the logical workflow for the simulation.
     """
     def __init__(self, configuration):
+        self.__configuration = configuration
         self.__search_context = configuration.user.search_context
         self.__decision_maker = configuration.user.decision_maker
         self.__output_controller = configuration.output
@@ -14,10 +21,40 @@ class SimulatedUser(object):
         self.__snippet_classifier = configuration.user.snippet_classifier
         self.__query_generator = configuration.user.query_generator
         self.__serp_impression = configuration.user.serp_impression
+        self.__component_timer = self.__output_controller.get_component_timer()
+        
+        if self.__component_timer is not None:
+            self.__component_timer.instrument(configuration)  # Only when timing is enabled; components are otherwise untouched.
         
         self.__action_value = None  # Response from the previous action method - True or False? (did the user do or not do what they thought?)
+        
+        # Maps each action to the method which executes it.
+        self.__action_mapping = {
+            Actions.QUERY  : self.__do_query,
+            Actions.SERP   : self.__do_serp,
+            Actions.SNIPPET: self.__do_snippet,
+            Actions.DOC    : self.__do_assess_document,
+            Actions.MARK   : self.__do_mark_document
+        }
+        
+        # The workflow, compiled into a transition table. See decide_action() for a description.
+        # Keys are (last action, outcome of the last action); values are the next action to perform.
+        self.__transitions = {
+            (None, False)           : Actions.QUERY,  # Start of the search session; begin by querying.
+            (None, True)            : Actions.QUERY,
+            (Actions.QUERY, False)  : Actions.SERP,
+            (Actions.QUERY, True)   : Actions.SERP,
+            (Actions.SERP, False)   : Actions.QUERY,
+            (Actions.SERP, True)    : Actions.SNIPPET,
+            (Actions.SNIPPET, False): DECIDE,
+            (Actions.SNIPPET, True) : Actions.DOC,
+            (Actions.DOC, False)    : DECIDE,
+            (Actions.DOC, True)     : Actions.MARK,
+            (Actions.MARK, False)   : DECIDE,  # Marking always succeeds; the user then decides what to do next.
+            (Actions.MARK, True)    : DECIDE,
+        }
     
-    def decide_action(self):
+    def decide_action(self, action=None):
         """
         This method is central to the whole simulation - it decides which action the user should perform next.
         The workflow implemented below is as follows. Steps with asterisks are DECISION POINTS.
@@ -35,74 +72,123 @@ class SimulatedUser(object):
         (8)  Mark the document
         (9*) Decide whether to goto (1) or (4)
         
+        The workflow is held in a transition table, compiled when the user is instantiated.
+        If action is given, it is performed instead of the action the workflow would choose (e.g. to explore an alternative
+        decision in a forked session; see fork()).
         This method returns None.
         """
-        def after_query():
-            self.__do_action(Actions.SERP)
+        if action is None:
+            action = self.__transitions[(self.__search_context.get_last_action(), bool(self.__action_value))]
         
-        def after_serp():
-            if self.__action_value:
-                self.__do_action(Actions.SNIPPET)
-            else:
-                self.__do_action(Actions.QUERY)
+        if action == DECIDE:
+            action = self.__do_decide()
         
-        def after_snippet():
-            if self.__action_value:
-                self.__do_action(Actions.DOC)
-            else:
-                self.__do_action(self.__do_decide())
+        self.__do_action(action)
+    
+    def is_finished(self):
+        """
+        Returns True if the logger reports that the simulation has finished.
+        """
+        return self.__logger.is_finished()
+    
+    def run_until_decision(self):
+        """
+        Performs actions until the next action is to be chosen by the decision maker (a decision point), or the simulation
+        finishes. Returns True at a decision point, and False once finished. At a decision point, the session can be forked,
+        and each fork given a different action with decide_action(); call decide_action() to move past the decision point.
+        """
+        while not self.__logger.is_finished():
+            if self.__transitions[(self.__search_context.get_last_action(), bool(self.__action_value))] == DECIDE:
+                return True
+            
+            self.decide_action()
         
-        def after_assess_document():
-            if self.__action_value:
-                self.__do_action(Actions.MARK)
-            else:
-                self.__do_action(self.__do_decide())
-        
-        def after_mark():
-            """
-            This condition will always be True; we won't get here unless the document has been successfully marked!
-            After the document has been marked, the user must decide whether (s)he wants to look at the subsequent snippet, or issue another query.
-            """
-            self.__do_action(self.__do_decide())
-        
-        def after_none():
-            """
-            If no action has been supplied from before, then we must be at the start of the search session.
-            Therefore, we begin by querying.
-            """
-            self.__do_action(Actions.QUERY)
-        
-        last_to_next_action_mapping = {
-            Actions.QUERY  : after_query,
-            Actions.SERP   : after_serp,
-            Actions.SNIPPET: after_snippet,
-            Actions.DOC    : after_assess_document,
-            Actions.MARK   : after_mark,
-            None           : after_none
-        }
+        return False
+    
+    def fork(self, branch=None, seed=None):
+        """
+        Returns a new SimulatedUser continuing from this user's current state, which then runs independently - so several
+        continuations can be explored from a shared prefix without repeating it. Read-only components (e.g. the search
+        interface and QRELS) are shared rather than copied; see utils.session_forks. If branch is given, the fork's base ID
+        is suffixed with -b<branch>; if seed is given, the fork draws different random numbers from this user.
+        The fork's configuration (e.g. to save its output) is returned by its get_configuration().
+        """
+        from simiir.utils.session_forks import fork_configuration
         
-        last_action = self.__search_context.get_last_action()
-        last_to_next_action_mapping[last_action]()
+        forked = SimulatedUser(fork_configuration(self.__configuration, branch=branch, seed=seed))
+        forked.__action_value = self.__action_value
+        return forked
+    
+    def get_configuration(self):
+        """
+        Returns the simulation configuration (components) the user was created with.
+        """
+        return self.__configuration
+    
+    def run_until_finished(self, watchdog=None):
+        """
+        Runs the simulation until the logger reports that it has finished - equivalent to calling decide_action() until
+        logger.is_finished() returns True, but with the loop driven internally, without per-step method dispatch.
+        Returns a tuple of the number of steps (actions) performed, and the number of steps performed per second.
+        If a watchdog (see utils.watchdog) is given, its limits are enforced; a SimulationLimitError is raised if one is exceeded.
+        """
+        if watchdog is not None:
+            watchdog.start()
+            
+            try:
+                return self.__run_loop(watchdog)
+            finally:
+                watchdog.stop()
+        
+        return self.__run_loop(None)
+    
+    def __run_loop(self, watchdog):
+        """
+        The simulation loop of run_until_finished().
+        """
+        is_finished = self.__logger.is_finished
+        get_last_action = self.__search_context.get_last_action
+        set_action = self.__search_context.set_action
+        transitions = self.__transitions
+        action_mapping = self.__action_mapping
+        do_decide = self.__do_decide
+        
+        steps = 0
+        start_time = time.time()
+        
+        while not is_finished():
+            if watchdog is not None:
+                watchdog.check(steps)
+            
+            action = transitions[(get_last_action(), bool(self.__action_value))]
+            
+            if action == DECIDE:
+                action = do_decide()
+            
+            set_action(action)
+            self.__action_value = action_mapping[action]()
+            steps = steps + 1
+        
+        elapsed_time = time.time() - start_time
+        steps_per_second = steps / elapsed_time if elapsed_time > 0 else 0.0
+        
+        if self.__component_timer is not None:
+            self.__component_timer.elapsed_time = elapsed_time
+        
+        log.info("Simulation completed in {0} steps ({1:.1f} steps/sec)".format(steps, steps_per_second))
+        return steps, steps_per_second
     
     def __do_action(self, action):
         """
         Selects the appropriate method to call to execute the requested action, then logs the interaction in the log and search context.
         This method returns None.
         """
-        action_mapping = {
-            Actions.QUERY  : self.__do_query,
-            Actions.SERP   : self.__do_serp,
-            Actions.SNIPPET: self.__do_snippet,
-            Actions.DOC    : self.__do_assess_document,
-            Actions.MARK   : self.__do_mark_document
-        }
-        
         # Update the search context to reflect the most recent action.
         # Logging takes place within each method called (e.g. __do_query()) to reflect different values being passed.
         self.__search_context.set_action(action)
         
         # Now call the appropriate method to perform the action.
-        self.__action_value = action_mapping[action]()
+        self.__action_value = self.__action_mapping[action]()
     
     def __do_query(self):
         """
@@ -1,5 +1,4 @@
 from loggers import Actions
-from lxml.html.clean import Cleaner
 from utils import difference_methods
 from stopping_decision_makers.base_decision_maker import BaseDecisionMaker
 
@@ -87,6 +86,7 @@ class DifferenceDecisionMaker(BaseDecisionMaker):
         if string_repr == "":
             return string_repr
         
+        from lxml.html.clean import Cleaner  # Imported on first use; only this decision maker requires lxml's HTML cleaner.
         cleaner = Cleaner(allow_tags=[''], remove_unknown_tags=False)
         cleaned_text = cleaner.clean_html(string_repr)
         
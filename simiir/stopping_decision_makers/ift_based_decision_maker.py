@@ -31,16 +31,10 @@ class IftBasedDecisionMaker(BaseDecisionMaker):
         if self._search_context.get_current_serp_position() <  self.__rank_threshold:
             return Actions.SNIPPET
         
-        dis_cum_gain = 0.0
-        pos = 0.0
-        examined_snippets = self._search_context.get_examined_snippets()
-        
-        for snippet in examined_snippets:
-            pos = pos + 1.0
-            j = float(snippet.judgment)
-            if j <0:
-                j = 0
-            dis_cum_gain += (j)*(1.0/(pos**self.__discount))
+        # The discounted cumulative gain over the snippets examined; unjudged snippets count as 0.
+        snippets = self._search_context.get_query_statistics().snippets
+        dis_cum_gain = snippets.get_discounted_gain(self.__discount)
+        pos = float(snippets.get_count())
 
         #The average rate of gain, ie. gain per second
         total_time = (float(self.__query_time) + (float(self.__doc_time)*pos))
@@ -83,20 +77,14 @@ class Ift2BasedDecisionMaker(BaseDecisionMaker):
             return Actions.SNIPPET
 
 
-        dis_cum_gain = 0.0
-        pos = 0.0
-        examined_snippets = self._search_context.get_examined_snippets()
-        examined_docs = self._search_context.get_examined_documents()
-        for doc in examined_docs:
-            pos = pos + 1.0
-            j = float(doc.judgment)
-            if j <0:
-                j = 0
-            dis_cum_gain += (j)*(1.0/(pos**self.__discount))
+        # The discounted cumulative gain over the documents examined; unjudged documents count as 0.
+        statistics = self._search_context.get_query_statistics()
+        dis_cum_gain = statistics.documents.get_discounted_gain(self.__discount)
+        pos = float(statistics.documents.get_count())
 
         #The average rate of gain, ie. gain per second
-        ns = float(len(examined_snippets))
-        nd = float(len(examined_docs))
+        ns = float(statistics.snippets.get_count())
+        nd = pos
 
         total_time = self.__query_time + (nd * self.__doc_time) +(ns * self.__snip_time )
         avg_dis_cum_gain = dis_cum_gain / total_time
@@ -1,15 +1,17 @@
 from random import Random
 from loggers import Actions
 from stopping_decision_makers.base_decision_maker import BaseDecisionMaker
+from simiir.utils.random_streams import CommonRandom
 
 class INSTDecisionMaker(BaseDecisionMaker):
     """
     A decision maker implementing the INST metric.
     Equations from Moffat et al. (ADCS 2015)
     """
-    def __init__(self, search_context, logger, t=5, base_seed=0):
+    def __init__(self, search_context, logger, t=5, base_seed=0, common_random_numbers=False):
         """
         Instantiates the decision maker, with a T (expected documents to find) value of 5.
+        If common_random_numbers is True, the dice are rolled from a CommonRandom (see utils.random_streams).
         """
         super(INSTDecisionMaker, self).__init__(search_context, logger)
         self.__t = t
@@ -17,22 +19,25 @@ class INSTDecisionMaker(BaseDecisionMaker):
         self.__random = Random()
         self.__random.seed(base_seed + 1024)
         
+        if common_random_numbers:
+            self.__random = CommonRandom(base_seed, 'decision_maker', search_context)
+        
     def decide(self):
         """
         Implements INST. Given the positional weightings (W), we can, with a roll of the dice, decide whether the searcher
         should continue examining the SERP, or stop and abandon it.
         """
-        examined_snippets = self._search_context.get_examined_snippets()
-        rank = len(examined_snippets) # Assumption here that the rank is == to the number of snippets examined.
+        snippets = self._search_context.get_query_statistics().snippets
+        rank = snippets.get_count() # Assumption here that the rank is == to the number of snippets examined.
         
-        r_i = self.__calculate_R_i(rank, examined_snippets)
+        r_i = snippets.get_gain()  # Unjudged content is assumed not relevant (as per TREC).
         t_i = self.__calculate_T_i(r_i)
         w_i = self.__calculate_W(rank, t_i)
         
         if rank == 1:
             w_1 = w_i
         else:
-            w_1 = self.__calculate_W1(examined_snippets)
+            w_1 = self.__calculate_W1(snippets.get_first_judgment())
         
         dp = self.__random.random()
         
@@ -41,27 +46,14 @@ class INSTDecisionMaker(BaseDecisionMaker):
         
         return Actions.SNIPPET
     
-    def __calculate_R_i(self, rank, judgements):
-        cg = 0
-    
-        for i in range(0, rank):
-            judgement = judgements[i].judgment
-            
-            if judgement < 0:  # Assume unjudged content is not relevant (as per TREC)
-                judgement = 0
-            
-            cg = cg + judgement
-    
-        return cg
-    
     def __calculate_T_i(self, R_i):
         return self.__t - R_i
     
     def __calculate_W(self, rank, T_i):
         return 1.0 / (rank + self.__t + T_i)**2
     
-    def __calculate_W1(self, judgements):
-        r_1 = self.__calculate_R_i(1, judgements)
+    def __calculate_W1(self, first_judgement):
+        r_1 = max(first_judgement, 0)  # Assume unjudged content is not relevant (as per TREC)
         t_1 = self.__calculate_T_i(r_1)
         w_1 = self.__calculate_W(1, t_1)
         
@@ -1,16 +1,18 @@
 from random import Random
 from loggers import Actions
 from stopping_decision_makers.base_decision_maker import BaseDecisionMaker
+from simiir.utils.random_streams import CommonRandom
 
 class RBPDecisionMaker(BaseDecisionMaker):
     """
     An implementation of Rank-Biased Precision, operationalised as a stopping strategy. Uses a stochastic roll of the dice to determine
     if a searcher continues or not. Implemented as per Moffat and Zobel (2008).
     """
-    def __init__(self, search_context, logger, patience=0.5, base_seed=0):
+    def __init__(self, search_context, logger, patience=0.5, base_seed=0, common_random_numbers=False):
         """
         Instantiates the decision maker, with a patience factor (defaulting to 0.5).
         The patience factor of RBP determines how patient a searcher is. The closer to 1.0, the deeper the searcher will go.
+        If common_random_numbers is True, the dice are rolled from a CommonRandom (see utils.random_streams).
         """
         super(RBPDecisionMaker, self).__init__(search_context, logger)
         self.__patience = patience
@@ -18,6 +20,9 @@ class RBPDecisionMaker(BaseDecisionMaker):
         self.__random = Random()
         self.__random.seed(base_seed + 1024)
         
+        if common_random_numbers:
+            self.__random = CommonRandom(base_seed, 'decision_maker', search_context)
+        
     def decide(self):
         """
         Implements the basic RBP algorithm, using the RBP score computed with the roll of a dice to determine whether
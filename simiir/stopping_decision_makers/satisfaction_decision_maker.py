@@ -18,17 +18,10 @@ class SatisfactionDecisionMaker(BaseDecisionMaker):
         If the searcher has examined a given number of snippets judged to be relevant, then we abandon the search and issue another query.
         Otherwise, we keep going until we find the required number of items (defined by self.__relevant_threshold).
         """
-        counter = 0
-        examined_snippets = self._search_context.get_examined_snippets()
+        relevant_count = self._search_context.get_query_statistics().snippets.get_relevant_count()
         
-        for snippet in examined_snippets:
-            judgement = snippet.judgment
-            
-            if judgement > 0:
-                counter = counter + 1  # Found a relevant item; increment the counter.
-                
-                if counter == self.__relevant_threshold:  # If the counter is reached, abandon the SERP.
-                    return Actions.QUERY
+        if self.__relevant_threshold > 0 and relevant_count >= self.__relevant_threshold:  # If the threshold is reached, abandon the SERP.
+            return Actions.QUERY
         
         # If we get here, we need to keep looking.
         return Actions.SNIPPET
\ No newline at end of file
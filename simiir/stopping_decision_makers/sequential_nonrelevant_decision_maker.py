@@ -15,18 +15,10 @@ class SequentialNonrelDecisionMaker(BaseDecisionMaker):
         If the user's current position in the current SERP is < the maximum depth, look at the next snippet in the SERP.
         Otherwise, a new query should be issued.
         """
-        counter = 0
-        examined_snippets = self._search_context.get_examined_snippets()
+        # A relevant (or unjudged) snippet breaks the sequence; stop if the sequence has reached the threshold at any point.
+        longest_streak = self._search_context.get_query_statistics().snippets.get_longest_nonrelevant_streak()
         
-        for snippet in examined_snippets:
-            judgment = snippet.judgment
-            
-            if judgment == 0:
-                counter = counter + 1
-                
-                if counter == self.__nonrelevant_threshold:
-                    return Actions.QUERY
-            else:
-                counter = 0  # Break the sequence; found something relevant, reset the counter.
+        if self.__nonrelevant_threshold > 0 and longest_streak >= self.__nonrelevant_threshold:
+            return Actions.QUERY
         
         return Actions.SNIPPET
\ No newline at end of file
@@ -15,34 +15,11 @@ class SequentialNonrelDecisionMakerSkip(BaseDecisionMaker):
         If the user's current position in the current SERP is < the maximum depth, look at the next snippet in the SERP.
         Otherwise, a new query should be issued.
         """
-        counter = 0
-        examined_snippets = self._search_context.get_examined_snippets()
-        previous = []
+        # Snippets previously seen (and judged nonrelevant) for this query are skipped; they neither extend nor break the sequence.
+        # Anything relevant (seen previously or not) resets the sequence.
+        longest_streak = self._search_context.get_query_statistics().snippets.get_longest_nonrelevant_streak(skip_repeated=True)
         
-        for snippet in examined_snippets:
-            judgment = snippet.judgment
-            
-            if judgment == 0:
-                if self.__get_previous_judgment(previous, snippet) != 0:
-                    counter = counter + 1
-
-                    if counter == self.__nonrelevant_threshold:
-                        return Actions.QUERY
-            else:
-                # Reset the counter; we have seen a relevant document! Either seen previously or not seen previously.
-                counter = 0
-            
-            previous.append(snippet)
-        
-        return Actions.SNIPPET
+        if self.__nonrelevant_threshold > 0 and longest_streak >= self.__nonrelevant_threshold:
+            return Actions.QUERY
         
-    def __get_previous_judgment(self, previously_seen, snippet):
-        """
-        Looking through the list of previously examined snippets, returns the judgment for that snippet.
-        If the snippet has not been seen before, -1 is returned.
-        """
-        for previous_snippet in previously_seen:
-            if previous_snippet.doc_id == snippet.doc_id:
-                return previous_snippet.judgment
-
-        return -1
\ No newline at end of file
+        return Actions.SNIPPET
\ No newline at end of file
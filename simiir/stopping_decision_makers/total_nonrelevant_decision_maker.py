@@ -15,19 +15,11 @@ class TotalNonrelDecisionMaker(BaseDecisionMaker):
         If the user's current position in the current SERP is < the maximum depth, look at the next snippet in the SERP.
         Otherwise, a new query should be issued.
         """
-        counter = 0
-        examined_snippets = self._search_context.get_examined_snippets()
+        # If the judgment for a snippet is -1, then it was seen previously and was therefore not judged - so it is not counted.
+        nonrelevant_count = self._search_context.get_query_statistics().snippets.get_nonrelevant_count()
         
-        # If the judgment for a snippet is -1, then it was seen previously and was therefore not judged - so we should skip it.
+        if self.__nonrelevant_threshold > 0 and nonrelevant_count >= self.__nonrelevant_threshold:
+            return Actions.QUERY
         
-        for snippet in examined_snippets:
-            judgment = snippet.judgment
-            
-            if judgment == 0:
-                counter = counter + 1  # Found something nonrelevant; increment counter
-
-                if counter == self.__nonrelevant_threshold:
-                    return Actions.QUERY
-
         # If we get here, we are okay - so we examine the next snippet.
         return Actions.SNIPPET
\ No newline at end of file
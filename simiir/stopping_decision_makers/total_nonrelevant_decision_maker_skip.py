@@ -17,33 +17,10 @@ class TotalNonrelDecisionMakerSkip(BaseDecisionMaker):
         If the user's current position in the current SERP is < the maximum depth, look at the next snippet in the SERP.
         Otherwise, a new query should be issued.
         """
-        counter = 0
-        examined_snippets = self._search_context.get_examined_snippets()
-        previous = []
+        nonrelevant_count = self._search_context.get_query_statistics().snippets.get_nonrelevant_count(skip_repeated=True)
         
-        for snippet in examined_snippets:
-            judgment = snippet.judgment
-            
-            if judgment == 0:
-                if self.__get_previous_judgment(previous, snippet) != 0:
-                    counter = counter + 1
-                    
-                    if counter == self.__nonrelevant_threshold:
-                        return Actions.QUERY
-            
-            # Add the snippet to our list of previously examined snippets.
-            previous.append(snippet)
-            
-        # If we get here, we are okay - so we examine the next snippet.
-        return Actions.SNIPPET
-    
-    def __get_previous_judgment(self, previously_seen, snippet):
-        """
-        Looking through the list of previously examined snippets, returns the judgment for that snippet.
-        If the snippet has not been seen before, -1 is returned.
-        """
-        for previous_snippet in previously_seen:
-            if previous_snippet.doc_id == snippet.doc_id:
-                return previous_snippet.judgment
+        if self.__nonrelevant_threshold > 0 and nonrelevant_count >= self.__nonrelevant_threshold:
+            return Actions.QUERY
         
-        return -1
\ No newline at end of file
+        # If we get here, we are okay - so we examine the next snippet.
+        return Actions.SNIPPET
\ No newline at end of file
@@ -41,15 +41,7 @@ class BaseInformedTrecTextClassifier(BaseTextClassifier):
         topic_id (string): the TREC topic number
         doc_id (srting): the TREC document number
         """
-        val = self._data_handler.get_value(topic_id, doc_id)  # Does the document exist?
-                                                              # Pulls the answer from the data handler.
-
-        if not val:  # If not, we fall back to the generic topic.
-            val = self._data_handler.get_value('0', doc_id)
-        if not val:  # if still no val, assume the document is not relevant.
-            val = 0
-
-        return val
+        return self._data_handler.get_value_fallback(topic_id, doc_id)  # Falls back to topic '0', then 0; see data_handlers.
 
 
     @abc.abstractmethod
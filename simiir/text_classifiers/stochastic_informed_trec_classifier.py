@@ -4,6 +4,7 @@ __author__ = 'leif'
 import abc
 from random import Random
 from simiir.text_classifiers.base_informed_trec_classifier import BaseInformedTrecTextClassifier
+from simiir.utils.random_streams import CommonRandom
 from ifind.seeker.trec_qrel_handler import TrecQrelHandler
 
 class StochasticInformedTrecTextClassifier(BaseInformedTrecTextClassifier):
@@ -14,8 +15,10 @@ class StochasticInformedTrecTextClassifier(BaseInformedTrecTextClassifier):
 
     rprob and nprob are set to 1.0 by default, so that the classifier is deterministic,
     i.e. it always clicks or judges relevant
+
+    if common_random_numbers is True, the dice are rolled from a CommonRandom (see utils.random_streams)
     """
-    def __init__(self, topic, search_context, qrel_file, rprob=1.0, nprob=1.0, base_seed=0, host=None, port=0):
+    def __init__(self, topic, search_context, qrel_file, rprob=1.0, nprob=1.0, base_seed=0, host=None, port=0, common_random_numbers=False):
         """
 
         """
@@ -27,6 +30,9 @@ class StochasticInformedTrecTextClassifier(BaseInformedTrecTextClassifier):
         
         self.__random = Random()
         self.__random.seed(base_seed + 256)
+        
+        if common_random_numbers:
+            self.__random = CommonRandom(base_seed, 'text_classifier', search_context)
 
     @abc.abstractmethod
     def is_relevant(self, document):
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+
+#
+# Lightweight timing of the calls made to the components of a simulated user.
+# A ComponentTimer replaces the methods to be timed on each component instance with a wrapper that counts the calls made,
+# and accumulates the time spent in them. Components that are not timed are left untouched - so there is no cost when
+# timing is disabled. The timings of each simulation are also added to an aggregate for its base directory, saved by
+# save_aggregate_timings() to component_timings.json once all simulations are complete.
+#
+
+_aggregates = {}
+
+# The component methods called by SimulatedUser (and the search context, on its behalf) that are timed.
+# Each is a tuple of (label, attribute of the user configuration holding the component, method name).
+TIMED_METHODS = [('query_generator.update_model', 'query_generator', 'update_model'),
+                 ('query_generator.get_next_query', 'query_generator', 'get_next_query'),
+                 ('search_interface.issue_query', 'search_interface', 'issue_query'),
+                 ('search_interface.get_document', 'search_interface', 'get_document'),
+                 ('serp_impression.is_serp_attractive', 'serp_impression', 'is_serp_attractive'),
+                 ('snippet_classifier.is_relevant', 'snippet_classifier', 'is_relevant'),
+                 ('document_classifier.is_relevant', 'document_classifier', 'is_relevant'),
+                 ('decision_maker.decide', 'decision_maker', 'decide')]
+
+
+class ComponentTimer(object):
+    """
+    Counts the calls made to, and accumulates the time spent in, the methods of components - for a single simulation.
+    """
+    def __init__(self):
+        self.__labels = []
+        self.__calls = []
+        self.__times = []
+        self.elapsed_time = None  # The duration of the simulation as a whole, if set; used to report each as a share.
+
+    def wrap(self, component, method_name, label):
+        """
+        Replaces the given method of the component instance with a wrapper recording its calls under label.
+        If the method has been wrapped before (e.g. a search interface shared between simulations), the earlier wrapper is replaced.
+        """
+        method = getattr(component, method_name)
+        method = getattr(method, 'timed_method', method)
+
+        index = len(self.__labels)
+        self.__labels.append(label)
+        self.__calls.append(0)
+        self.__times.append(0.0)
+
+        calls = self.__calls
+        times = self.__times
+        clock = time.time
+
+        def timed_method(*args, **kwargs):
+            start_time = clock()
+
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[index] += clock() - start_time
+                calls[index] += 1
+
+        timed_method.timed_method = method
+        setattr(component, method_name, timed_method)
+
+    def instrument(self, configuration):
+        """
+        Wraps the methods listed in TIMED_METHODS, for the components of the given simulation configuration.
+        """
+        for label, component_name, method_name in TIMED_METHODS:
+            if component_name == 'search_interface':
+                component = configuration.search_interface
+            else:
+                component = getattr(configuration.user, component_name)
+
+            self.wrap(component, method_name, label)
+
+    def get_timings(self):
+        """
+        Returns a list of (label, calls, seconds) tuples, in the order the methods were wrapped.
+        """
+        return zip(self.__labels, self.__calls, self.__times)
+
+    def report(self):
+        """
+        Returns a human readable summary of the timings, in the style of SearchContext.report().
+        """
+        lines = []
+
+        for label, calls, seconds in self.get_timings():
+            share = ""
+
+            if self.elapsed_time:
+                share = " ({0:.1%})".format(seconds / self.elapsed_time)
+
+            lines.append("    {0}: {1} calls, {2:.3f} ms{3}".format(label, calls, seconds * 1000, share))
+
+        if self.elapsed_time is not None:
+            lines.append("    Simulation: {0:.3f} ms".format(self.elapsed_time * 1000))
+
+        return os.linesep.join(lines)
+
+
+def add_to_aggregate(base_directory, timer):
+    """
+    Adds the timings of a simulation to the aggregate for the given base directory.
+    """
+    aggregate = _aggregates.setdefault(base_directory, {'simulations': 0, 'elapsed_time': 0.0, 'components': {}})
+    aggregate['simulations'] = aggregate['simulations'] + 1
+    aggregate['elapsed_time'] = aggregate['elapsed_time'] + (timer.elapsed_time or 0.0)
+
+    for label, calls, seconds in timer.get_timings():
+        component = aggregate['components'].setdefault(label, {'calls': 0, 'seconds': 0.0})
+        component['calls'] = component['calls'] + calls
+        component['seconds'] = component['seconds'] + seconds
+
+
+def save_aggregate_timings():
+    """
+    Saves the aggregate timings for each base directory to component_timings.json within it, then clears them.
+    Returns a list of the filenames written.
+    """
+    filenames = []
+
+    for base_directory, aggregate in _aggregates.items():
+        for component in aggregate['components'].values():
+            component['mean_ms'] = component['seconds'] * 1000 / component['calls'] if component['calls'] else 0.0
+
+        if not os.path.exists(base_directory):
+            os.makedirs(base_directory)
+
+        filename = os.path.join(base_directory, 'component_timings.json')
+        timings_file = open(filename, 'w')
+        json.dump(aggregate, timings_file, indent=2, sort_keys=True)
+        timings_file.close()
+        filenames.append(filename)
+
+    _aggregates.clear()
+    return filenames
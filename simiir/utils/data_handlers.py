@@ -3,9 +3,7 @@ __version__ = 2
 
 
 import os
-import redis
 import base64
-import cPickle
 from ifind.seeker.trec_qrel_handler import TrecQrelHandler
 
 
@@ -15,6 +13,34 @@ from ifind.seeker.trec_qrel_handler import TrecQrelHandler
 # Date: 2017-09-24
 #
 
+# File-based data handlers are read-only once loaded, so one is shared per QREL file - rather than each component (and each
+# simulation, e.g. of a seed sweep) reloading the same file. Likewise, one Redis-based data handler is shared per QREL file,
+# server and key prefix, and the clients of a server share a pool of connections.
+_file_handlers = {}
+_redis_handlers = {}
+_connection_pools = {}
+_fake_servers = {}
+
+# The host for an in-process FakeRedis, rather than a Redis server (see utils.fake_redis).
+FAKE_REDIS_HOST = ':memory:'
+
+
+def get_redis_client(host, port):
+    """
+    Returns a Redis client for the given host and port; connections are drawn from a pool shared by all clients of the server.
+    For a host of ':memory:', the FakeRedis for the given port is returned instead.
+    """
+    if host == FAKE_REDIS_HOST:
+        from simiir.utils.fake_redis import FakeRedis
+        return _fake_servers.setdefault(port, FakeRedis())
+    
+    import redis  # Imported on first use; redis is only required when a host is given.
+    
+    if (host, port) not in _connection_pools:
+        _connection_pools[(host, port)] = redis.ConnectionPool(host=host, port=port, db=0)
+    
+    return redis.StrictRedis(connection_pool=_connection_pools[(host, port)])
+
 
 def get_data_handler(filename=None, host=None, port=None, key_prefix=None):
     """
@@ -30,11 +56,19 @@ def get_data_handler(filename=None, host=None, port=None, key_prefix=None):
             raise ValueError("Please supply a host, port and key prefix for the redis handler.")
         
         # All parameters are correct for a RedisDataHandler to be constructed.
-        return RedisDataHandler(filename=filename, host=host, port=port, key_prefix=key_prefix)
+        key = (filename, host, port, key_prefix)
+        
+        if key not in _redis_handlers:
+            _redis_handlers[key] = RedisDataHandler(filename=filename, host=host, port=port, key_prefix=key_prefix)
+        
+        return _redis_handlers[key]
     
     # If we get here, we will simply return a FileDataHandler.
     # No other option exists.
-    return FileDataHandler(filename=filename)
+    if filename not in _file_handlers:
+        _file_handlers[filename] = FileDataHandler(filename=filename)
+    
+    return _file_handlers[filename]
 
 
 class FileDataHandler(object):
@@ -63,6 +97,21 @@ class FileDataHandler(object):
         return self._trec_qrels.get_value_if_exists(topic_id, doc_id)
     
     
+    def get_values(self, pairs):
+        """
+        Given a list of (topic, document) tuples, returns a list of the corresponding judgements (None where there is none).
+        """
+        return [self.get_value(topic_id, doc_id) for topic_id, doc_id in pairs]
+    
+    
+    def get_values_fallback(self, topic_id, doc_ids):
+        """
+        Given a topic and a list of documents, returns a list of the corresponding judgements, as per get_value_fallback().
+        """
+        values = self.get_values([(topic_id, doc_id) for doc_id in doc_ids] + [('0', doc_id) for doc_id in doc_ids])
+        return [value or fallback or 0 for value, fallback in zip(values[:len(doc_ids)], values[len(doc_ids):])]
+    
+    
     def get_value_fallback(self, topic_id, doc_id):
         """
         Given a topic and document combination, returns the corresponding
@@ -82,38 +131,100 @@ class FileDataHandler(object):
 
 class RedisDataHandler(FileDataHandler):
     """
-    Extends the FileDataHandler to consider a TrecQrelHandler object stored in
-    a Redis cache. If it is found that a TrecQrelHandler object does not exist for
-    the given key, a new TrecQrelHandler is instantiated using the filename given.
-    This handler is then placed in the Redis cache, ready for the next use.
+    Extends the FileDataHandler to consider judgements stored in a Redis cache, shared between processes: one hash per topic,
+    mapping document IDs to judgements. If the judgements of the given QREL file are not yet in the cache, the file is read
+    and stored, ready for the next use.
+    Judgements are fetched as they are needed - a batch (see get_values()) in a single pipelined round trip - and kept, so
+    each is fetched at most once.
     """
     def __init__(self, filename, host='localhost', port=6379, key_prefix=None):
-        self._trec_qrels = self._initialise_handler(filename=filename, host=host, port=port, key_prefix=key_prefix)
+        if key_prefix is None:
+            raise ValueError("A key prefix (string) must be specified for the RedisDataHandler.")
+        
+        key = os.path.split(filename)[-1] # Is there a better way to construct a unique key?
+                                          # Perhaps take the hash *from the file contents*.
+                                          # At present, the filename seems sufficient.
+        
+        self._key = '{key_prefix}::{hashed_key}'.format(key_prefix=key_prefix, hashed_key=hash(key))
+        self._cache = get_redis_client(host, port)
+        self._judgements = {}  # (topic, document) -> judgement (or None), for those fetched so far.
+        self._initialise_handler(filename)
     
     
-    def _initialise_handler(self, filename, host, port, key_prefix):
+    def _initialise_handler(self, filename):
         """
-        Instantiates the handler if it is not in the cache, or loads from the cache if it is.
+        Stores the judgements of the given QREL file in the cache, unless they are already there.
         """
+        loaded_key = '{0}::loaded'.format(self._key)
         
-        key = os.path.split(filename)[-1] # Is there a better way to construct a unique key?
-                                          # Perhaps take the hash *from the file contents*.
-                                          # At present, the filename seems sufficient.
+        if self._cache.exists(loaded_key):
+            return
         
-        if key_prefix is None:
-            raise ValueError("A key prefix (string) must be specified for the RedisDataHandler.")
+        topics = {}
+        qrels_file = open(filename, 'r')
         
-        key = '{key_prefix}::{hashed_key}'.format(key_prefix=key_prefix, hashed_key=hash(key))
+        for line in qrels_file:
+            line = line.split()  # Topic, iteration, document, judgement.
+            
+            if len(line) >= 4:
+                topics.setdefault(line[0], {})[line[2]] = int(line[3])
         
-        cache = redis.StrictRedis(host=host, port=port, db=0)
+        qrels_file.close()
         
-        if cache.get(key):
-            dumped = cache.get(key)
-            return cPickle.loads(dumped)
+        pipeline = self._cache.pipeline()
         
-        # If we get here, the TrecQrelsHandler does not exist in the cache; create it, dump it.
-        handler = super(RedisDataHandler, self)._initialise_handler(filename)
-        dumped = cPickle.dumps(handler)
-        cache.set(key, dumped)
+        for topic_id, judgements in topics.items():
+            pipeline.hmset(self._get_topic_key(topic_id), judgements)
         
-        return handler
\ No newline at end of file
+        pipeline.set(loaded_key, len(topics))  # Set last, so the judgements are complete once it exists.
+        pipeline.execute()
+    
+    
+    def _get_topic_key(self, topic_id):
+        """
+        Returns the key of the hash holding the given topic's judgements.
+        """
+        return '{0}::{1}'.format(self._key, topic_id)
+    
+    
+    def get_value(self, topic_id, doc_id):
+        """
+        Given a topic and document combination, returns the corresponding
+        judgement for that topic/document combination.
+        """
+        return self.get_values([(topic_id, doc_id)])[0]
+    
+    
+    def get_values(self, pairs):
+        """
+        Given a list of (topic, document) tuples, returns a list of the corresponding judgements (None where there is none).
+        Judgements not yet fetched are fetched in a single round trip.
+        """
+        pairs = [(str(topic_id), doc_id) for topic_id, doc_id in pairs]
+        missing = {}  # Topic -> list of documents to fetch.
+        
+        for pair in set(pairs):
+            if pair not in self._judgements:
+                missing.setdefault(pair[0], []).append(pair[1])
+        
+        if missing:
+            pipeline = self._cache.pipeline(transaction=False)
+            
+            for topic_id, doc_ids in missing.items():
+                pipeline.hmget(self._get_topic_key(topic_id), doc_ids)
+            
+            for (topic_id, doc_ids), values in zip(missing.items(), pipeline.execute()):
+                for doc_id, value in zip(doc_ids, values):
+                    self._judgements[(topic_id, doc_id)] = int(value) if value is not None else None
+        
+        return [self._judgements[pair] for pair in pairs]
+    
+    
+    def get_value_fallback(self, topic_id, doc_id):
+        """
+        Given a topic and document combination, returns the corresponding
+        judgement for that topic/document combination.
+        If the judgement does not exist, we fall back to the default topic of '0'.
+        Both are fetched together, if need be.
+        """
+        return self.get_values_fallback(topic_id, [doc_id])[0]
@@ -0,0 +1,106 @@
+#
+# An in-process stand-in for a Redis server, so the Redis-backed data handlers can be used (and tested) without one.
+# Select it with a host of ':memory:' (see data_handlers.get_redis_client()); each port is a separate fake server.
+# Only the commands the data handlers use are implemented. Values are held as strings, as Redis returns them.
+#
+
+
+class FakeRedis(object):
+    """
+    Implements the subset of the StrictRedis client interface used by the data handlers.
+    round_trips counts the requests a real client would have made: one per command, or one per executed pipeline.
+    """
+    def __init__(self):
+        self.__data = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def exists(self, key):
+        self.round_trips = self.round_trips + 1
+        return self._exists(key)
+
+    def get(self, key):
+        self.round_trips = self.round_trips + 1
+        return self._get(key)
+
+    def set(self, key, value):
+        self.round_trips = self.round_trips + 1
+        return self._set(key, value)
+
+    def delete(self, *keys):
+        self.round_trips = self.round_trips + 1
+        return self._delete(*keys)
+
+    def hmset(self, key, mapping):
+        self.round_trips = self.round_trips + 1
+        return self._hmset(key, mapping)
+
+    def hmget(self, key, fields):
+        self.round_trips = self.round_trips + 1
+        return self._hmget(key, fields)
+
+    def hgetall(self, key):
+        self.round_trips = self.round_trips + 1
+        return self._hgetall(key)
+
+    def _exists(self, key):
+        return key in self.__data
+
+    def _get(self, key):
+        return self.__data.get(key)
+
+    def _set(self, key, value):
+        self.__data[key] = str(value)
+        return True
+
+    def _delete(self, *keys):
+        deleted = [key for key in keys if key in self.__data]
+
+        for key in deleted:
+            del self.__data[key]
+
+        return len(deleted)
+
+    def _hmset(self, key, mapping):
+        hash_value = self.__data.setdefault(key, {})
+
+        for field, value in mapping.items():
+            hash_value[str(field)] = str(value)
+
+        return True
+
+    def _hmget(self, key, fields):
+        hash_value = self.__data.get(key, {})
+        return [hash_value.get(str(field)) for field in fields]
+
+    def _hgetall(self, key):
+        return dict(self.__data.get(key, {}))
+
+
+class FakePipeline(object):
+    """
+    Queues commands for a FakeRedis, running them when execute() is called; returns a list of their results.
+    """
+    COMMANDS = ['exists', 'get', 'set', 'delete', 'hmset', 'hmget', 'hgetall']
+
+    def __init__(self, redis):
+        self.__redis = redis
+        self.__commands = []
+
+    def __getattr__(self, name):
+        if name not in FakePipeline.COMMANDS:
+            raise AttributeError(name)
+
+        def queue(*args):
+            self.__commands.append((name, args))
+            return self
+
+        return queue
+
+    def execute(self):
+        self.__redis.round_trips = self.__redis.round_trips + 1
+        results = [getattr(self.__redis, '_{0}'.format(name))(*args) for name, args in self.__commands]
+        self.__commands = []
+        return results
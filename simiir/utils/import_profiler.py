@@ -0,0 +1,75 @@
+import sys
+import time
+import __builtin__
+
+#
+# A simple import profiler, for finding what slows down the startup of the simulator.
+# While started, each import statement that loads new modules is timed. The inclusive time includes the imports made by the
+# module being imported; the self time excludes them.
+#
+
+class ImportProfiler(object):
+    """
+    Times the imports made while the profiler is started, by wrapping the built-in __import__ function.
+    """
+    def __init__(self):
+        self.__original_import = None
+        self.__timings = []  # A list of (name, inclusive seconds, self seconds, depth) tuples, in the order imports completed.
+        self.__child_times = []  # A stack; the time spent in nested imports, for each import in progress.
+
+    def start(self):
+        """
+        Starts timing imports.
+        """
+        if self.__original_import is None:
+            self.__original_import = __builtin__.__import__
+            __builtin__.__import__ = self.__import
+
+    def stop(self):
+        """
+        Stops timing imports, restoring the built-in __import__ function.
+        """
+        if self.__original_import is not None:
+            __builtin__.__import__ = self.__original_import
+            self.__original_import = None
+
+    def get_timings(self):
+        """
+        Returns a list of (name, inclusive seconds, self seconds, depth) tuples - one for each import that loaded new modules.
+        """
+        return list(self.__timings)
+
+    def get_report(self, limit=25):
+        """
+        Returns a string reporting the slowest imports (by inclusive time), and the total time spent importing.
+        """
+        top_level_time = sum([timing[1] for timing in self.__timings if timing[3] == 0])
+        lines = ["Import profile: {0:.1f} ms in {1} imports loading new modules.".format(top_level_time * 1000, len(self.__timings)),
+                 "{0:>10} {1:>10}  {2}".format('incl. ms', 'self ms', 'module')]
+
+        for name, inclusive_time, self_time, depth in sorted(self.__timings, key=lambda timing: timing[1], reverse=True)[:limit]:
+            lines.append("{0:10.1f} {1:10.1f}  {2}{3}".format(inclusive_time * 1000, self_time * 1000, "  " * depth, name))
+
+        return '\n'.join(lines)
+
+    def __import(self, name, globals=None, locals=None, fromlist=None, level=-1):
+        """
+        Replaces __import__ while the profiler is started; times the import if it loads new modules.
+        """
+        modules_before = len(sys.modules)
+        depth = len(self.__child_times)
+        self.__child_times.append(0.0)
+        start_time = time.time()
+
+        try:
+            return self.__original_import(name, globals, locals, fromlist, level)
+        finally:
+            inclusive_time = time.time() - start_time
+            child_time = self.__child_times.pop()
+
+            if self.__child_times:
+                self.__child_times[-1] = self.__child_times[-1] + inclusive_time
+
+            if len(sys.modules) > modules_before:
+                label = name or '.{0}'.format(', '.join(fromlist or []))  # Relative imports (from . import x) have no name.
+                self.__timings.append((label, inclusive_time, inclusive_time - child_time, depth))
@@ -0,0 +1,152 @@
+import gc
+import os
+import sys
+import logging
+
+log = logging.getLogger('utils.memory_tracker')
+
+#
+# Optional tracking of the memory used by each simulation, for sizing pools of workers.
+# The resident set size (RSS) of the process is sampled when a simulation's components are created and once it is saved,
+# along with the peak RSS of the process, and the number of live objects of the types that tend to accumulate over long
+# sessions (documents, queries, Whoosh hits and language models). Counting objects walks the whole heap, so is only done
+# when tracking is enabled.
+#
+
+# Class names of the objects counted; compared against the name of each object's class.
+TRACKED_TYPES = {'Document': 'documents',
+                 'Query': 'queries',
+                 'Hit': 'whoosh_hits',
+                 'Results': 'whoosh_results',
+                 'ResultsPage': 'whoosh_results',
+                 'LanguageModel': 'language_models',
+                 'SmoothedLanguageModel': 'language_models',
+                 'BayesLanguageModel': 'language_models'}
+
+
+def get_rss():
+    """
+    Returns the current resident set size of the process in MB, or None if it cannot be determined (on systems without /proc).
+    """
+    try:
+        statm_file = open('/proc/self/statm')
+        resident_pages = int(statm_file.read().split()[1])
+        statm_file.close()
+    except (IOError, IndexError, ValueError):
+        return None
+
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024.0 * 1024.0)
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size of the process so far in MB, or None if the resource module is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if sys.platform == 'darwin':
+        return peak / (1024.0 * 1024.0)  # Reported in bytes on OS X; in kilobytes elsewhere.
+
+    return peak / 1024.0
+
+
+def count_objects():
+    """
+    Returns a dictionary of the number of live objects of each tracked kind (see TRACKED_TYPES).
+    """
+    counts = dict.fromkeys(set(TRACKED_TYPES.values()), 0)
+
+    for obj in gc.get_objects():
+        kind = TRACKED_TYPES.get(getattr(obj, '__class__', type(obj)).__name__)
+
+        if kind is not None:
+            counts[kind] = counts[kind] + 1
+
+    return counts
+
+
+class MemoryTracker(object):
+    """
+    Records the memory used by a single simulation; start() is called as its components are created, stop() once it completes.
+    If a budget (in MB) is given, a warning is raised when the simulation's peak memory use exceeds it.
+    """
+    def __init__(self, budget=None):
+        self.__budget = budget
+        self.__start_rss = None
+        self.__start_peak_rss = None
+        self.__start_counts = None
+        self.__summary = None
+
+    def start(self):
+        """
+        Samples the memory in use before the simulation.
+        """
+        self.__start_rss = get_rss()
+        self.__start_peak_rss = get_peak_rss()
+        self.__start_counts = count_objects()
+
+    def stop(self, simulation_id=None):
+        """
+        Samples the memory in use after the simulation, and checks it against the budget.
+        Returns the summary (see get_summary()).
+        """
+        rss = get_rss()
+        peak_rss = get_peak_rss()
+        counts = count_objects()
+
+        if peak_rss is not None and rss is not None:
+            peak_rss = max(peak_rss, rss)  # The two are sampled differently; the current RSS can be a little above the peak.
+
+        # The peak RSS is for the process as a whole; if it did not rise during the simulation, the RSS at its end is used.
+        simulation_peak_rss = rss
+
+        if peak_rss is not None and self.__start_peak_rss is not None and peak_rss > self.__start_peak_rss:
+            simulation_peak_rss = peak_rss
+
+        self.__summary = {'rss_mb': rss,
+                          'rss_growth_mb': rss - self.__start_rss if rss is not None and self.__start_rss is not None else None,
+                          'peak_rss_mb': peak_rss,
+                          'simulation_peak_rss_mb': simulation_peak_rss,
+                          'objects': counts,
+                          'object_growth': dict([(kind, counts[kind] - self.__start_counts.get(kind, 0)) for kind in counts]),
+                          'budget_mb': self.__budget,
+                          'over_budget': bool(self.__budget and simulation_peak_rss and simulation_peak_rss > self.__budget)}
+
+        if self.__summary['over_budget']:
+            message = "Simulation {0} used {1:.1f} MB, exceeding the memory budget of {2:.1f} MB.".format(simulation_id, simulation_peak_rss, self.__budget)
+            log.warning(message)
+            print >> sys.stderr, "WARNING: {0}".format(message)
+
+        return self.__summary
+
+    def get_summary(self):
+        """
+        Returns a dictionary of the memory used by the simulation: the RSS at its end and its growth over the simulation, the peak
+        RSS of the process and of the simulation (all in MB), and the live object counts and their growth. None until stopped.
+        """
+        return self.__summary
+
+    def report(self):
+        """
+        Returns a human readable summary of the memory used, in the style of SearchContext.report().
+        """
+        summary = self.__summary
+
+        def format_mb(value):
+            return "{0:.1f} MB".format(value) if value is not None else "unknown"
+
+        lines = ["    RSS: {0} (growth {1})".format(format_mb(summary['rss_mb']), format_mb(summary['rss_growth_mb'])),
+                 "    Peak RSS: {0} (process {1})".format(format_mb(summary['simulation_peak_rss_mb']), format_mb(summary['peak_rss_mb']))]
+
+        for kind in sorted(summary['objects']):
+            lines.append("    Live {0}: {1} ({2:+d})".format(kind.replace('_', ' '), summary['objects'][kind], summary['object_growth'][kind]))
+
+        if summary['over_budget']:
+            lines.append("    Exceeded the memory budget of {0}".format(format_mb(summary['budget_mb'])))
+
+        return os.linesep.join(lines)
@@ -0,0 +1,67 @@
+import struct
+import hashlib
+
+#
+# Counter-based random numbers, for common random numbers across configurations.
+# The stochastic components normally draw from their own random.Random, in the order they are called - so two
+# configurations differing in a single parameter (e.g. a patience factor) soon consume their streams out of step, and
+# their outcomes differ by chance as well as by the parameter. With common random numbers, each number is instead derived
+# from the situation it is drawn in: the seed, the component's role, the topic, the query (by its index in the session),
+# the rank on the SERP and the action being performed. Paired configurations then see the same random decision whenever
+# they are in the same situation, and far fewer replicates are needed to tell them apart.
+#
+
+SCALE = 1.0 / (1 << 53)
+
+
+class RandomStream(object):
+    """
+    A counter-based stream of uniform random numbers in [0, 1): each is a function of the seed, the component, and the key
+    it is drawn for - not of the numbers drawn before it.
+    """
+    def __init__(self, seed, component):
+        self.__prefix = '{0}:{1}'.format(seed, component)
+
+    def random(self, *key):
+        """
+        Returns the number for the given key (a tuple of values, e.g. topic ID, query index and rank).
+        """
+        digest = hashlib.md5('{0}:{1}'.format(self.__prefix, ':'.join([str(part) for part in key]))).digest()
+        return (struct.unpack('>Q', digest[:8])[0] >> 11) * SCALE  # The top 53 bits, as for random.random().
+
+
+def get_situation(search_context):
+    """
+    Returns a tuple describing the simulated user's situation: the topic ID, the index of the current query (the number of
+    queries issued), the current rank on the SERP, and the action being performed.
+    """
+    return (search_context.topic.id,
+            len(search_context.get_issued_queries()),
+            search_context.get_current_serp_position(),
+            search_context.get_last_action())
+
+
+class CommonRandom(object):
+    """
+    Used by stochastic components in place of a random.Random when common random numbers are enabled; only random() is
+    provided. Each number is drawn for the user's current situation (see get_situation()). Should a component draw more than
+    once in the same situation, each draw is numbered - so the draws differ, but still match those of another configuration.
+    """
+    def __init__(self, seed, component, search_context):
+        self.__component = component
+        self.__stream = RandomStream(seed, component)
+        self.__search_context = search_context
+        self.__draws = {}  # Situation -> the number of draws made in it.
+
+    def reseed(self, seed):
+        """
+        Draws from the stream for the given seed from now on (e.g. for a forked session; see utils.session_forks).
+        """
+        self.__stream = RandomStream(seed, self.__component)
+
+    def random(self):
+        situation = get_situation(self.__search_context)
+        draw = self.__draws.get(situation, 0)
+        self.__draws[situation] = draw + 1
+
+        return self.__stream.random(*(situation + (draw,)))
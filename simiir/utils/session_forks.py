@@ -0,0 +1,111 @@
+import copy
+import random
+import inspect
+import logging
+
+log = logging.getLogger('utils.session_forks')
+
+#
+# Forking of simulated search sessions, to explore alternative continuations (e.g. "what if the user had stopped here?")
+# from a shared prefix, rather than rerunning each session from the start. A fork is a copy of the simulation's state - the
+# search context, the logger's time counters, the query generator and classifiers (with their models), the decision maker,
+# the SERP impression, the random number generators' states, and the output so far - which then runs independently.
+#
+# Copies are made with copy.deepcopy(), but objects that are read-only over a session are shared between a session and its
+# forks rather than copied: the search interface, the topic, the QRELS data handlers, language models (which are replaced
+# rather than changed when a component updates its model), the configuration dictionaries, and the results store and sink.
+# So the cost of a fork is proportional to the state accumulated over the prefix, not to the size of the models or index.
+#
+# A fork continues with the same random numbers as the session it was forked from; pass a seed to draw new ones. Components
+# without a seed use the shared random module, so their forks cannot be told apart by seed. Forking is not supported with
+# componentTiming (the timed components are wrapped) or streamed output (the logs are written as the session runs).
+#
+
+# Class names of the objects that are shared; compared against the names of each object's class and its base classes (as
+# the simulator's modules may be imported under two names - e.g. search_interfaces and simiir.search_interfaces).
+SHARED_TYPE_NAMES = ['BaseSearchInterface', 'Topic', 'FileDataHandler',
+                     'LanguageModel', 'SmoothedLanguageModel', 'BayesLanguageModel', 'TrecQrelHandler']
+
+# The components of a user, which are searched for shared objects and random number generators.
+USER_COMPONENTS = ['query_generator', 'search_context', 'snippet_classifier', 'document_classifier', 'logger',
+                   'decision_maker', 'serp_impression']
+
+
+def is_shared(value):
+    """
+    Returns True if the given object is shared between a session and its forks, rather than copied.
+    """
+    return any([cls.__name__ in SHARED_TYPE_NAMES for cls in inspect.getmro(value.__class__)])
+
+
+def get_shared_objects(configuration):
+    """
+    Returns a list of the objects of the given simulation configuration that its forks share: those of the configuration
+    and output controller, and the shared attributes of each of the user's components.
+    """
+    shared = [configuration._config_dict, configuration.user._config_dict, configuration.search_interface, configuration.topic]
+    shared.extend(configuration.output.get_shared_objects())
+
+    for component_name in USER_COMPONENTS:
+        shared.extend([value for value in vars(getattr(configuration.user, component_name)).values() if is_shared(value)])
+
+    return shared
+
+
+def get_generators(configuration):
+    """
+    Returns a list of the random.Random instances held by the user's components.
+    """
+    return [value for component_name in USER_COMPONENTS
+            for value in vars(getattr(configuration.user, component_name)).values() if isinstance(value, random.Random)]
+
+
+def copy_generator(generator):
+    """
+    Returns a copy of the given random.Random instance, in the same state - much faster than deep copying its state.
+    """
+    copied = generator.__class__(0)  # Seeded with a constant, as seeding from the system is slow; the state is then replaced.
+    copied.setstate(generator.getstate())
+    return copied
+
+
+def reseed(configuration, seed):
+    """
+    Reseeds the random number generators held by the user's components (random.Random and CommonRandom instances), so
+    the fork draws different numbers from the session it was forked from. Each generator is seeded by the seed, and the
+    name of the component and attribute holding it.
+    """
+    for component_name in USER_COMPONENTS:
+        for attribute_name, value in vars(getattr(configuration.user, component_name)).items():
+            generator_seed = '{0}:{1}:{2}'.format(seed, component_name, attribute_name)
+
+            if isinstance(value, random.Random):
+                value.seed(generator_seed)
+            elif type(value).__name__ == 'CommonRandom':
+                value.reseed(generator_seed)
+
+
+def fork_configuration(configuration, branch=None, seed=None):
+    """
+    Returns a copy of the given simulation configuration (a SimulationComponentGenerator), in its current state, sharing
+    the objects listed by get_shared_objects(). If branch is given, the fork's base ID is suffixed with -b<branch>, so its
+    output is saved separately; if seed is given, its random number generators are reseeded (see reseed()).
+    """
+    if configuration.output.get_component_timer() is not None:
+        raise ValueError("Sessions cannot be forked when componentTiming is set.")
+
+    memo = dict([(id(value), value) for value in get_shared_objects(configuration)])
+
+    for generator in get_generators(configuration):
+        memo[id(generator)] = copy_generator(generator)
+
+    forked = copy.deepcopy(configuration, memo)
+
+    if branch is not None:
+        forked.base_id = '{0}-b{1}'.format(configuration.base_id, branch)
+
+    if seed is not None:
+        reseed(forked, seed)
+
+    log.debug("Forked {0} as {1} ({2} shared objects)".format(configuration.base_id, forked.base_id, len(memo)))
+    return forked
@@ -0,0 +1,245 @@
+# A native implementation of the standard trec_eval measures.
+# Removes the need to spawn trec_eval for every simulation - the qrels are read once, and cached.
+#
+# Measures are computed as per trec_eval 9.0: retrieved documents are ordered by decreasing score (ties broken
+# by decreasing docno), and a document is considered relevant if its judgement is at or above the relevance level.
+
+import os
+import math
+
+CUTOFFS = [5, 10, 15, 20, 30, 100, 200, 500, 1000]
+RECALL_LEVELS = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
+_qrels_cache = {}
+
+
+def get_qrels(filename):
+    """
+    Returns a TrecQrels object for the given filename.
+    Qrels are cached by path and modification time, so each qrels file is only read once per process.
+    """
+    path = os.path.abspath(filename)
+    key = (path, os.path.getmtime(path))
+
+    if key not in _qrels_cache:
+        _qrels_cache[key] = TrecQrels(path)
+
+    return _qrels_cache[key]
+
+
+class TrecQrels(object):
+    """
+    An in-memory representation of a TREC QREL file (topic, iteration, docno, judgement).
+    """
+    def __init__(self, filename):
+        self.__judgements = {}
+
+        qrels_file = open(filename, 'r')
+
+        for line in qrels_file:
+            line = line.split()
+
+            if len(line) < 4:
+                continue
+
+            self.__judgements.setdefault(line[0], {})[line[2]] = int(line[3])
+
+        qrels_file.close()
+
+    def get_topic_judgements(self, topic_id):
+        """
+        Returns a dictionary of <docno, judgement> pairs for the given topic.
+        If the topic does not exist, an empty dictionary is returned.
+        """
+        return self.__judgements.get(str(topic_id), {})
+
+
+class TrecEvaluator(object):
+    """
+    Computes trec_eval measures for a ranking of documents, using the judgements from the given qrels file.
+    """
+    def __init__(self, qrels_filename, relevance_level=1, max_retrieved=1000):
+        self._qrels = get_qrels(qrels_filename)
+        self._relevance_level = relevance_level
+        self._max_retrieved = max_retrieved
+
+    def evaluate_marked(self, topic_id, documents):
+        """
+        Evaluates a list of documents marked by a simulated user, in the order in which they were marked.
+        The ranking mirrors the .rels file written by the OutputController, where the score of each document is its rank.
+        """
+        ranking = []
+
+        for rank, document in enumerate(documents, start=1):
+            ranking.append((document.doc_id, rank))
+
+        return self.evaluate(topic_id, ranking)
+
+    def evaluate(self, topic_id, ranking):
+        """
+        Given a topic and a list of (docno, score) tuples, returns an ordered list of (measure, value) tuples.
+        As with trec_eval, topics without judgements are not evaluated; an empty list is returned for them.
+        """
+        judgements = self._qrels.get_topic_judgements(topic_id)
+
+        if not judgements:
+            return []
+
+        relevant = [judgement for judgement in judgements.values() if judgement >= self._relevance_level]
+        num_rel = len(relevant)
+        num_nonrel = len(judgements) - num_rel
+
+        ranked_docnos = self.__order_ranking(ranking)
+        num_ret = len(ranked_docnos)
+        rel_list = [judgements.get(docno, -1) for docno in ranked_docnos]  # -1 denotes an unjudged document.
+
+        num_rel_ret = 0
+        sum_precision = 0.0
+        recip_rank = 0.0
+        bpref = 0.0
+        nonrel_so_far = 0
+        rel_at = []  # The number of relevant documents retrieved at or above each rank.
+
+        for i, judgement in enumerate(rel_list):
+            rank = i + 1
+
+            if judgement >= self._relevance_level:
+                num_rel_ret = num_rel_ret + 1
+                sum_precision = sum_precision + (float(num_rel_ret) / rank)
+
+                if recip_rank == 0.0:
+                    recip_rank = 1.0 / rank
+
+                if nonrel_so_far > 0:
+                    bpref = bpref + (1.0 - (float(min(nonrel_so_far, num_rel)) / min(num_rel, num_nonrel)))
+                else:
+                    bpref = bpref + 1.0
+            elif judgement >= 0:
+                nonrel_so_far = nonrel_so_far + 1
+
+            rel_at.append(num_rel_ret)
+
+        measures = [('runid', 'Exp'),
+                    ('num_q', 1),
+                    ('num_ret', num_ret),
+                    ('num_rel', num_rel),
+                    ('num_rel_ret', num_rel_ret)]
+
+        average_precision = sum_precision / num_rel if num_rel else 0.0
+        measures.append(('map', average_precision))
+        measures.append(('gm_map', math.exp(math.log(max(average_precision, 0.00001)))))
+        measures.append(('Rprec', self.__precision_at(rel_at, num_rel)))
+        measures.append(('bpref', bpref / num_rel if num_rel else 0.0))
+        measures.append(('recip_rank', recip_rank))
+
+        for recall_level in RECALL_LEVELS:
+            measures.append(('iprec_at_recall_{0:.2f}'.format(recall_level),
+                             self.__interpolated_precision(rel_at, num_rel, recall_level)))
+
+        for cutoff in CUTOFFS:
+            measures.append(('P_{0}'.format(cutoff), self.__precision_at(rel_at, cutoff)))
+
+        measures.append(('ndcg', self.__ndcg(rel_list, judgements.values())))
+
+        return measures
+
+    def __order_ranking(self, ranking):
+        """
+        Orders (docno, score) tuples as trec_eval does: decreasing score, ties broken by decreasing docno.
+        Duplicate docnos are dropped (the highest ranked instance is kept), and the ranking is truncated to max_retrieved.
+        """
+        ordered = sorted(ranking, key=lambda entry: (float(entry[1]), entry[0]), reverse=True)
+        seen = set()
+        docnos = []
+
+        for docno, score in ordered:
+            if docno in seen:
+                continue
+
+            seen.add(docno)
+            docnos.append(docno)
+
+        return docnos[:self._max_retrieved]
+
+    def __precision_at(self, rel_at, cutoff):
+        """
+        Returns the precision at the given cutoff. Missing documents beyond the end of the ranking count as non-relevant.
+        """
+        if cutoff <= 0 or not rel_at:
+            return 0.0
+
+        return float(rel_at[min(cutoff, len(rel_at)) - 1]) / cutoff
+
+    def __interpolated_precision(self, rel_at, num_rel, recall_level):
+        """
+        Returns the interpolated precision at the given recall level - the maximum precision at any rank at which
+        recall is at least recall_level.
+        """
+        best = 0.0
+
+        if num_rel == 0:
+            return best
+
+        for i, rel_count in enumerate(rel_at):
+            if float(rel_count) / num_rel >= recall_level:
+                best = max(best, float(rel_count) / (i + 1))
+
+        return best
+
+    def __ndcg(self, rel_list, judgements):
+        """
+        Returns nDCG over the entire ranking, using the judgement values as gains (as per trec_eval's ndcg measure).
+        The gain at each rank is discounted by log2(rank + 1).
+        """
+        def dcg(gains):
+            total = 0.0
+
+            for i, gain in enumerate(gains):
+                if gain <= 0:
+                    continue
+
+                total = total + (gain / math.log(i + 2, 2))
+
+            return total
+
+        ideal = dcg(sorted([judgement for judgement in judgements if judgement > 0], reverse=True)[:self._max_retrieved])
+
+        if ideal == 0.0:
+            return 0.0
+
+        return dcg(rel_list) / ideal
+
+
+def format_measures(measures):
+    """
+    Given a list of (measure, value) tuples, returns a string in the format written by trec_eval.
+    """
+    lines = []
+
+    for measure, value in measures:
+        if isinstance(value, float):
+            value = '{0:.4f}'.format(value)
+
+        lines.append('{0:<22}\tall\t{1}{2}'.format(measure, value, os.linesep))
+
+    return ''.join(lines)
+
+
+def read_run_file(run_filename):
+    """
+    Reads a TREC run file (such as a .rels file written by the OutputController).
+    Returns a dictionary of topic IDs, each with a list of (docno, score) tuples.
+    """
+    rankings = {}
+    run_file = open(run_filename, 'r')
+
+    for line in run_file:
+        line = line.split()
+
+        if len(line) < 5:
+            continue
+
+        rankings.setdefault(line[0], []).append((line[2], float(line[4])))
+
+    run_file.close()
+    return rankings
@@ -0,0 +1,153 @@
+import sys
+import json
+import time
+import signal
+import logging
+import threading
+from simiir.utils.memory_tracker import get_rss
+
+log = logging.getLogger('utils.watchdog')
+
+#
+# Per-simulation resource limits, so that a single pathological configuration (e.g. a query generator that is very slow on
+# a long topic, or a user that never stops) cannot stall a sweep, or exhaust a node's memory. A simulation may be limited in
+# wall-clock seconds, in steps (actions), and in memory - the growth of the process's resident set size (RSS), in MB, since
+# the simulation started. A simulation exceeding a limit is stopped with a SimulationLimitError; the runner records it as
+# failed in the manifest, discards its output (removing any partial streamed logs), and carries on with the next.
+#
+# The number of steps is checked before every step, and the time and memory are checked periodically in the simulation loop.
+# When the simulation runs in the main thread, a timer (SIGALRM) also checks the time and memory every check_interval
+# seconds, so a simulation stuck in a single long step (in Python code) is interrupted too. Simulations run in worker threads
+# (see engines.concurrent_engine) are only checked between steps.
+#
+
+CHECK_STEPS = 100  # The number of steps between checks of the time and memory in the simulation loop.
+
+
+class SimulationLimitError(Exception):
+    """
+    Raised in a simulation when it exceeds one of its limits.
+    """
+    pass
+
+
+class Watchdog(object):
+    """
+    Enforces the limits of a single simulation. Call start() as the simulation starts, check(steps) before each step (with
+    the number of steps performed so far), and stop() once it has finished (or failed). Limits of None are not enforced.
+    """
+    def __init__(self, max_seconds=None, max_steps=None, max_memory=None, check_interval=1.0):
+        self.__max_seconds = max_seconds
+        self.__max_steps = max_steps
+        self.__max_memory = max_memory
+        self.__check_interval = check_interval
+        self.__start_time = None
+        self.__start_rss = None
+        self.__running = False
+        self.__previous_handler = None
+        self.steps = 0  # The number of steps performed, as of the last check.
+
+    def start(self):
+        """
+        Starts timing the simulation (and, in the main thread, the timer).
+        """
+        self.__start_time = time.time()
+        self.__start_rss = get_rss() if self.__max_memory is not None else None
+        self.__running = True
+
+        if (self.__max_seconds is not None or self.__max_memory is not None) and self.__uses_timer():
+            self.__previous_handler = signal.signal(signal.SIGALRM, self.__on_timer)
+            signal.setitimer(signal.ITIMER_REAL, self.__check_interval, self.__check_interval)
+
+    def stop(self):
+        """
+        Stops the timer, if any; the limits are no longer enforced.
+        """
+        self.__running = False  # Set first, so a timer firing from here on does not raise.
+
+        if self.__previous_handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.__previous_handler)
+            self.__previous_handler = None
+
+    def check(self, steps):
+        """
+        Raises a SimulationLimitError if the simulation, having performed the given number of steps and not yet finished, has
+        reached its limits.
+        The time and memory are only checked every CHECK_STEPS steps.
+        """
+        self.steps = steps
+
+        if self.__max_steps is not None and steps >= self.__max_steps:
+            raise SimulationLimitError("Reached the limit of {0} steps without finishing.".format(self.__max_steps))
+
+        if steps % CHECK_STEPS == 0:
+            self.__check_resources()
+
+    def get_elapsed_time(self):
+        """
+        Returns the number of seconds since the simulation started.
+        """
+        return time.time() - self.__start_time
+
+    def __check_resources(self):
+        """
+        Raises a SimulationLimitError if the simulation has exceeded its time or memory limit.
+        """
+        if self.__max_seconds is not None and self.get_elapsed_time() > self.__max_seconds:
+            raise SimulationLimitError("Exceeded the limit of {0} seconds.".format(self.__max_seconds))
+
+        if self.__max_memory is not None and self.__start_rss is not None:
+            growth = get_rss() - self.__start_rss
+
+            if growth > self.__max_memory:
+                raise SimulationLimitError("Exceeded the limit of {0} MB (used {1:.1f} MB).".format(self.__max_memory, growth))
+
+    def __on_timer(self, signal_number, frame):
+        if self.__running:
+            self.__check_resources()
+
+    def __uses_timer(self):
+        """
+        Returns True if the timer can be used: signals are only delivered to the main thread, and SIGALRM is not on all systems.
+        """
+        return hasattr(signal, 'setitimer') and isinstance(threading.current_thread(), threading._MainThread)
+
+
+class Manifest(object):
+    """
+    Records the outcome of each simulation run with limits in the given file, as JSON lines: the simulation's IDs, its status
+    (completed or failed), the number of steps and seconds it ran for and, for failed simulations, the reason. Each line is
+    written as the simulation ends, so the manifest of an interrupted sweep is complete up to that point.
+    """
+    def __init__(self, filename):
+        self.__filename = filename
+        self.completed = 0
+        self.failed = 0
+
+    def add(self, configuration, watchdog, error=None):
+        """
+        Records the outcome of the given simulation, run with the given Watchdog; error is the SimulationLimitError raised if
+        it failed. Failures are also logged, and printed to stderr.
+        """
+        entry = {'base_id': configuration.base_id,
+                 'simulation_id': configuration.simulation_id,
+                 'topic_id': configuration.topic.id,
+                 'user_id': configuration.user.id,
+                 'status': 'completed' if error is None else 'failed',
+                 'steps': watchdog.steps,
+                 'seconds': watchdog.get_elapsed_time()}
+
+        if error is None:
+            self.completed = self.completed + 1
+        else:
+            entry['reason'] = str(error)
+            self.failed = self.failed + 1
+
+            message = "Simulation {0} was stopped after {1} steps: {2}".format(configuration.base_id, watchdog.steps, error)
+            log.warning(message)
+            print >> sys.stderr, "WARNING: {0}".format(message)
+
+        manifest_file = open(self.__filename, 'a')
+        manifest_file.write(json.dumps(entry) + '\n')
+        manifest_file.close()